@@ -3,23 +3,29 @@ from fastapi.security import APIKeyHeader
 
 from app.core.logger import logger
 from app.exceptions.global_exception import GlobalHTTPException
-from app.utils.db.config import get_config_value
+from app.utils.db.api_keys import verify_api_key
 
 api_key_header = APIKeyHeader(name="X-API-Key")
 
 
+def resolve_role(key: str):
+    """:return: "admin" or "user" for a valid API key, None otherwise. Served from the api_key cache, no query."""
+    if key is None:
+        return None
+    return verify_api_key(key)
+
+
 async def validate_api_key(key: str = Security(api_key_header)):
-    api_key = get_config_value("API_KEY")
-    admin_api_key = get_config_value("ADMIN_API_KEY")
+    role = resolve_role(key)
 
-    if key not in {api_key, admin_api_key}:
+    if role is None:
         raise GlobalHTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 title="Unauthorized - Invalid API key",
                 detail="API key is invalid or expired. Please check your API key or obtain a new one.",
                 code="AUTH03_INVKEY"
         )
-    return "admin" if key == admin_api_key else "user"
+    return role
 
 
 def require_role(required_role: str):
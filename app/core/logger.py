@@ -4,13 +4,33 @@ Priority -
 High -> Low
 NOTSET-0, DEBUG-10, INFO-20, WARNING-30, ERROR-40, CRITICAL-50
 """
+import atexit
 import logging
-from logging.handlers import TimedRotatingFileHandler
+import os
+import queue
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+from app.core.structured_log import StructuredLogHandler
 
 LOG_FILE = "homeops.log"
 LOG_ROTATION_TIME = "midnight"
 LOG_BACKUP_COUNT = 7
 
+# Optional JSONL sink with a ref code index, queried by the /logs endpoint. Set from the
+# environment (STRUCTURED_LOG_ENABLED=1): the logger is set up before the config table is readable.
+STRUCTURED_LOG_ENABLED = os.environ.get("STRUCTURED_LOG_ENABLED", "").lower() in ("1", "true", "yes", "on")
+STRUCTURED_LOG_FILE = "homeops.jsonl"
+
+# Records waiting for the writer thread. Enqueueing never blocks, since records are logged
+# from the event loop: when the queue is full they are dropped and counted. The last
+# LOG_WARNING_RESERVE slots are kept for WARNING+ records, so a burst of DEBUG/INFO can't crowd them out.
+LOG_QUEUE_SIZE = 10000
+LOG_WARNING_RESERVE = 1000
+# Records written between flushes of the handlers
+LOG_BATCH_SIZE = 256
+
 LOG_FORMATS = {
     logging.DEBUG: "%(created).0f DBG P%(process)d:%(module)s:%(lineno)d %(message)s",
     logging.INFO: "%(created).0f INF %(message)s",
@@ -31,27 +51,183 @@ class LevelBasedFormatter(logging.Formatter):
         return formatter.format(record)
 
 
+class BatchFlushMixin:
+    """Defers flush() while the listener is writing a batch"""
+    batching = False
+
+    def flush(self):
+        if not self.batching:
+            super().flush()
+
+
+class BatchStreamHandler(BatchFlushMixin, logging.StreamHandler):
+    pass
+
+
+class BatchTimedRotatingFileHandler(BatchFlushMixin, TimedRotatingFileHandler):
+    pass
+
+
+class BatchStructuredLogHandler(BatchFlushMixin, StructuredLogHandler):
+    pass
+
+
+# Set per request by RequestContextMiddleware
+request_id_var = ContextVar("request_id", default=None)
+route_var = ContextVar("route", default=None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Captures the request context on the calling thread, before the record is queued"""
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """Non-blocking enqueue with drop accounting"""
+    def __init__(self, log_queue, warning_reserve=LOG_WARNING_RESERVE):
+        super().__init__(log_queue)
+        # DEBUG/INFO records are dropped once fewer free slots remain
+        self.low_level_limit = log_queue.maxsize - warning_reserve
+        self.queued = 0
+        self.dropped = 0
+        # Records are logged from many threads; += on the counters is not atomic
+        self.counter_lock = threading.Lock()
+
+    def prepare(self, record):
+        # The queue is in-process, so only the message needs resolving; formatting happens
+        # in the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            if record.levelno < logging.WARNING and self.queue.qsize() >= self.low_level_limit:
+                raise queue.Full
+            self.queue.put_nowait(record)
+            queued = True
+        except queue.Full:
+            queued = False
+        with self.counter_lock:
+            if queued:
+                self.queued += 1
+            else:
+                self.dropped += 1
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    Writes everything already queued before flushing, and rotates in the listener thread.
+    A handler that fails to write or flush (closed stream, full disk) is reported through
+    its handleError() and the listener keeps going, so one bad sink can't stop the others.
+    """
+    # Seconds between checks that the listener is still alive while the queue is full
+    SENTINEL_RETRY = 0.5
+
+    def enqueue_sentinel(self):
+        # Must not be lost to a full queue, or stop() would wait forever; a listener
+        # that has already exited won't drain the queue, and needs no sentinel
+        while self._thread is not None and self._thread.is_alive():
+            try:
+                self.queue.put(self._sentinel, timeout=self.SENTINEL_RETRY)
+                return
+            except queue.Full:
+                continue
+
+    def handle(self, record):
+        record = self.prepare(record)
+        for handler in self.handlers:
+            if self.respect_handler_level and record.levelno < handler.level:
+                continue
+            try:
+                handler.handle(record)
+            except Exception:
+                handler.handleError(record)
+
+    def _monitor(self):
+        q = self.queue
+        while True:
+            record = q.get()
+            batch = [record]
+            while record is not self._sentinel and len(batch) < LOG_BATCH_SIZE:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(record)
+
+            records = [record for record in batch if record is not self._sentinel]
+            for handler in self.handlers:
+                handler.batching = True
+            try:
+                for record in records:
+                    self.handle(record)
+            finally:
+                for handler in self.handlers:
+                    handler.batching = False
+                    if not records:
+                        continue
+                    try:
+                        handler.flush()
+                    except Exception:
+                        handler.handleError(records[-1])
+                for _ in batch:
+                    q.task_done()
+            if batch[-1] is self._sentinel:
+                break
+
+
 # Initialize Logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 # Console Handler
-console_handler = logging.StreamHandler()
+console_handler = BatchStreamHandler()
 console_handler.setFormatter(LevelBasedFormatter())
-logger.addHandler(console_handler)
 
 # File Handler with Daily Log Rotation
-file_handler = TimedRotatingFileHandler(LOG_FILE, when=LOG_ROTATION_TIME, interval=1, backupCount=LOG_BACKUP_COUNT, utc=True)
+file_handler = BatchTimedRotatingFileHandler(LOG_FILE, when=LOG_ROTATION_TIME, interval=1, backupCount=LOG_BACKUP_COUNT, utc=True)
 file_handler.setFormatter(LevelBasedFormatter())
-logger.addHandler(file_handler)
+
+handlers = [console_handler, file_handler]
+
+# Structured JSONL Handler, rotated alongside the text log
+structured_handler = None
+if STRUCTURED_LOG_ENABLED:
+    structured_handler = BatchStructuredLogHandler(STRUCTURED_LOG_FILE, when=LOG_ROTATION_TIME, interval=1,
+                                                   backupCount=LOG_BACKUP_COUNT, utc=True)
+    handlers.append(structured_handler)
+
+# Request threads only enqueue; the listener thread formats and writes
+log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+queue_handler = BoundedQueueHandler(log_queue)
+queue_handler.addFilter(RequestContextFilter())
+logger.addHandler(queue_handler)
+log_listener = BatchingQueueListener(log_queue, *handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 
 def set_log_level(level):
     """Dynamically update log level for all handlers"""
     logger.setLevel(level)
-    for handler in logger.handlers:
+    for handler in (*logger.handlers, *log_listener.handlers):
         handler.setLevel(level)
 
 
+def get_log_stats():
+    """Counters of the logging pipeline"""
+    with queue_handler.counter_lock:
+        queued, dropped = queue_handler.queued, queue_handler.dropped
+    return {
+        "queued": queued,
+        "dropped": dropped,
+        "pending": log_queue.qsize(),
+    }
+
+
 # Set initial log level
 set_log_level(logging.DEBUG)
@@ -0,0 +1,277 @@
+"""
+On-demand request profiling and slow-request capture.
+
+Profiles are stack samples: while a profiled request is in flight a sampler thread
+records the stacks of every busy thread (the event loop and threadpool workers) every
+SAMPLE_INTERVAL seconds. A request's profile is the set of samples taken between its
+start and end, written in folded-stack format ("frame;frame;frame count"), which
+flamegraph.pl and speedscope read directly. Under concurrency a profile also contains
+the other requests that were running at the same time.
+
+A request is profiled when an admin has armed the profiler for the next N requests
+(optionally only those matching a route template), or - when PROFILE_SLOW_MS is set -
+every request is sampled and the profile kept only if it took longer than that.
+With neither, the middleware does nothing but check two attributes. A streamed response
+(NDJSON, server-sent events) can stay open for hours, so its profile ends, and the
+request stops holding the sampler, when the first chunk of its body is sent.
+
+Profiles are written, and old ones pruned, by a writer thread: the middleware only copies
+the sample buffer and queues it, so the event loop never waits on the disk.
+"""
+import concurrent.futures.thread
+import json
+import os
+import queue
+import re
+import selectors
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+
+from starlette.routing import compile_path
+
+from app.core.logger import logger, request_id_var
+from app.utils.db.config import get_config_value
+
+PROFILE_DIR = "profiles"
+PROFILE_MAX_FILES = 50
+SAMPLE_INTERVAL = 0.005
+# Samples kept for in-flight requests (about 100 s of a busy process at SAMPLE_INTERVAL)
+SAMPLE_BUFFER = 20000
+# Seconds between reads of PROFILE_SLOW_MS from the config cache
+CONFIG_REFRESH = 5.0
+# Leaf frames of threads that are waiting for work, by source file; their samples are
+# dropped. Matching on the file keeps application functions named get() or wait().
+IDLE_FRAMES = {
+    threading.__file__: {"wait", "_wait_for_tstate_lock"},
+    queue.__file__: {"get"},
+    selectors.__file__: {"select"},
+    # Idle executor workers and the profile writer block in SimpleQueue.get(), which is C
+    concurrent.futures.thread.__file__: {"_worker"},
+    __file__: {"_write_pending"},
+}
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]+-[0-9a-f]+$")
+
+
+def is_idle(frame) -> bool:
+    code = frame.f_code
+    return code.co_name in IDLE_FRAMES.get(code.co_filename, ())
+
+
+def fold_stack(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+class StackSampler:
+    """Samples all threads while at least one caller holds it"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, buffer: int = SAMPLE_BUFFER):
+        self.interval = interval
+        self.samples = deque(maxlen=buffer)
+        self._holders = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._holders += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def release(self):
+        with self._lock:
+            self._holders -= 1
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._lock:
+                if self._holders == 0:
+                    self._thread = None
+                    self.samples.clear()
+                    return
+            now = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id and not is_idle(frame):
+                    self.samples.append((now, fold_stack(frame)))
+            time.sleep(self.interval)
+
+    def snapshot(self) -> list:
+        """Copy of the buffered samples; the buffer is cleared once no caller holds the sampler"""
+        return list(self.samples)
+
+    @staticmethod
+    def collect(samples: list, start: float, end: float) -> Counter:
+        return Counter(stack for ts, stack in samples if start <= ts <= end)
+
+
+class Profiler:
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self.sampler = StackSampler()
+        self.remaining = 0
+        self.route = None
+        self._route_pattern = None
+        self.slow_seconds = 0.0
+        self._slow_checked_at = float("-inf")
+        self._lock = threading.Lock()
+        self._pending = queue.SimpleQueue()
+        self._writer = None
+
+    def arm(self, requests: int, route: str = None):
+        """Profile the next `requests` requests, only those matching the route template if given"""
+        with self._lock:
+            self.remaining = requests
+            self.route = route
+            self._route_pattern = compile_path(route)[0] if route else None
+        logger.info(f"Profiler armed for {requests} requests (route={route})")
+
+    def disarm(self):
+        with self._lock:
+            self.remaining = 0
+            self.route = None
+            self._route_pattern = None
+
+    def refresh_slow_threshold(self):
+        now = time.monotonic()
+        if now - self._slow_checked_at >= CONFIG_REFRESH:
+            self._slow_checked_at = now
+            self.slow_seconds = float(get_config_value("PROFILE_SLOW_MS", default=0)) / 1000
+
+    def claim(self, path: str) -> bool:
+        """Whether this request counts towards the armed requests"""
+        if not self.remaining:
+            return False
+        with self._lock:
+            if self.remaining and (self._route_pattern is None or self._route_pattern.match(path)):
+                self.remaining -= 1
+                return True
+        return False
+
+    def state(self):
+        return {"remaining": self.remaining, "route": self.route, "slow_ms": self.slow_seconds * 1000,
+                "sampling": self.sampler._thread is not None}
+
+    def save_in_background(self, samples: list, start: float, end: float, metadata: dict) -> None:
+        """Queue the profile of the samples taken between start and end for the writer thread"""
+        self._pending.put((samples, start, end, metadata))
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_pending, name="profile-writer", daemon=True)
+                self._writer.start()
+
+    def _write_pending(self):
+        while True:
+            samples, start, end, metadata = self._pending.get()
+            stacks = StackSampler.collect(samples, start, end)
+            try:
+                self.save(stacks, {**metadata, "samples": sum(stacks.values())})
+            except OSError as e:
+                logger.warning(f"Profile not saved: {e}")
+
+    def save(self, stacks: Counter, metadata: dict) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        with open(os.path.join(self.directory, f"{profile_id}.folded"), "w") as file:
+            file.writelines(f"{stack} {count}\n" for stack, count in stacks.most_common())
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w") as file:
+            json.dump({"id": profile_id, **metadata}, file)
+        self._prune()
+        return profile_id
+
+    def _prune(self):
+        ids = sorted(name[:-len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in ids[:-self.max_files]:
+            for extension in (".json", ".folded"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + extension))
+                except FileNotFoundError:
+                    pass
+
+    def list_profiles(self):
+        """Stored profile metadata, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(self.directory, name)) as file:
+                        profiles.append(json.load(file))
+                except (OSError, ValueError):
+                    continue
+        return profiles
+
+    def profile_path(self, profile_id: str):
+        """Path of a stored folded profile, None if the id is unknown or malformed"""
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.folded")
+        return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware that samples armed and (when PROFILE_SLOW_MS is set) all requests"""
+
+    def __init__(self, app, profiler: Profiler = None):
+        self.app = app
+        self.profiler = profiler or request_profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profiler.refresh_slow_threshold()
+        armed = profiler.claim(scope["path"])
+        if not armed and not profiler.slow_seconds:
+            await self.app(scope, receive, send)
+            return
+
+        profiler.sampler.acquire()
+        start = time.perf_counter()
+        state = {"holding": True}
+
+        def finish(streamed: bool):
+            if not state["holding"]:
+                return
+            state["holding"] = False
+            end = time.perf_counter()
+            duration = end - start
+            try:
+                if armed or duration >= profiler.slow_seconds:
+                    profiler.save_in_background(profiler.sampler.snapshot(), start, end, {
+                        "reason": "armed" if armed else "slow",
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "route": getattr(scope.get("route"), "path", None),
+                        "request_id": request_id_var.get(),
+                        "duration_ms": round(duration * 1000, 2),
+                        "streamed": streamed,
+                        "created": time.time(),
+                    })
+            finally:
+                profiler.sampler.release()
+
+        async def profiled_send(message):
+            if message["type"] == "http.response.body" and message.get("more_body", False):
+                finish(streamed=True)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            finish(streamed=False)
+
+
+request_profiler = Profiler()
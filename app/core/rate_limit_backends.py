@@ -0,0 +1,226 @@
+"""
+Shared rate-limit counter backends.
+
+The in-process MemoryStore (app.core.rate_limiter) gives every uvicorn worker its own
+counters. These backends keep window counters outside the process so the configured
+limit holds across workers (SQLite in WAL mode, one host) or nodes (Redis protocol).
+Both expose one atomic operation - increment the current window and read the previous
+one - done in a single round-trip, so no cross-request lock is needed.
+"""
+import asyncio
+import itertools
+from urllib.parse import urlparse
+
+from anyio import to_thread
+from sqlalchemy import create_engine, event, text
+
+from app.core.logger import logger
+
+DEFAULT_SQLITE_PATH = "homeops_ratelimit.sqlite"
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+# Seconds allowed for connecting to the Redis server and for each pipeline's replies
+DEFAULT_REDIS_TIMEOUT = 2.0
+# Expired rows are deleted once every this many SQLite hits
+SQLITE_PURGE_EVERY = 1024
+
+
+class CounterBackend:
+    """Interface for shared window counters"""
+
+    async def hit(self, key: str, window_index: int, ttl: float, now: float) -> tuple[int, int]:
+        """
+        Atomically increment the counter of key in window_index and read the previous window.
+        :return: (current window count including this hit, previous window count)
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class SQLiteCounterBackend(CounterBackend):
+    """Counters in a WAL-mode SQLite file shared by all workers on the host"""
+
+    UPSERT = text(
+        "INSERT INTO rate_limit (key, count, expires_at) VALUES (:key, 1, :expires_at) "
+        "ON CONFLICT(key) DO UPDATE SET count = count + 1 "
+        "RETURNING count, (SELECT count FROM rate_limit WHERE key = :previous AND expires_at > :now)"
+    )
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        event.listen(self.engine, "connect", self._on_connect)
+        with self.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TABLE IF NOT EXISTS rate_limit "
+                "(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL)"
+            ))
+        self._hits = itertools.count()
+
+    @staticmethod
+    def _on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
+
+    def _hit(self, key, window_index, ttl, now):
+        with self.engine.begin() as connection:
+            current, previous = connection.execute(self.UPSERT, {
+                "key": f"{key}:{window_index}",
+                "previous": f"{key}:{window_index - 1}",
+                "expires_at": now + ttl,
+                "now": now,
+            }).one()
+            if next(self._hits) % SQLITE_PURGE_EVERY == 0:
+                connection.execute(text("DELETE FROM rate_limit WHERE expires_at <= :now"), {"now": now})
+        return current, previous or 0
+
+    async def hit(self, key, window_index, ttl, now):
+        return await to_thread.run_sync(self._hit, key, window_index, ttl, now)
+
+    async def close(self):
+        self.engine.dispose()
+
+
+class RespError(Exception):
+    pass
+
+
+def encode_command(*args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader):
+    line = (await reader.readline())[:-2]
+    if not line:
+        raise ConnectionError("Connection closed by server")
+    kind, payload = line[:1], line[1:]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        raise RespError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(payload)
+        return None if length < 0 else [await read_reply(reader) for _ in range(length)]
+    raise RespError(f"Unknown reply type {kind!r}")
+
+
+class RedisCounterBackend(CounterBackend):
+    """
+    Counters in any Redis-protocol server (Redis, Valkey, KeyDB, ...), shared across nodes.
+    INCR + EXPIRE + GET are pipelined in one write/read round-trip on a pooled connection.
+
+    A connection goes back to the pool only after a pipeline read all its replies. On an
+    error reply, timeout, disconnect or cancellation it may still have replies in flight,
+    so it is closed and its pool slot freed for a new one.
+    """
+
+    def __init__(self, url: str = DEFAULT_REDIS_URL, pool_size: int = 8, timeout: float = DEFAULT_REDIS_TIMEOUT):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.password = parsed.password
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = []
+        self._slots = None
+        self._loop = None
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                writer.write(b"".join(encode_command(*command) for command in setup))
+                for _ in setup:
+                    await read_reply(reader)
+        except BaseException:
+            writer.close()
+            raise
+        return reader, writer
+
+    async def _acquire(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Streams are bound to the loop that created them
+            self._idle, self._slots, self._loop = [], asyncio.Semaphore(self.pool_size), loop
+        await self._slots.acquire()
+        if self._idle:
+            return self._idle.pop()
+        try:
+            return await asyncio.wait_for(self._connect(), self.timeout)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, connection, reusable: bool):
+        if reusable:
+            self._idle.append(connection)
+        else:
+            connection[1].close()
+        self._slots.release()
+
+    async def execute_pipeline(self, *commands):
+        """
+        Raises:
+            RespError: If the server replied with an error to one of the commands
+            asyncio.TimeoutError: If connecting or reading the replies took longer than timeout
+        """
+        connection = await self._acquire()
+        reader, writer = connection
+        completed = False
+        try:
+            writer.write(b"".join(encode_command(*command) for command in commands))
+            replies = await asyncio.wait_for(self._read_replies(reader, len(commands)), self.timeout)
+            completed = True
+        finally:
+            self._release(connection, reusable=completed)
+        return replies
+
+    @staticmethod
+    async def _read_replies(reader: asyncio.StreamReader, count: int) -> list:
+        return [await read_reply(reader) for _ in range(count)]
+
+    async def hit(self, key, window_index, ttl, now):
+        current_key = f"rl:{key}:{window_index}"
+        current, _, previous = await self.execute_pipeline(
+            ("INCR", current_key),
+            ("EXPIRE", current_key, max(1, int(ttl + 0.5))),
+            ("GET", f"rl:{key}:{window_index - 1}"),
+        )
+        return current, int(previous or 0)
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+def create_counter_backend(name: str, sqlite_path: str = DEFAULT_SQLITE_PATH, redis_url: str = DEFAULT_REDIS_URL):
+    """Backend for RATE_LIMIT_BACKEND; None means per-process memory"""
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        return SQLiteCounterBackend(sqlite_path)
+    if name == "redis":
+        return RedisCounterBackend(redis_url)
+    logger.warning(f"Unknown rate limit backend '{name}', using memory")
+    return None
@@ -1,52 +1,243 @@
 import time
+from collections import OrderedDict, deque
+
 from fastapi import Request, status
 
+from app.core.logger import logger
+from app.core.metrics import RATE_LIMIT_REJECTIONS
+from app.core.rate_limit_backends import CounterBackend, DEFAULT_REDIS_URL, DEFAULT_SQLITE_PATH, create_counter_backend
 from app.exceptions.global_exception import GlobalHTTPException
+from app.utils.db.config import get_config_value
+
+DEFAULT_ALGORITHM = "sliding_window"
+DEFAULT_MAX_CLIENTS = 100_000
+# Algorithms that reduce to per-window counters and so can run on a shared CounterBackend
+SHARED_ALGORITHMS = {"fixed_window", "sliding_window"}
+# Seconds between warnings while the shared backend is failing
+BACKEND_WARNING_INTERVAL = 60.0
+
+_UNSET = object()
+_shared_backend = _UNSET
+
+
+class FixedWindow:
+    """Counter reset once per window (the original limiter behaviour). State: [window_start, count]"""
+
+    def __init__(self, requests_limit: int, time_window: float):
+        self.requests_limit = requests_limit
+        self.time_window = time_window
+
+    def hit(self, state, now):
+        if state is None or now - state[0] > self.time_window:
+            return True, [now, 1]
+        if state[1] >= self.requests_limit:
+            return False, state
+        state[1] += 1
+        return True, state
+
+
+class SlidingWindowCounter(FixedWindow):
+    """
+    Weighted sum of the previous and current fixed windows - smooths the burst allowed at
+    window boundaries with two integers of state. State: [window_index, current, previous]
+    """
+
+    def hit(self, state, now):
+        index, offset = divmod(now, self.time_window)
+        if state is None or index - state[0] > 1:
+            state = [index, 0, 0]
+        elif index != state[0]:
+            state = [index, 0, state[1]]
+
+        estimated = state[2] * (1 - offset / self.time_window) + state[1]
+        if estimated >= self.requests_limit:
+            return False, state
+        state[1] += 1
+        return True, state
+
+
+class SlidingWindowLog(FixedWindow):
+    """Exact sliding window; keeps at most requests_limit timestamps per client. State: deque"""
+
+    def hit(self, state, now):
+        if state is None:
+            state = deque(maxlen=self.requests_limit)
+        while state and now - state[0] >= self.time_window:
+            state.popleft()
+        if len(state) >= self.requests_limit:
+            return False, state
+        state.append(now)
+        return True, state
+
+
+class TokenBucket(FixedWindow):
+    """Bucket of requests_limit tokens refilled continuously over time_window. State: [tokens, last]"""
+
+    def hit(self, state, now):
+        rate = self.requests_limit / self.time_window
+        if state is None:
+            state = [float(self.requests_limit), now]
+        else:
+            state[0] = min(self.requests_limit, state[0] + (now - state[1]) * rate)
+            state[1] = now
+        if state[0] < 1:
+            return False, state
+        state[0] -= 1
+        return True, state
+
 
-# In-memory storage for request counters
-request_counters = {}
+ALGORITHMS = {
+    "fixed_window": FixedWindow,
+    "sliding_window": SlidingWindowCounter,
+    "sliding_log": SlidingWindowLog,
+    "token_bucket": TokenBucket,
+}
+
+
+class MemoryStore:
+    """
+    Per-limiter state kept in insertion/access order.
+
+    Every entry of a limiter shares the same TTL, so the least recently touched entry is
+    also the next to expire: expiry pops from the front until it meets a live entry
+    (amortized O(1), no full scans), and max_keys bounds memory with LRU eviction.
+    """
+
+    def __init__(self, ttl: float, max_keys: int = DEFAULT_MAX_CLIENTS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # key -> [last_seen, state]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None or now - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def put(self, key, state, now):
+        self._entries[key] = [now, state]
+        self._entries.move_to_end(key)
+
+        entries = self._entries
+        while entries:
+            oldest_key, (last_seen, _) = next(iter(entries.items()))
+            if now - last_seen <= self.ttl and len(entries) <= self.max_keys:
+                break
+            del entries[oldest_key]
+
+
+def get_shared_backend():
+    """Process-wide CounterBackend selected by RATE_LIMIT_BACKEND (memory, sqlite, redis)"""
+    global _shared_backend
+    if _shared_backend is _UNSET:
+        _shared_backend = create_counter_backend(
+                get_config_value("RATE_LIMIT_BACKEND", default="memory"),
+                sqlite_path=get_config_value("RATE_LIMIT_SQLITE_PATH", default=DEFAULT_SQLITE_PATH),
+                redis_url=get_config_value("RATE_LIMIT_REDIS_URL", default=DEFAULT_REDIS_URL),
+        )
+    return _shared_backend
+
+
+async def close_shared_backend():
+    if _shared_backend not in (_UNSET, None):
+        await _shared_backend.close()
 
 
 # Custom RateLimiter class with dynamic rate limiting values per route
 class RateLimiter:
-    def __init__(self, requests_limit: int, time_window: int):
+    def __init__(self, requests_limit: int, time_window: int, algorithm: str = DEFAULT_ALGORITHM,
+                 max_clients: int = DEFAULT_MAX_CLIENTS, backend: CounterBackend = None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm '{algorithm}'. Use one of {sorted(ALGORITHMS)}")
+        if backend is not None and algorithm not in SHARED_ALGORITHMS:
+            raise ValueError(f"Algorithm '{algorithm}' needs the memory backend. Use one of {sorted(SHARED_ALGORITHMS)}")
         self.requests_limit = requests_limit
         self.time_window = time_window
+        self.algorithm = ALGORITHMS[algorithm](requests_limit, float(time_window))
+        # Idle state older than two windows can't affect any algorithm's decision
+        self.store = MemoryStore(ttl=2 * float(time_window), max_keys=max_clients)
+        self.backend = backend
+        self._backend_warned_at = float("-inf")
+        self.sliding = algorithm == "sliding_window"
+        self.limit_detail = (f"Rate limit exceeded. You've made {requests_limit} requests within {time_window} seconds. "
+                             f"Please try again later.")
 
-    async def __call__(self, request: Request):
-        client_ip = request.client.host
-        route_path = request.url.path
+    @classmethod
+    def from_config(cls):
+        """
+        Limiter configured from REQUEST_LIMIT, TIME_WINDOW, RATE_LIMIT_ALGORITHM, RATE_LIMIT_MAX_CLIENTS
+        and RATE_LIMIT_BACKEND. The config is read on the first request, not when routers are built.
+        """
+        return ConfiguredRateLimiter()
 
-        # Get the current timestamp
-        current_time = int(time.time())
+    def allow(self, key: str, now: float = None) -> bool:
+        """Record a request for key and report whether it is within the limit"""
+        if now is None:
+            now = time.monotonic()
+        allowed, state = self.algorithm.hit(self.store.get(key, now), now)
+        self.store.put(key, state, now)
+        return allowed
 
-        # Create a unique key based on client IP and route path
-        key = f"{client_ip}:{route_path}"
+    async def allow_shared(self, key: str, now: float = None) -> bool:
+        """
+        Same as allow() against the shared backend. Windows are aligned to wall-clock time so
+        all workers agree on them; rejected requests count towards the window as well.
+        When the backend fails the request is checked against this process's own counters,
+        so an unreachable Redis doesn't turn every limited route into a 500.
+        """
+        if now is None:
+            now = time.time()
+        index, offset = divmod(now, self.algorithm.time_window)
+        try:
+            current, previous = await self.backend.hit(key, int(index), 2 * self.algorithm.time_window, now)
+        except Exception as e:
+            monotonic_now = time.monotonic()
+            if monotonic_now - self._backend_warned_at >= BACKEND_WARNING_INTERVAL:
+                self._backend_warned_at = monotonic_now
+                logger.warning(f"Rate limit backend failed, using per-process limits: {e!r}")
+            return self.allow(key, monotonic_now)
+        weight = 1 - offset / self.algorithm.time_window if self.sliding else 0
+        return previous * weight + current - 1 < self.requests_limit
 
-        # Check if client's request counter exists
-        if key not in request_counters:
-            request_counters[key] = {"timestamp": current_time, "count": 1}
+    async def __call__(self, request: Request):
+        # Lets ResponseCacheMiddleware apply the same limiters to cache hits of this route
+        request.state.rate_limiters = (*getattr(request.state, "rate_limiters", ()), self)
+        key = f"{request.client.host}:{request.url.path}"
+        if self.backend is None:
+            # No awaits between read and write, so the check-and-update is atomic on the event loop
+            allowed = self.allow(key)
         else:
-            # Check if the time window has elapsed, reset the counter if needed
-            if current_time - request_counters[key]["timestamp"] > int(self.time_window):
-                # Reset the counter and update the timestamp
-                request_counters[key]["timestamp"] = current_time
-                request_counters[key]["count"] = 1
-            else:
-                # Check if the client has exceeded the request limit
-                if request_counters[key]["count"] >= self.requests_limit:
-                    raise GlobalHTTPException(
-                            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                            title="Too Many Requests",
-                            detail=f"Rate limit exceeded. You've made {self.requests_limit} requests within {self.time_window} seconds. Please try again later.",
-                            code="API01_LIMIT"
-                    )
-                else:
-                    request_counters[key]["count"] += 1
-
-        # Clean up expired client data (optional)
-        for k in list(request_counters.keys()):
-            if current_time - request_counters[k]["timestamp"] > int(self.time_window):
-                request_counters.pop(k)
-
-        return True
\ No newline at end of file
+            allowed = await self.allow_shared(key)
+
+        if not allowed:
+            RATE_LIMIT_REJECTIONS.inc((getattr(request.scope.get("route"), "path", "unmatched"),))
+            raise GlobalHTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    title="Too Many Requests",
+                    detail=self.limit_detail,
+                    code="API01_LIMIT"
+            )
+
+        return True
+
+
+class ConfiguredRateLimiter(RateLimiter):
+    def __init__(self):
+        # Settings are filled in by configure()
+        self.configured = False
+
+    def configure(self):
+        super().__init__(requests_limit=int(get_config_value("REQUEST_LIMIT")),
+                         time_window=int(get_config_value("TIME_WINDOW")),
+                         algorithm=get_config_value("RATE_LIMIT_ALGORITHM", default=DEFAULT_ALGORITHM),
+                         max_clients=int(get_config_value("RATE_LIMIT_MAX_CLIENTS", default=DEFAULT_MAX_CLIENTS)),
+                         backend=get_shared_backend())
+        self.configured = True
+
+    async def __call__(self, request: Request):
+        if not self.configured:
+            self.configure()
+        return await super().__call__(request)
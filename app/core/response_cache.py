@@ -0,0 +1,296 @@
+"""
+Response cache for GET endpoints that dashboards poll.
+
+Routes are opted in by RESPONSE_CACHE_TTLS in the config table, a JSON object of route
+path template -> seconds (e.g. {"/users/{username}": 10}). Entries are keyed by role
+(from the X-API-Key header), path and query string, so a response is only ever replayed
+to a caller with the same role. Only 200 responses sent in one body message are stored;
+streamed ones (a body chunk with more_body, NDJSON, server-sent events) are passed
+through as they are produced. Stored responses are served before the route's dependencies run - except its rate limiters: an entry keeps
+the RateLimiter instances that passed the request that produced it, and every hit goes
+through them again, so hits count towards the limit and get the same 429.
+
+Concurrent misses for the same key are coalesced: one request computes the response and
+the others wait for its entry. The cache is an LRU bounded by RESPONSE_CACHE_MAX_BYTES.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.routing import compile_path
+
+from app.core.auth import resolve_role
+from app.core.logger import logger
+from app.exceptions.handlers import general_exception_handler
+from app.utils.db.config import get_config_value
+
+DEFAULT_ROUTE_TTLS = {"/": 5, "/users": 10, "/users/{username}": 10}
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Responses bigger than max_bytes / MAX_ENTRY_SHARE are passed through uncached
+MAX_ENTRY_SHARE = 8
+
+API_KEY_HEADER = b"x-api-key"
+IF_NONE_MATCH_HEADER = b"if-none-match"
+CACHE_CONTROL_HEADER = b"cache-control"
+# Dropped from the stored headers; 304s also drop the entity headers
+HOP_HEADERS = {b"date", b"server", b"etag", b"cache-control", b"x-cache"}
+ENTITY_HEADERS = {b"content-length", b"content-type", b"content-encoding"}
+# Content types that are never buffered, whatever the route's TTL
+STREAMING_CONTENT_TYPES = (b"application/x-ndjson", b"text/event-stream")
+
+_UNSET = object()
+
+
+class CachedResponse:
+    __slots__ = ("headers", "body", "etag", "expires_at", "size", "limiters", "route")
+
+    def __init__(self, headers, body, etag, expires_at, limiters=(), route=None):
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.expires_at = expires_at
+        self.limiters = limiters
+        self.route = route
+        self.size = len(body) + sum(len(name) + len(value) for name, value in headers)
+
+
+class ResponseCache:
+    """LRU of CachedResponse bounded by total size"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()
+        self.bytes = 0
+        # key -> asyncio.Event set when the request computing that key finishes
+        self.inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @property
+    def max_entry_bytes(self):
+        return self.max_bytes // MAX_ENTRY_SHARE
+
+    def get(self, key, now):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            self._remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        if entry.size > self.max_entry_bytes:
+            return
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self.entries.pop(key).size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if if_none_match.strip() == b"*":
+        return True
+    return any(tag.strip().removeprefix(b"W/") == etag for tag in if_none_match.split(b","))
+
+
+class ResponseCacheMiddleware:
+    """Pure ASGI middleware in front of the routes listed in RESPONSE_CACHE_TTLS"""
+
+    def __init__(self, app, cache: ResponseCache = None):
+        self.app = app
+        self.cache = cache or response_cache
+        self._ttl_source = _UNSET
+        # (compiled route template, ttl) in config order
+        self._ttls = []
+
+    def route_ttls(self) -> list:
+        source = get_config_value("RESPONSE_CACHE_TTLS", default=None)
+        if source != self._ttl_source:
+            try:
+                ttls = DEFAULT_ROUTE_TTLS if source is None else json.loads(source)
+                self._ttls = [(compile_path(route)[0], float(ttl)) for route, ttl in ttls.items()]
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"Invalid RESPONSE_CACHE_TTLS, response cache disabled: {e}")
+                self._ttls = []
+            self.cache.max_bytes = int(get_config_value("RESPONSE_CACHE_MAX_BYTES", default=DEFAULT_MAX_BYTES))
+            self._ttl_source = source
+        return self._ttls
+
+    def route_ttl(self, path):
+        """TTL of the first configured route template matching path, None if not cached"""
+        for pattern, ttl in self.route_ttls():
+            if pattern.match(path):
+                return ttl
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        ttl = self.route_ttl(scope["path"])
+        if not ttl:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        api_key = headers.get(API_KEY_HEADER)
+        role = resolve_role(api_key.decode("latin-1")) if api_key is not None else None
+        key = (role or "anonymous", scope["path"], scope["query_string"])
+        if_none_match = headers.get(IF_NONE_MATCH_HEADER)
+        revalidate = b"no-cache" in headers.get(CACHE_CONTROL_HEADER, b"")
+
+        cache = self.cache
+        entry = None if revalidate else cache.get(key, time.monotonic())
+        if entry is None and not revalidate and key in cache.inflight:
+            cache.coalesced += 1
+            await cache.inflight[key].wait()
+            entry = cache.get(key, time.monotonic())
+        if entry is not None:
+            if not await self.check_rate_limit(entry, scope, receive, send):
+                return
+            cache.hits += 1
+            await self.send_entry(entry, if_none_match, b"HIT", send)
+            return
+
+        cache.misses += 1
+        leader = key not in cache.inflight
+        inflight = None
+        if leader:
+            inflight = cache.inflight[key] = asyncio.Event()
+        # Shared with the Request objects of the route, whose limiters add themselves to it
+        request_state = scope.setdefault("state", {})
+        try:
+            await self.app(scope, receive,
+                           self.capture(key, ttl, if_none_match, scope, request_state, inflight, send))
+        finally:
+            self.release_waiters(key, inflight)
+
+    def release_waiters(self, key, inflight):
+        """Let requests coalesced on the leader's inflight event go on; no-op if not the leader"""
+        if inflight is not None and self.cache.inflight.get(key) is inflight:
+            self.cache.inflight.pop(key).set()
+
+    @staticmethod
+    async def check_rate_limit(entry, scope, receive, send) -> bool:
+        """
+        Run the limiters of the entry's route for a request about to be served from it.
+        :return: False if one rejected the request; its error response has been sent
+        """
+        if not entry.limiters:
+            return True
+        request = Request({**scope, "route": entry.route}, receive)
+        try:
+            for limiter in entry.limiters:
+                await limiter(request)
+        except HTTPException as exc:
+            response = await general_exception_handler(request, exc)
+            await response(scope, receive, send)
+            return False
+        return True
+
+    def capture(self, key, ttl, if_none_match, scope, request_state, inflight, send):
+        """
+        send() wrapper that buffers a cacheable response, up to max_entry_bytes. Once a
+        response turns out not to be cacheable it is passed through, and requests waiting
+        for its entry are released to compute their own.
+        """
+        state = {"start": None, "chunks": [], "size": 0, "passthrough": False}
+
+        def pass_through():
+            state["passthrough"] = True
+            self.release_waiters(key, inflight)
+
+        async def flush_buffered(more_body):
+            pass_through()
+            await send(state["start"])
+            await send({"type": "http.response.body", "body": b"".join(state["chunks"]), "more_body": more_body})
+            state["chunks"] = None
+
+        async def capture_send(message):
+            if state["passthrough"]:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                response_headers = dict(message.get("headers", []))
+                cacheable = (message["status"] == 200 and b"set-cookie" not in response_headers
+                             and b"no-store" not in response_headers.get(CACHE_CONTROL_HEADER, b"")
+                             and not response_headers.get(b"content-type", b"").startswith(STREAMING_CONTENT_TYPES))
+                if cacheable:
+                    state["start"] = message
+                else:
+                    pass_through()
+                    await send(message)
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            state["chunks"].append(body)
+            state["size"] += len(body)
+            if more_body or state["size"] > self.cache.max_entry_bytes:
+                # A streamed body is sent as it comes, however long it takes to finish
+                await flush_buffered(more_body)
+                return
+
+            body = b"".join(state["chunks"])
+            response_headers = [(name, value) for name, value in state["start"].get("headers", [])
+                                if name not in HOP_HEADERS]
+            entry = CachedResponse(response_headers, body, make_etag(body), time.monotonic() + ttl,
+                                   request_state.get("rate_limiters", ()), scope.get("route"))
+            self.cache.put(key, entry)
+            await self.send_entry(entry, if_none_match, b"MISS", send)
+
+        return capture_send
+
+    @staticmethod
+    async def send_entry(entry, if_none_match, status, send):
+        max_age = max(0, int(entry.expires_at - time.monotonic()))
+        extra_headers = [(b"etag", entry.etag), (b"cache-control", f"private, max-age={max_age}".encode()),
+                         (b"x-cache", status)]
+        if if_none_match is not None and etag_matches(if_none_match, entry.etag):
+            headers = [(name, value) for name, value in entry.headers if name not in ENTITY_HEADERS]
+            await send({"type": "http.response.start", "status": 304, "headers": headers + extra_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": 200, "headers": entry.headers + extra_headers})
+        await send({"type": "http.response.body", "body": entry.body})
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,263 @@
+"""
+Structured JSONL log sink with a per-file ref code index.
+
+Each record is one JSON line (ts, level, code, msg, module, line, request_id, route).
+Alongside every log file a small index is kept in INDEX_DIR: per-code record counts,
+the list of BLOCK_SIZE blocks each code appears in, the first timestamp of every
+block and the latest timestamp of the file. Queries by code or time range only read the matching blocks.
+
+Every worker process appends to the same file, so the index is built from the file
+itself rather than from what one process wrote: it records how many bytes of the file
+(identified by its inode) it covers, and refresh_index() indexes the complete lines
+past that point under an flock on INDEX_LOCK_FILE, then saves it. Each line is indexed
+once, by whichever process refreshes first.
+"""
+import contextlib
+import fcntl
+import json
+import os
+import re
+import time
+from logging.handlers import TimedRotatingFileHandler
+
+BLOCK_SIZE = 64 * 1024
+INDEX_DIR = "log_index"
+INDEX_LOCK_FILE = ".lock"
+INDEX_SAVE_INTERVAL = 5.0
+NO_CODE = "-"
+
+# Ref codes look like AUTH02_OK, DB03_QRYOK, API01_LIMIT (see app/utils/codes)
+REF_CODE_PATTERN = re.compile(r"^[A-Z]+\d+_[A-Z0-9]+")
+
+
+def extract_code(message):
+    match = REF_CODE_PATTERN.match(message)
+    return match.group(0) if match else None
+
+
+def index_path(log_path):
+    return os.path.join(os.path.dirname(os.path.abspath(log_path)), INDEX_DIR,
+                        os.path.basename(log_path) + ".json")
+
+
+class LogIndex:
+    def __init__(self, counts=None, blocks=None, block_times=None, size=0, inode=None, max_ts=None):
+        self.counts = counts or {}
+        self.blocks = blocks or {}
+        self.block_times = block_times or []
+        # Latest timestamp of any indexed record; records of several workers interleave, so
+        # it isn't necessarily the last one's
+        self.max_ts = max_ts
+        # Bytes of the file (inode) covered by the index
+        self.size = size
+        self.inode = inode
+
+    def add(self, code, ts, offset):
+        block = offset // BLOCK_SIZE
+        while len(self.block_times) <= block:
+            self.block_times.append(ts)
+        if self.max_ts is None or ts > self.max_ts:
+            self.max_ts = ts
+        key = code or NO_CODE
+        self.counts[key] = self.counts.get(key, 0) + 1
+        blocks = self.blocks.setdefault(key, [])
+        if not blocks or blocks[-1] != block:
+            blocks.append(block)
+
+    def candidate_blocks(self, code=None, start=None, end=None):
+        """Blocks that may contain records matching code within [start, end]"""
+        blocks = self.blocks.get(code, []) if code else range(len(self.block_times))
+        times = self.block_times
+        selected = []
+        for block in blocks:
+            if end is not None and times[block] > end:
+                continue
+            if start is not None and (times[block + 1] if block + 1 < len(times) else self.max_ts) < start:
+                continue
+            selected.append(block)
+        return selected
+
+    def extend(self, log_path):
+        """Index the complete lines written after self.size; a line still being written is left for later"""
+        with open(log_path, "rb") as file:
+            file.seek(self.size)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                    self.add(record.get("code"), record["ts"], self.size)
+                except (ValueError, KeyError):
+                    pass
+                self.size += len(line)
+
+    def save(self, log_path):
+        path = index_path(log_path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump({"counts": self.counts, "blocks": self.blocks, "block_times": self.block_times,
+                       "size": self.size, "inode": self.inode, "max_ts": self.max_ts}, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, log_path):
+        """Saved index of log_path, None when missing, unreadable or of an older format"""
+        try:
+            with open(index_path(log_path)) as file:
+                data = json.load(file)
+            return cls(data["counts"], data["blocks"], data["block_times"], data["size"], data["inode"],
+                       data["max_ts"])
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+@contextlib.contextmanager
+def index_lock(log_path):
+    """Exclusive flock shared by all processes indexing files of this log directory"""
+    directory = os.path.dirname(index_path(log_path))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, INDEX_LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # closing the file releases the flock
+
+
+def refresh_index(log_path):
+    """
+    Index of log_path covering everything written to it so far, by any process.
+    Rebuilt from the start when the file was replaced (rotated) or truncated.
+    """
+    with index_lock(log_path):
+        try:
+            stat = os.stat(log_path)
+        except OSError:
+            return LogIndex()
+        index = LogIndex.load(log_path)
+        if index is None or index.inode != stat.st_ino or index.size > stat.st_size:
+            index = LogIndex(inode=stat.st_ino)
+        if index.size < stat.st_size:
+            index.extend(log_path)
+            index.save(log_path)
+        return index
+
+
+def read_block(path, block):
+    """Records whose line starts inside the given block"""
+    records = []
+    start = block * BLOCK_SIZE
+    with open(path, "rb") as file:
+        if start:
+            file.seek(start - 1)
+            file.readline()  # skip the line that started in the previous block
+        while file.tell() < start + BLOCK_SIZE:
+            line = file.readline()
+            if not line:
+                break
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+class StructuredLogHandler(TimedRotatingFileHandler):
+    """JSONL file handler that keeps the shared LogIndex of its files up to date"""
+
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, encoding="utf-8", **kwargs)
+        self._pending = []
+        self._saved_at = 0.0
+
+    def to_dict(self, record):
+        message = record.getMessage()
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "code": extract_code(message),
+            "msg": message,
+            "module": record.module,
+            "line": record.lineno,
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+        }
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return data
+
+    def format(self, record):
+        return json.dumps(self.to_dict(record))
+
+    def emit(self, record):
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            # json.dumps escapes non-ASCII, so the line is plain ASCII
+            self._pending.append(json.dumps(self.to_dict(record)).encode("ascii") + b"\n")
+            self.flush()
+            if time.monotonic() - self._saved_at > INDEX_SAVE_INTERVAL:
+                self.save_index()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        self.acquire()
+        try:
+            self._write_pending()
+        finally:
+            self.release()
+
+    def _write_pending(self):
+        """
+        Write the pending lines with a single os.write on the O_APPEND descriptor: the
+        kernel appends it in one piece, so lines of other workers never land inside them.
+        """
+        if not self._pending or self.stream is None:
+            return
+        data = b"".join(self._pending)
+        self._pending.clear()
+        descriptor = self.stream.fileno()
+        while data:
+            data = data[os.write(descriptor, data):]
+
+    def save_index(self):
+        """Index what has been flushed so far; lines still buffered are picked up next time"""
+        refresh_index(self.baseFilename)
+        self._saved_at = time.monotonic()
+
+    def rotate(self, source, dest):
+        with index_lock(source):
+            super().rotate(source, dest)
+            if os.path.exists(index_path(source)):
+                os.replace(index_path(source), index_path(dest))
+
+    def doRollover(self):
+        self._write_pending()
+        self.save_index()
+        super().doRollover()
+        # Drop indexes of backups deleted by the rotation
+        directory = os.path.dirname(index_path(self.baseFilename))
+        for name in os.listdir(directory):
+            log_name = name[:-len(".json")]
+            if name.endswith(".json") and not os.path.exists(os.path.join(os.path.dirname(self.baseFilename), log_name)):
+                os.remove(os.path.join(directory, name))
+
+    def close(self):
+        try:
+            self._write_pending()
+            self.save_index()
+        except (OSError, ValueError):
+            pass
+        super().close()
+
+    def log_files(self):
+        """Current file first, then rotated backups newest first"""
+        directory, base = os.path.split(self.baseFilename)
+        backups = sorted((name for name in os.listdir(directory or ".")
+                          if name.startswith(base + ".") and self.extMatch.match(name[len(base) + 1:])),
+                         reverse=True)
+        return [self.baseFilename] + [os.path.join(directory, name) for name in backups]
+
+    def index_for(self, path):
+        """Index of one of log_files(), including the records of every worker"""
+        return refresh_index(path)
@@ -1,20 +1,34 @@
 from fastapi import status
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 
 from app.core.logger import logger
+from app.core.metrics import instrument_engine
+from app.database.api_key import ApiKey
 from app.database.base import Base
 from app.database.config import Config
+from app.database.engine_profiles import (ASYNC_DATABASE_URL, DATABASE_URL, create_async_sqlite_engine,
+                                          create_sqlite_engine)
+from app.database.scheduled_job import JobRun, JobsVersion, ScheduledJob, SchedulerLease
+from app.database.storage import StorageDir, StorageFile, StorageRoot
 from app.exceptions.global_exception import GlobalHTTPException
 
 # FOR PROD
-engine = create_engine(f'sqlite:///homeops.sqlite', echo=False)
+engine = create_sqlite_engine(DATABASE_URL)
+# Same file through aiosqlite, for async endpoints
+async_engine = create_async_sqlite_engine(ASYNC_DATABASE_URL)
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
 
 # FOR DEV
-# engine = create_engine("sqlite:///:memory:", echo=False,connect_args={'check_same_thread': False})
+# engine = create_sqlite_engine("sqlite:///:memory:", profile="memory")
 
-Base.metadata.create_all(engine)
+# Tables are created lazily by app.database.db_setup.ensure_database()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Attributes stay loaded after commit; lazy loads would need an await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 
 # Custom error handling for database connection issues
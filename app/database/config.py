@@ -1,8 +1,15 @@
 import time
 
-from sqlalchemy import Column, Integer, String, Text, event
+from sqlalchemy import Column, Integer, String, Text, event, text
+from sqlalchemy.orm import Session, object_session
 
 from app.database.base import Base
+from app.utils.db.config_cache import config_cache
+
+# Every insert and update takes the next revision, so workers polling the table version see
+# changes made within the same second (updated_at has whole-second resolution)
+NEXT_CONFIG_REVISION = text("(SELECT coalesce(max(revision), 0) + 1 FROM config)")
+
 
 class Config(Base):
     __tablename__ = 'config'
@@ -11,6 +18,8 @@ class Config(Base):
     key = Column(String(255), unique=True, nullable=False)
     value = Column(Text, nullable=False)
     updated_at = Column(Integer, nullable=False, default=lambda: int(time.time()))  # Default timestamp
+    revision = Column(Integer, nullable=False, default=NEXT_CONFIG_REVISION, onupdate=NEXT_CONFIG_REVISION,
+                      index=True)
 
     def __repr__(self):
         return f"<Config(key={self.key}, value={self.value}, updated_at={self.updated_at})>"
@@ -19,4 +28,15 @@ class Config(Base):
 @event.listens_for(Config, "before_update")
 def update_timestamp(mapper, connection, target):
     target.updated_at = int(time.time())  # Set updated_at to current UNIX timestamp
+    config_cache.invalidate(target.key)  # Re-read on next access
+    session = object_session(target)
+    if session is not None:
+        # A read between flush and commit may re-cache the old value, so invalidate again on commit
+        session.info.setdefault("config_keys", set()).add(target.key)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_configs(session):
+    for key in session.info.pop("config_keys", ()):
+        config_cache.invalidate(key)
 
@@ -1,9 +1,28 @@
+import fcntl
+import threading
+
 import sqlalchemy.exc
+from anyio import to_thread
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import NoResultFound, SQLAlchemyError
 
 from app.core.logger import logger
-from app.database import Config, engine, test_db_connection
+from app.database import ApiKey, Base, Config, engine, test_db_connection
+from app.database.api_key import api_key_id, hash_api_key
+from app.utils.db.config_cache import config_cache
+
+# Stamped into PRAGMA user_version once setup completes. Bump when adding tables or columns.
+SCHEMA_VERSION = 7
+SETUP_LOCK_FILE = "homeops.sqlite.lock"
+
+# Keys of a new install, hashed into the api_key table. Change them with POST /api-keys.
+DEFAULT_API_KEYS = {"admin": "admin-api-key", "user": "my-api-key"}
+# Plaintext key configs of schema version 1, moved into the api_key table on upgrade
+LEGACY_API_KEY_CONFIGS = {"ADMIN_API_KEY": "admin", "API_KEY": "user"}
+
+_initialized = False
+_init_lock = threading.Lock()
 
 
 # Merged function to check and run initial setup, including loading default configs
@@ -67,23 +86,40 @@ def load_default_configs(session):
             "ENVIRONMENT": "PROD",
             "REQUEST_LIMIT": 2,
             "TIME_WINDOW": 1,
-            "API_KEY": "my-api-key",
-            "ADMIN_API_KEY": "admin-api-key",
+            "RATE_LIMIT_ALGORITHM": "sliding_window",
+            "RATE_LIMIT_MAX_CLIENTS": 100000,
+            "RATE_LIMIT_BACKEND": "memory",
+            "CONFIG_CACHE_TTL": 0,
+            "PASSWORD_INFO_BACKEND": "shadow",
+            "CHAGE_MAX_WORKERS": 8,
+            "USERS_MAX_CONCURRENCY": 4,
+            "RESPONSE_CACHE_TTLS": '{"/": 5, "/users": 10, "/users/{username}": 10}',
+            "RESPONSE_CACHE_MAX_BYTES": 16 * 1024 * 1024,
+            "PROFILE_SLOW_MS": 0,
+            "API_KEY_REFRESH": 5,
+            "MONITORING_INTERVAL": 5,
+            "MONITORING_HISTORY": 17280,
+            "SCHEDULER_MAX_WORKERS": 4,
+            "SCHEDULER_RUN_HISTORY": 100,
+            "SYSTEMCTL_PATH": "systemctl",
+            "SERVICES_CACHE_TTL": 2,
+            "STORAGE_ROOTS": "[]",
+            "STORAGE_SCAN_WORKERS": 8,
+            "STORAGE_LARGE_FILE_BYTES": 64 * 1024 * 1024,
         }
 
         existing_keys = {config.key for config in session.query(Config.key).all()}
 
         # Prepare new configurations to be inserted
-        new_configs = [
-            Config(key=key, value=value)
-            for key, value in default_configs.items()
-            if key not in existing_keys
-        ]
-
-        if new_configs:
-            session.add_all(new_configs)
+        new_values = {key: value for key, value in default_configs.items() if key not in existing_keys}
+
+        if new_values:
+            # One executemany; keys added concurrently by another worker are left alone
+            session.execute(insert(Config).on_conflict_do_nothing(index_elements=[Config.key]),
+                            [{"key": key, "value": str(value)} for key, value in new_values.items()])
             session.commit()
-            logger.info(f"DB03_QRYOK. (Updated Row Count:{len(new_configs)})")
+            config_cache.update(new_values)
+            logger.info(f"DB03_QRYOK. (Updated Row Count:{len(new_values)})")
         else:
             logger.info("DB02_SKIP")
     except sqlalchemy.exc.ProgrammingError as e:
@@ -94,4 +130,96 @@ def load_default_configs(session):
         logger.exception(f"Error inserting default configs: {e}")
 
 
-database_initial_setup()
\ No newline at end of file
+def migrate_api_keys():
+    """
+    Seed an empty api_key table: with the plaintext API_KEY/ADMIN_API_KEY configs of an
+    older database (which are then deleted), or with DEFAULT_API_KEYS on a new install.
+    """
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        try:
+            if session.query(ApiKey.id).first() is not None:
+                return
+            legacy = session.query(Config).filter(Config.key.in_(LEGACY_API_KEY_CONFIGS)).all()
+            keys = {config.value: (LEGACY_API_KEY_CONFIGS[config.key], f"Migrated from config {config.key}")
+                    for config in legacy}
+            if not keys:
+                keys = {key: (role, "Default key") for role, key in DEFAULT_API_KEYS.items()}
+                logger.warning("Default API keys created; replace them with POST /api-keys")
+            for revision, (key, (role, name)) in enumerate(keys.items(), start=1):
+                key_hash = hash_api_key(key)
+                session.add(ApiKey(key_id=api_key_id(key, key_hash), key_hash=key_hash, role=role, name=name,
+                                   revision=revision))
+            legacy_keys = [config.key for config in legacy]
+            for config in legacy:
+                session.delete(config)
+            session.commit()
+            for key in legacy_keys:
+                config_cache.invalidate(key)
+            logger.info(f"DB03_QRYOK. (API keys stored: {len(keys)})")
+        except SQLAlchemyError as e:
+            session.rollback()
+            logger.error(f"DB05_QRYFAIL: API key migration failed due to {e}", exc_info=True)
+
+
+def migrate_config_revision():
+    """Add the config.revision column to a database created before schema version 5"""
+    with engine.begin() as connection:
+        columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(config)")}
+        if "revision" in columns:
+            return
+        connection.exec_driver_sql("ALTER TABLE config ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+        connection.exec_driver_sql("UPDATE config SET revision = id")
+        connection.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_config_revision ON config (revision)")
+    logger.info("DB03_QRYOK. (Added config.revision)")
+
+
+def drop_unused_indexes():
+    """Indexes created by earlier schema versions that no query uses"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_storage_dir_depth_path")
+
+
+def drop_job_revision():
+    """scheduled_job.revision of schema version 6, replaced by the scheduled_job_version counter"""
+    with engine.begin() as connection:
+        columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(scheduled_job)")}
+        if "revision" in columns:
+            connection.exec_driver_sql("ALTER TABLE scheduled_job DROP COLUMN revision")
+
+
+def ensure_database():
+    """
+    Lazy, one-shot database initialization: create tables and run the initial setup.
+    Runs at most once per process. Workers serialize on a file lock, and once any of
+    them has stamped PRAGMA user_version the others skip straight past setup.
+    """
+    global _initialized
+    if _initialized:
+        return
+
+    with _init_lock:
+        if _initialized:
+            return
+        with open(SETUP_LOCK_FILE, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with engine.connect() as connection:
+                version = connection.exec_driver_sql("PRAGMA user_version").scalar()
+            if version < SCHEMA_VERSION:
+                Base.metadata.create_all(engine)
+                migrate_config_revision()
+                drop_unused_indexes()
+                drop_job_revision()
+                database_initial_setup()
+                migrate_api_keys()
+                with engine.begin() as connection:
+                    connection.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            else:
+                logger.info("DB02_SKIP")
+        _initialized = True
+
+
+async def ensure_database_async():
+    """ensure_database() for async callers; the setup itself runs in a worker thread"""
+    if not _initialized:
+        await to_thread.run_sync(ensure_database)
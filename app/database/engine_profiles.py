@@ -0,0 +1,103 @@
+"""
+SQLite engine profiles.
+
+A profile is the set of PRAGMAs applied to every new DBAPI connection plus the pool
+used to hand connections out. The engine is created at import time, before the config
+table can be read, so the profile is chosen here rather than in the Config table.
+
+- "wal" (default): write-ahead log so readers don't wait on the writer, a busy timeout
+  instead of immediate "database is locked" errors, and a larger page cache / mmap.
+- "default": SQLite's own defaults (rollback journal, synchronous=FULL), for comparison.
+- "memory": a single shared connection, for sqlite:///:memory: during development.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+
+DATABASE_URL = "sqlite:///homeops.sqlite"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///homeops.sqlite"
+ENGINE_PROFILE = "wal"
+
+WAL_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # Negative values are KiB rather than pages
+    "cache_size": -16 * 1024,
+    "temp_store": "MEMORY",
+}
+
+# Sync sessions run in anyio's threadpool (40 threads by default); a pool smaller than that
+# makes threads queue for a connection even though WAL would let them read concurrently
+ENGINE_PROFILES = {
+    "wal": {"pragmas": WAL_PRAGMAS, "pool": "queue", "pool_size": 10, "max_overflow": 30},
+    "default": {"pragmas": {}, "pool": "default"},
+    "memory": {"pragmas": {}, "pool": "static"},
+}
+
+# (threaded, async) pool class per profile pool kind; "default" leaves the choice to SQLAlchemy
+POOL_CLASSES = {
+    "queue": (QueuePool, AsyncAdaptedQueuePool),
+    "null": (NullPool, NullPool),
+    "static": (StaticPool, StaticPool),
+}
+
+
+def get_profile(name=ENGINE_PROFILE):
+    if name not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown engine profile '{name}'. Use one of {sorted(ENGINE_PROFILES)}")
+    return ENGINE_PROFILES[name]
+
+
+def engine_options(profile=ENGINE_PROFILE, is_async=False):
+    """Keyword arguments for create_engine / create_async_engine"""
+    settings = get_profile(profile)
+    options = {}
+    if settings["pool"] in POOL_CLASSES:
+        options["poolclass"] = POOL_CLASSES[settings["pool"]][is_async]
+    if settings["pool"] == "queue":
+        options.update(pool_size=settings["pool_size"], max_overflow=settings["max_overflow"])
+    if not is_async and settings["pool"] != "default":
+        # Sessions run in the threadpool, so a connection may be returned on another thread
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+def apply_pragmas(engine, pragmas):
+    """Run the PRAGMAs on every new DBAPI connection of engine (a sync Engine)"""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def create_sqlite_engine(url=DATABASE_URL, profile=ENGINE_PROFILE, echo=False):
+    engine = create_engine(url, echo=echo, **engine_options(profile))
+    apply_pragmas(engine, get_profile(profile)["pragmas"])
+    return engine
+
+
+def create_async_sqlite_engine(url=ASYNC_DATABASE_URL, profile=ENGINE_PROFILE, echo=False):
+    engine = create_async_engine(url, echo=echo, **engine_options(profile, is_async=True))
+    apply_pragmas(engine.sync_engine, get_profile(profile)["pragmas"])
+    return engine
+
+
+def get_pool_stats(engine, profile=ENGINE_PROFILE):
+    """Pool counters of engine (sync or async), for monitoring"""
+    pool = engine.pool
+    stats = {
+        "profile": profile,
+        "pool": type(pool).__name__,
+        "status": pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(), checked_out=pool.checkedout(),
+                     overflow=pool.overflow())
+    return stats
@@ -0,0 +1,62 @@
+import time
+
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Integer, String, Text
+
+from app.database.base import Base
+
+
+class ScheduledJob(Base):
+    """
+    A job run by the scheduler. trigger_type "interval" takes seconds as the trigger,
+    "cron" a five-field cron expression; task is JSON, {"command": [...]} for a subprocess
+    or {"url": ..., "method": ...} for an HTTP request, both with an optional "timeout".
+    """
+    __tablename__ = 'scheduled_job'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    name = Column(String(255), unique=True, nullable=False)
+    trigger_type = Column(String(16), nullable=False)
+    trigger = Column(String(255), nullable=False)
+    task_type = Column(String(16), nullable=False)
+    task = Column(Text, nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(Integer, nullable=False, default=lambda: int(time.time()))
+    updated_at = Column(Integer, nullable=False, default=lambda: int(time.time()), onupdate=lambda: int(time.time()))
+
+    def __repr__(self):
+        return f"<ScheduledJob(name={self.name}, trigger={self.trigger_type}:{self.trigger}, enabled={self.enabled})>"
+
+
+class JobRun(Base):
+    """One execution of a job; lag is started_at - scheduled_at"""
+    __tablename__ = 'job_run'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(Integer, ForeignKey("scheduled_job.id"), nullable=False, index=True)
+    scheduled_at = Column(Float, nullable=False)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    # ok, failed, timeout, or overrun (not started because the previous run was still going)
+    status = Column(String(16), nullable=False)
+    manual = Column(Boolean, nullable=False, default=False)
+    detail = Column(Text, nullable=False, default="")
+
+
+class SchedulerLease(Base):
+    """Leader lease: the worker whose owner id is stored here, unexpired, fires the jobs"""
+    __tablename__ = 'scheduler_lease'
+
+    name = Column(String(64), primary_key=True)
+    owner = Column(String(255), nullable=False)
+    expires_at = Column(Float, nullable=False)
+
+
+class JobsVersion(Base):
+    """
+    Change counter of the job table, bumped in the same transaction as every insert, update
+    and delete of a job. A leader in another worker reloads when it moves.
+    """
+    __tablename__ = 'scheduled_job_version'
+
+    id = Column(Integer, primary_key=True)
+    value = Column(Integer, nullable=False)
@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Float, Index, Integer, String, Text
+
+from app.database.base import Base
+
+
+class StorageDir(Base):
+    """
+    One directory of a scanned root. own_* count the files directly in it, total_* the
+    whole subtree; bytes are allocated disk space (st_blocks), like du. mtime_ns is the
+    directory's own mtime at the last listing.
+    """
+    __tablename__ = 'storage_dir'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    root = Column(String(4096), nullable=False, index=True)
+    path = Column(String(4096), unique=True, nullable=False)
+    parent = Column(String(4096), nullable=True, index=True)
+    depth = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    own_bytes = Column(Integer, nullable=False)
+    own_files = Column(Integer, nullable=False)
+    total_bytes = Column(Integer, nullable=False)
+    total_files = Column(Integer, nullable=False)
+    total_dirs = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_storage_dir_own_bytes", "own_bytes"),
+    )
+
+
+class StorageFile(Base):
+    """Files of at least STORAGE_LARGE_FILE_BYTES, for the largest files queries"""
+    __tablename__ = 'storage_file'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    directory = Column(String(4096), nullable=False, index=True)
+    path = Column(String(4096), unique=True, nullable=False)
+    bytes = Column(Integer, nullable=False, index=True)
+    mtime = Column(Float, nullable=False)
+
+
+class StorageRoot(Base):
+    """Outcome of the last scan of a root"""
+    __tablename__ = 'storage_root'
+
+    root = Column(String(4096), primary_key=True)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    # running, ok or failed
+    status = Column(String(16), nullable=False)
+    full = Column(Integer, nullable=False, default=0)
+    dirs_listed = Column(Integer, nullable=False, default=0)
+    dirs_unchanged = Column(Integer, nullable=False, default=0)
+    rows_written = Column(Integer, nullable=False, default=0)
+    detail = Column(Text, nullable=False, default="")
@@ -0,0 +1,68 @@
+import time
+
+from fastapi import APIRouter, Depends, status
+
+from app.core.auth import require_role
+from app.core.logger import logger
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+from app.models.api_key import ApiKeyCreate
+from app.utils.db.api_keys import create_api_key, list_api_keys, revoke_api_key
+
+api_keys_router = APIRouter(prefix="/api-keys",
+                            dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("admin"))])
+
+
+@api_keys_router.get("")
+def get_api_keys(include_revoked: bool = False):
+    """
+    List API keys (never the keys themselves)
+    \n
+    :param include_revoked: Also list revoked keys (Optional) \n
+    :return: List of key id, role, name, created_at, expires_at and revoked_at
+    """
+    try:
+        return list_api_keys(include_revoked)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="API Key Read Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
+
+
+@api_keys_router.post("", status_code=status.HTTP_201_CREATED)
+def post_api_key(request: ApiKeyCreate):
+    """
+    Create an API key. The key is only returned by this call, store it now.
+    \n
+    :param role: admin or user \n
+    :param name: Label shown when listing keys (Optional) \n
+    :param expires_in_days: Days until the key stops working (Optional, default never) \n
+    :return: The key and its public fields
+    """
+    expires_at = int(time.time()) + request.expires_in_days * 86400 if request.expires_in_days else None
+    try:
+        key, description = create_api_key(request.role.value, request.name, expires_at)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="API Key Create Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
+    logger.info(f"API key {description['key_id']} created (role={description['role']})")
+    return {"key": key, **description}
+
+
+@api_keys_router.delete("/{key_id}")
+def delete_api_key(key_id: str):
+    """
+    Revoke an API key; it stops working in this worker at once and in others within API_KEY_REFRESH seconds
+    \n
+    :param key_id: Key id from GET /api-keys \n
+    :return: The key's public fields
+    """
+    try:
+        description = revoke_api_key(key_id)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="API Key Revoke Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
+    if description is None:
+        raise GlobalHTTPException(status_code=status.HTTP_404_NOT_FOUND, title="API Key Not Found",
+                                  detail=f"No API key with id '{key_id}'.", code="AUTH04_NOKEY")
+    logger.info(f"API key {key_id} revoked")
+    return description
@@ -0,0 +1,166 @@
+from fastapi import APIRouter, Depends, Query, status
+
+from app.core.auth import require_role
+from app.core.logger import logger
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+from app.models.scheduled_job import JobCreate
+from app.server.automation.scheduler import job_scheduler, validate_job
+from app.utils.db.jobs import create_job, delete_job, get_job, job_stats, list_runs, load_jobs, update_job
+
+automation_router = APIRouter(prefix="/automation",
+                              dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("admin"))])
+
+EMPTY_STATS = {"runs": 0, "failures": 0, "overruns": 0, "avg_duration": None, "max_duration": None,
+               "avg_lag": None, "max_lag": None}
+
+
+def _job_values(request: JobCreate) -> dict:
+    values = request.model_dump()
+    values["trigger_type"] = request.trigger_type.value
+    values["task_type"] = request.task_type.value
+    try:
+        validate_job(values)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_400_BAD_REQUEST, title="Invalid Job",
+                                  detail=str(e), code="SCHED02_INVALID")
+    return values
+
+
+async def _existing_job(job_id: int) -> dict:
+    job = await get_job(job_id)
+    if job is None:
+        raise GlobalHTTPException(status_code=status.HTTP_404_NOT_FOUND, title="Job Not Found",
+                                  detail=f"No scheduled job with id {job_id}.", code="SCHED01_NOTFOUND")
+    return job
+
+
+def _with_stats(job: dict, stats: dict) -> dict:
+    return {**job, "next_run": job_scheduler.next_run(job["id"]), "stats": stats.get(job["id"], EMPTY_STATS)}
+
+
+@automation_router.get("")
+async def get_automation_status():
+    """
+    Scheduler status of the worker answering
+    \n
+    :return: Dict with owner, leader (whether this worker fires jobs), scheduled_jobs, next_run, running and max_workers
+    """
+    return job_scheduler.status()
+
+
+@automation_router.get("/jobs")
+async def get_jobs():
+    """
+    List scheduled jobs with their run stats
+    \n
+    :return: List of jobs; next_run is only known when the leader answers, stats cover the kept run history
+    """
+    stats = await job_stats()
+    return [_with_stats(job, stats) for job in await load_jobs()]
+
+
+@automation_router.post("/jobs", status_code=status.HTTP_201_CREATED)
+async def post_job(request: JobCreate):
+    """
+    Create a scheduled job
+    \n
+    :param name: Unique job name \n
+    :param trigger_type: interval or cron \n
+    :param trigger: Seconds between runs, or a five-field cron expression in local time \n
+    :param task_type: command or http \n
+    :param task: {"command": [...], "timeout": s} or {"url": ..., "method": ..., "headers": {...}, "body": ..., "timeout": s} \n
+    :param enabled: Whether the job is scheduled (Optional, default true) \n
+    :return: The job
+    """
+    values = _job_values(request)
+    try:
+        job = await create_job(values)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_400_BAD_REQUEST, title="Invalid Job",
+                                  detail=str(e), code="SCHED02_INVALID")
+    job_scheduler.apply(job)
+    logger.info(f"Job {job['id']} ({job['name']}) created")
+    return _with_stats(job, {})
+
+
+@automation_router.get("/jobs/{job_id}")
+async def get_job_by_id(job_id: int):
+    """
+    Get a scheduled job with its run stats
+    \n
+    :param job_id: Job id \n
+    :return: The job
+    """
+    job = await _existing_job(job_id)
+    return _with_stats(job, await job_stats([job_id]))
+
+
+@automation_router.put("/jobs/{job_id}")
+async def put_job(job_id: int, request: JobCreate):
+    """
+    Replace a scheduled job's definition; a changed trigger reschedules it from now
+    \n
+    :param job_id: Job id \n
+    :return: The job
+    """
+    values = _job_values(request)
+    try:
+        job = await update_job(job_id, values)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_400_BAD_REQUEST, title="Invalid Job",
+                                  detail=str(e), code="SCHED02_INVALID")
+    if job is None:
+        await _existing_job(job_id)
+    job_scheduler.apply(job)
+    logger.info(f"Job {job_id} ({job['name']}) updated")
+    return _with_stats(job, await job_stats([job_id]))
+
+
+@automation_router.delete("/jobs/{job_id}")
+async def delete_job_by_id(job_id: int):
+    """
+    Delete a scheduled job and its run history; a run in progress finishes
+    \n
+    :param job_id: Job id \n
+    :return: The deleted job
+    """
+    job = await _existing_job(job_id)
+    try:
+        await delete_job(job_id)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="Job Delete Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
+    job_scheduler.remove(job_id)
+    logger.info(f"Job {job_id} ({job['name']}) deleted")
+    return job
+
+
+@automation_router.post("/jobs/{job_id}/run", status_code=status.HTTP_202_ACCEPTED)
+async def run_job(job_id: int):
+    """
+    Run a job now, in the worker answering, whether or not the job is enabled
+    \n
+    :param job_id: Job id \n
+    :return: The job; the run shows up in GET /automation/jobs/{job_id}/runs once finished
+    """
+    job = await _existing_job(job_id)
+    if not job_scheduler.run_now(job):
+        raise GlobalHTTPException(status_code=status.HTTP_409_CONFLICT, title="Job Already Running",
+                                  detail=f"Job {job_id} is already running in this worker.", code="SCHED03_RUNNING")
+    logger.info(f"Job {job_id} ({job['name']}) started manually")
+    return job
+
+
+@automation_router.get("/jobs/{job_id}/runs")
+async def get_job_runs(job_id: int, limit: int = Query(20, ge=1, le=1000)):
+    """
+    Run history of a job, newest first
+    \n
+    :param job_id: Job id \n
+    :param limit: Number of runs (Optional, default 20) \n
+    :return: List of runs with scheduled_at, started_at, finished_at, status (ok, failed, timeout or overrun),
+             manual and detail (output tail)
+    """
+    await _existing_job(job_id)
+    return await list_runs(job_id, limit)
@@ -0,0 +1,40 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response
+
+from app.server.codes.codes_catalog import codes_catalog
+from app.utils.encoding import dumps
+
+codes_router = APIRouter()
+
+
+@codes_router.get(
+        "/codes",
+        response_class=HTMLResponse,
+        tags=["web"],
+        include_in_schema=False,
+        summary="Codes Page",
+        description="Displays an HTML page with codes."
+)
+async def codes_page(request: Request):
+    snapshot = codes_catalog.snapshot()
+    if not snapshot.codes:
+        return HTMLResponse(content="<h2>No codes available.</h2>", status_code=404)
+
+    return snapshot.page.response(request)
+
+
+@codes_router.get("/codes.json", tags=["codes"])
+async def get_codes_json(request: Request, prefix: Optional[str] = Query(None, min_length=1)):
+    """
+    Ref code catalog as JSON
+    \n
+    :param prefix: Only codes starting with this prefix, e.g. AUTH, DB, API01 (Optional) \n
+    :return: Dict of code -> {description, fix}
+    """
+    snapshot = codes_catalog.snapshot()
+    if prefix is None:
+        return snapshot.json.response(request)
+    return Response(content=dumps(snapshot.lookup(prefix.upper())), media_type="application/json")
@@ -1,21 +1,66 @@
-from fastapi import APIRouter, Depends
+from typing import Dict, List, Optional, Union
+
+from fastapi import APIRouter, Body, Depends, Query, status
 from sqlalchemy.orm import Session
 
+from app.database import async_engine, engine
 from app.database.db_setup import load_default_configs
+from app.database.engine_profiles import get_pool_stats
 from app.core.auth import require_role
-from app.utils.db.config import get_config_value
+from app.exceptions.global_exception import GlobalHTTPException
+from app.utils.db.config import get_config_values, set_config_values
 from app.utils.db.init import get_db
 from app.core.rate_limiter import RateLimiter
 
 config_router = APIRouter(prefix="/config",
-                          dependencies=[Depends(RateLimiter(requests_limit=int(get_config_value("REQUEST_LIMIT")),
-                                                            time_window=int(get_config_value("TIME_WINDOW")))),Depends(require_role("admin"))])
+                          dependencies=[Depends(RateLimiter.from_config()),Depends(require_role("admin"))])
+
+
+@config_router.get("")
+def get_configs(keys: Optional[List[str]] = Query(None)):
+    """
+    Read many configuration values at once
+    \n
+    :param keys: Keys to read, repeat the parameter for several keys (Optional, default all) \n
+    :return: Dict of key -> value for the keys that exist
+    """
+    try:
+        return get_config_values(keys)
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="Config Read Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
+
+
+@config_router.put("")
+def put_configs(values: Dict[str, Union[str, int, float]] = Body(...)):
+    """
+    Create or update many configuration values in one transaction
+    \n
+    :param values: Dict of key -> value \n
+    :return: Number of keys written
+    """
+    try:
+        count = set_config_values(values)
+        return {"message": f"{count} configurations saved.", "count": count}
+    except ValueError as e:
+        raise GlobalHTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, title="Config Write Failed",
+                                  detail=str(e), code="DB05_QRYFAIL")
 
 
 @config_router.post("/reset")
-async def post_load_default_config(db: Session = Depends(get_db)):
+def post_load_default_config(db: Session = Depends(get_db)):
     try:
         load_default_configs(db)
         return {"message": "Default configurations loaded successfully."}
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+
+@config_router.get("/database")
+def get_database_stats():
+    """
+    Engine profile and connection pool counters
+    \n
+    :return: Dict of engine (sync) and async_engine -> profile, pool class and checked in/out connections
+    """
+    return {"engine": get_pool_stats(engine), "async_engine": get_pool_stats(async_engine)}
@@ -0,0 +1,61 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from starlette.responses import StreamingResponse
+
+from app.core.auth import require_role
+from app.core.rate_limiter import RateLimiter
+from app.server.logs.log_stream import log_events
+from app.server.logs.query_logs import get_code_counts, query_logs
+from app.server.logs.tail_logs import tail_logs
+
+logs_router = APIRouter(prefix="/logs",
+                        dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("admin"))])
+
+
+@logs_router.get("")
+def get_logs(code: Optional[str] = None, level: Optional[str] = None, start: Optional[float] = None,
+             end: Optional[float] = None, limit: int = Query(100, ge=1, le=5000)):
+    """
+    Query structured log records
+    \n
+    :param code: Ref code, e.g. AUTH02_OK (Optional) \n
+    :param level: DEBUG, INFO, WARNING, ERROR, CRITICAL (Optional) \n
+    :param start: UNIX timestamp lower bound (Optional) \n
+    :param end: UNIX timestamp upper bound (Optional) \n
+    :param limit: Maximum records, newest first \n
+    :return: List of log records
+    """
+    return query_logs(code=code, level=level.upper() if level else None, start=start, end=end, limit=limit)
+
+
+@logs_router.get("/codes")
+def get_logs_codes():
+    """
+    Ref code counts per log file, served from the log index
+    \n
+    :return: Dict of log file -> {code: count}
+    """
+    return get_code_counts()
+
+
+@logs_router.get("/tail")
+def get_logs_tail(lines: int = Query(100, ge=1, le=10000)):
+    """
+    Last lines of homeops.log (and its backups, if it is shorter), oldest first
+    \n
+    :param lines: Number of lines \n
+    :return: List of log lines
+    """
+    return tail_logs(lines)
+
+
+@logs_router.get("/stream")
+async def get_logs_stream():
+    """
+    Follow homeops.log as Server-Sent Events, one data event per new line
+    \n
+    :return: text/event-stream; a "dropped" event carries the number of lines skipped for a slow client
+    """
+    return StreamingResponse(log_events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
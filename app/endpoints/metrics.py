@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends
+from starlette.responses import Response
+
+from app.core.auth import require_role
+from app.core.logger import get_log_stats
+from app.core.metrics import CONTENT_TYPE, Gauge, registry
+from app.core.rate_limiter import RateLimiter
+from app.core.response_cache import response_cache
+from app.database import async_engine, engine
+from app.database.engine_profiles import get_pool_stats
+
+metrics_router = APIRouter(dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("admin"))])
+
+
+def _pool_connections():
+    values = {}
+    for name, db_engine in (("sync", engine), ("async", async_engine)):
+        stats = get_pool_stats(db_engine)
+        if "checked_out" in stats:
+            values[(name, "checked_out")] = stats["checked_out"]
+            values[(name, "checked_in")] = stats["checked_in"]
+    return values
+
+
+registry.register(Gauge("homeops_response_cache", "Response cache counters and size.", ("stat",),
+                        lambda: {(stat,): value for stat, value in response_cache.stats().items()}))
+registry.register(Gauge("homeops_log_pipeline", "Log records queued, dropped and pending.", ("stat",),
+                        lambda: {(stat,): value for stat, value in get_log_stats().items()}))
+registry.register(Gauge("homeops_db_pool_connections", "Pooled database connections.", ("engine", "state"),
+                        _pool_connections))
+
+
+@metrics_router.get("/metrics")
+def get_metrics():
+    """
+    Request, rate limiter, database and subprocess metrics in Prometheus text format.
+    Prometheus can send the admin key with `http_headers: {X-API-Key: ...}` in the scrape config.
+    \n
+    :return: Prometheus exposition text
+    """
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
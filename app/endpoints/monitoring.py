@@ -0,0 +1,45 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+
+from app.core.auth import require_role
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.monitoring.system_sampler import SERIES, system_sampler
+
+monitoring_router = APIRouter(prefix="/monitoring",
+                              dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("user"))])
+
+
+@monitoring_router.get("")
+def get_monitoring():
+    """
+    Latest host sample and sampler status, served from memory
+    \n
+    :return: Dict with current (timestamp and one value per series, null before the first sample) and sampler
+    """
+    return {"current": system_sampler.current(), "sampler": system_sampler.status()}
+
+
+@monitoring_router.get("/history")
+def get_monitoring_history(series: Optional[str] = None,
+                           window: float = Query(3600, gt=0, le=30 * 86400),
+                           points: int = Query(60, ge=1, le=1000)):
+    """
+    Downsampled host history
+    \n
+    :param series: Comma separated series, e.g. cpu_percent,load1 (Optional, default all) \n
+    :param window: Seconds of history, ending now \n
+    :param points: Number of equal slices of the window \n
+    :return: Dict with start, end, step and per series a list of {min, max, avg} per slice (null when empty)
+    """
+    names = series.split(",") if series else list(SERIES)
+    unknown = [name for name in names if name not in SERIES]
+    if unknown:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Unknown Series",
+            detail=f"Unknown series: {', '.join(unknown)}. Available: {', '.join(SERIES)}",
+            code="MON01_SERIES"
+        )
+    return system_sampler.series(names, window, points)
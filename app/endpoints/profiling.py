@@ -0,0 +1,65 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+from starlette.responses import FileResponse
+
+from app.core.auth import require_role
+from app.core.profiling import request_profiler
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+
+profiling_router = APIRouter(prefix="/profiling",
+                             dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("admin"))])
+
+
+@profiling_router.get("")
+def get_profiling():
+    """
+    Profiler state and stored profiles
+    \n
+    :return: Dict with state (armed requests, route, slow threshold) and profiles, newest first
+    """
+    return {"state": request_profiler.state(), "profiles": request_profiler.list_profiles()}
+
+
+@profiling_router.post("/arm")
+def post_profiling_arm(requests: int = Query(10, ge=1, le=1000), route: Optional[str] = None):
+    """
+    Profile the next N requests
+    \n
+    :param requests: Number of requests to profile \n
+    :param route: Only profile requests matching this route template, e.g. /users/{username} (Optional) \n
+    :return: Profiler state
+    """
+    request_profiler.arm(requests, route)
+    return request_profiler.state()
+
+
+@profiling_router.delete("/arm")
+def delete_profiling_arm():
+    """
+    Stop profiling armed requests (slow-request capture is controlled by PROFILE_SLOW_MS)
+    \n
+    :return: Profiler state
+    """
+    request_profiler.disarm()
+    return request_profiler.state()
+
+
+@profiling_router.get("/{profile_id}")
+def get_profile(profile_id: str):
+    """
+    Download a profile in folded-stack format (flamegraph.pl, speedscope)
+    \n
+    :param profile_id: Id from GET /profiling \n
+    :return: Folded stacks, one "frame;frame;frame count" line per stack
+    """
+    path = request_profiler.profile_path(profile_id)
+    if path is None:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="Profile Not Found",
+            detail=f"No stored profile '{profile_id}'. List the available profiles with GET /profiling.",
+            code="PROF01_NOTFOUND"
+        )
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -0,0 +1,50 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+
+from app.core.auth import require_role
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.services.service_status import service_status
+
+services_router = APIRouter(prefix="/services",
+                            dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("user"))])
+
+
+@services_router.get("")
+async def get_services(unit_type: str = Query("service", alias="type"),
+                       state: Optional[str] = None,
+                       pattern: Optional[str] = None,
+                       details: bool = False,
+                       refresh: bool = False):
+    """
+    List systemd units from one batched systemctl call, cached for SERVICES_CACHE_TTL seconds
+    \n
+    :param type: Unit type, e.g. service (Default), timer, socket, or all \n
+    :param state: Load, active or sub state to match, e.g. failed, running, inactive (Optional) \n
+    :param pattern: Glob on the unit name, e.g. docker* (Optional) \n
+    :param details: Add main_pid, restarts, memory_bytes, unit_file_state, ... from systemctl show (Optional) \n
+    :param refresh: Skip the cache (Optional) \n
+    :return: List of units with unit, load, active, sub and description
+    """
+    return await service_status.query(None if unit_type == "all" else unit_type, state, pattern, details, refresh)
+
+
+@services_router.get("/{unit}")
+async def get_service(unit: str, refresh: bool = False):
+    """
+    Get one systemd unit's details
+    \n
+    :param unit: Unit name; without a type it is taken as a service \n
+    :param refresh: Skip the cache (Optional) \n
+    :return: Unit details from systemctl show
+    """
+    details = await service_status.unit(unit, refresh)
+    if details is None:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="Unit Not Found",
+            detail=f"systemd has no unit named '{unit}'.",
+            code="SVC02_NOTFOUND"
+        )
+    return details
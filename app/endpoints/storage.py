@@ -0,0 +1,126 @@
+import os
+from enum import Enum
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, status
+
+from app.core.auth import require_role
+from app.core.logger import logger
+from app.core.rate_limiter import RateLimiter
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.storage.indexer import configured_roots, storage_indexer
+from app.server.storage.mounts import mounted_filesystems
+from app.utils.db.storage_index import largest_dirs, largest_files, scanned_roots, usage_tree
+
+storage_router = APIRouter(prefix="/storage",
+                           dependencies=[Depends(RateLimiter.from_config()), Depends(require_role("user"))])
+
+
+class LargestKind(str, Enum):
+    files = "files"
+    dirs = "dirs"
+
+
+def _not_indexed(path: str):
+    return GlobalHTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        title="Path Not Indexed",
+        detail=f"'{path}' is not an indexed directory. Indexed roots: {', '.join(configured_roots()) or 'none'}",
+        code="STOR02_NOTINDEXED"
+    )
+
+
+@storage_router.get("")
+def get_storage():
+    """
+    Configured storage roots with the outcome of their last scan
+    \n
+    :return: Dict with scanning, current_root and per root status, duration, listed / unchanged directories and totals
+    """
+    scans = scanned_roots()
+    return {
+        "scanning": storage_indexer.scanning,
+        "current_root": storage_indexer.current_root,
+        "roots": {root: scans.get(root) for root in configured_roots()},
+    }
+
+
+@storage_router.get("/mounts")
+def get_mounts(include_pseudo: bool = False):
+    """
+    Usage of the mounted filesystems (statvfs)
+    \n
+    :param include_pseudo: Also list proc, sysfs, cgroup, ... (Optional) \n
+    :return: List of device, mount_point, type, options, total / used / free / available bytes, used_percent and inodes
+    """
+    return mounted_filesystems(include_pseudo)
+
+
+@storage_router.get("/usage")
+def get_usage(path: str,
+              depth: int = Query(1, ge=0, le=10),
+              limit: int = Query(50, ge=1, le=1000)):
+    """
+    Disk usage of a directory from the index
+    \n
+    :param path: Directory inside a scanned root \n
+    :param depth: Levels of subdirectories to include \n
+    :param limit: Largest subdirectories kept per directory; the rest are summed in omitted_dirs / omitted_bytes \n
+    :return: Tree of path, bytes, files, dirs, own_bytes, own_files and children
+    """
+    tree = usage_tree(os.path.realpath(path), depth, limit)
+    if tree is None:
+        raise _not_indexed(path)
+    return tree
+
+
+@storage_router.get("/largest")
+def get_largest(path: str,
+                kind: LargestKind = LargestKind.files,
+                limit: int = Query(20, ge=1, le=1000)):
+    """
+    Largest files or directories below a path, from the index
+    \n
+    :param path: Directory inside a scanned root \n
+    :param kind: files (Default; only files of at least STORAGE_LARGE_FILE_BYTES are indexed) or dirs (by bytes of the files directly inside) \n
+    :param limit: Number of entries \n
+    :return: List, largest first
+    """
+    path = os.path.realpath(path)
+    if kind == LargestKind.dirs:
+        entries = largest_dirs(path, limit)
+        if not entries:
+            raise _not_indexed(path)
+        return entries
+    return largest_files(path, limit)
+
+
+@storage_router.post("/scan", status_code=status.HTTP_202_ACCEPTED,
+                     dependencies=[Depends(require_role("admin"))])
+def post_scan(root: Optional[str] = None, full: bool = False):
+    """
+    Start indexing the storage roots in the background
+    \n
+    :param root: One of the STORAGE_ROOTS (Optional, default all) \n
+    :param full: List every directory, also those whose mtime is unchanged (Optional) \n
+    :return: Dict with the roots being scanned; follow progress with GET /storage
+    """
+    roots = configured_roots()
+    if root is not None:
+        roots = [configured for configured in roots if configured == os.path.realpath(root)]
+    if not roots:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Unknown Storage Root",
+            detail=f"Not a configured storage root: {root}" if root else "STORAGE_ROOTS is empty",
+            code="STOR01_ROOT"
+        )
+    if not storage_indexer.start_scan(roots, full):
+        raise GlobalHTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            title="Scan Already Running",
+            detail="A storage scan is already running on this host.",
+            code="STOR03_SCANNING"
+        )
+    logger.info(f"Storage scan started: {', '.join(roots)} (full={full})")
+    return {"roots": roots, "full": full}
@@ -1,18 +1,20 @@
 from enum import Enum
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from fastapi import status
+from starlette.responses import StreamingResponse
 
 from app.core.logger import logger
 from app.exceptions.global_exception import GlobalHTTPException
 from app.server.users.get_all_users import get_all_users
 from app.server.users.get_user_details import get_user_details
-from app.utils.db.config import get_config_value
+from app.server.users.offload import run_blocking
+from app.server.users.query_users import parse_fields, query_users, stream_users
 from app.core.rate_limiter import RateLimiter
 
 users_router = APIRouter(prefix="/users",
-                         dependencies=[Depends(RateLimiter(requests_limit=int(get_config_value("REQUEST_LIMIT")),
-                                                           time_window=int(get_config_value("TIME_WINDOW"))))])
+                         dependencies=[Depends(RateLimiter.from_config())])
 
 
 class UserScope(str, Enum):
@@ -20,17 +22,57 @@ class UserScope(str, Enum):
     active = "active"
 
 
+class UsersFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+
+
 @users_router.get("")
-async def get_users(scope: UserScope = UserScope.all):
+async def get_users(response: Response,
+                    scope: UserScope = UserScope.all,
+                    fields: Optional[str] = None,
+                    uid_min: Optional[int] = None,
+                    uid_max: Optional[int] = None,
+                    shell: Optional[str] = None,
+                    home_prefix: Optional[str] = None,
+                    offset: int = Query(0, ge=0),
+                    limit: Optional[int] = Query(None, ge=1, le=10000),
+                    cursor: Optional[str] = None,
+                    output: UsersFormat = Query(UsersFormat.json, alias="format")):
     """
     Get all users List
     \n
     :param scope: all (Default) \n
     :param scope: active (Optional) \n
+    :param fields: Comma separated fields to return; password fields are only looked up when requested (Optional) \n
+    :param uid_min / uid_max: UID range filter (Optional) \n
+    :param shell: Exact shell filter (Optional) \n
+    :param home_prefix: Home directory prefix filter (Optional) \n
+    :param offset / limit: Offset pagination (Optional) \n
+    :param cursor: X-Next-Cursor of the previous page (Optional) \n
+    :param format: json (Default) or ndjson to stream users as they are read \n
     :return: List of users
     """
     try:
-        users = get_all_users(scope)
+        selected_fields = parse_fields(fields)
+        filters = dict(scope=scope, fields=selected_fields, uid_min=uid_min, uid_max=uid_max, shell=shell,
+                       home_prefix=home_prefix)
+
+        if output == UsersFormat.ndjson:
+            lines = await run_blocking(stream_users, **filters)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+
+        if any(value is not None for value in (selected_fields, uid_min, uid_max, shell, home_prefix, limit, cursor)) or offset:
+            users, next_cursor, total = await run_blocking(query_users, **filters, offset=offset, limit=limit,
+                                                           cursor=cursor)
+            response.headers["X-Total-Count"] = str(total)
+            if next_cursor is not None:
+                response.headers["X-Next-Cursor"] = next_cursor
+            if not users and (offset or cursor):
+                # Past the last page
+                return users
+        else:
+            users = await run_blocking(get_all_users, scope)
         if not users:
             raise GlobalHTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -55,11 +97,11 @@ async def get_users(scope: UserScope = UserScope.all):
 
 
 @users_router.get("/{username}")
-def get_users_username(username):
+async def get_users_username(username):
     """
     Get specific user details
     \n
     :param username: str \n
     :return: Dict of user details \n
     """
-    return get_user_details(username)
\ No newline at end of file
+    return await run_blocking(get_user_details, username)
\ No newline at end of file
@@ -1,11 +1,43 @@
 from fastapi import HTTPException, Request
-from starlette.responses import JSONResponse
+from starlette.responses import Response
 
 from app.exceptions.global_exception import GlobalHTTPException
-from app.models.problem_details import ProblemDetails
+from app.utils.encoding import dumps as encode_str
 
+PROBLEM_TYPE = "/codes"
+# Distinct (code, title, status) templates kept; beyond that errors are rendered uncached
+MAX_TEMPLATES = 1024
 
-async def general_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+# The code catalog has no titles or statuses, so templates are compiled on first use
+_templates: dict[tuple, tuple[bytes, bytes, bytes]] = {}
+
+
+def compile_template(code: str, title: str, status_code: int) -> tuple[bytes, bytes, bytes]:
+    """
+    ProblemDetails JSON split around detail and instance, the only per-request fields.
+    Field order matches app.models.problem_details.ProblemDetails.
+    """
+    head = (b'{"type":' + encode_str(PROBLEM_TYPE) + b',"title":' + encode_str(title)
+            + b',"status":' + str(status_code).encode() + b',"detail":')
+    return head, b',"instance":', b',"code":' + encode_str(code) + b'}'
+
+
+def get_template(code: str, title: str, status_code: int) -> tuple[bytes, bytes, bytes]:
+    key = (code, title, status_code)
+    template = _templates.get(key)
+    if template is None:
+        template = compile_template(code, title, status_code)
+        if len(_templates) < MAX_TEMPLATES:
+            _templates[key] = template
+    return template
+
+
+def render_problem(code: str, title: str, status_code: int, detail: str, instance: str) -> bytes:
+    head, middle, tail = get_template(code, title, status_code)
+    return head + encode_str(detail) + middle + encode_str(instance) + tail
+
+
+async def general_exception_handler(request: Request, exc: HTTPException) -> Response:
     if isinstance(exc, GlobalHTTPException):
         title = exc.title
         code = exc.code
@@ -13,16 +45,9 @@ async def general_exception_handler(request: Request, exc: HTTPException) -> JSO
         title = "Unknown Error Occurred"
         code = "UNEXPECTED_ERROR"
 
-    problem_details = ProblemDetails(
-            type="/codes",
-            title=title,
-            status=exc.status_code,
-            detail=str(exc.detail),
-            instance=str(request.url),
-            code=code
-    )
-
-    return JSONResponse(
+    return Response(
+            content=render_problem(code, str(title), exc.status_code, str(exc.detail), str(request.url)),
             status_code=exc.status_code,
-            content=problem_details.model_dump()
-    )
\ No newline at end of file
+            headers=exc.headers,
+            media_type="application/json"
+    )
@@ -1,20 +1,36 @@
-from app.database import engine
+from app.database import async_engine, engine
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, status
 from starlette.requests import Request
-from starlette.responses import HTMLResponse
-from starlette.templating import Jinja2Templates
 
+from app.core.metrics import MetricsMiddleware
+from app.core.middleware import RequestContextMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.rate_limiter import close_shared_backend
+from app.core.response_cache import ResponseCacheMiddleware
+from app.endpoints.api_keys import api_keys_router
+from app.endpoints.automation import automation_router
+from app.endpoints.codes import codes_router
 from app.endpoints.config import config_router
+from app.endpoints.logs import logs_router
+from app.endpoints.metrics import metrics_router
+from app.endpoints.monitoring import monitoring_router
+from app.endpoints.profiling import profiling_router
+from app.endpoints.services import services_router
+from app.endpoints.storage import storage_router
 from app.endpoints.users import users_router
 from app.exceptions.handlers import general_exception_handler
 from app.models.root_response import ResponseRootModel
+from app.database.db_setup import ensure_database
 from app.utils.db.config import get_config_value
-from app.utils.codes.load_codes import codes
+from app.utils.db.api_key_cache import api_key_cache
+from app.utils.db.config_cache import config_cache
+from app.server.codes.codes_catalog import codes_catalog
+from app.server.automation.scheduler import job_scheduler
+from app.server.monitoring.system_sampler import system_sampler
 
-ref_code_count = len(codes)
-
-API_DESCRIPTION = f"""
+# {ref_code_count} is filled in at startup, once the code catalog is loaded
+API_DESCRIPTION = """
 
 ## 🎯 Features
 - ⚙️ **Configuration Management**: Modify system, network, and automation settings.
@@ -39,23 +55,36 @@ OPENAPI_TAGS = [
     {"name": "storage", "description": "Manage storage, disk usage, and related resources."},
     {"name": "users", "description": "Handle user authentication and access control."},
     {"name": "logs", "description": "Retrieve and analyze system logs."},
+    {"name": "codes", "description": "Look up the reference codes used in errors and logs."},
 ]
 
 
 @asynccontextmanager
-async def lifespan(_: FastAPI):
+async def lifespan(application: FastAPI):
     """
     Context manager for application lifespan.
-    Ensures proper cleanup of resources such as database connections.
+    Runs the one-shot initialization that used to happen at import time (database setup,
+    config cache, ref code catalog) and ensures proper cleanup of resources such as
+    database connections.
     """
+    ensure_database()
+    config_cache.load()
+    api_key_cache.load()
+    application.description = API_DESCRIPTION.format(ref_code_count=len(codes_catalog.snapshot().codes))
+    system_sampler.start()
+    await job_scheduler.start()
     yield  # Yield control to the application startup
+    await job_scheduler.stop()
+    system_sampler.stop()
+    await close_shared_backend()
+    await async_engine.dispose()
     engine.dispose()
 
 app = FastAPI(
     title="HomeOps API",
     summary="HomeOpsAPI provides a powerful and efficient interface for managing homelab environments.",
     version="0.1.6-beta",
-    description=API_DESCRIPTION,
+    description=API_DESCRIPTION.format(ref_code_count="..."),
     contact={"name": "HomeOps Team", "email": "homeops-api@googlegroups.com"},
     license_info={"name": "Apache 2.0", "identifier": "Apache-2.0"},
     openapi_tags=OPENAPI_TAGS,
@@ -91,25 +120,22 @@ def get_root():
 
 
 app.include_router(config_router, tags=["config"])
+app.include_router(api_keys_router, tags=["security"])
 app.include_router(users_router, tags=["users"])
-
-# WEB UI
-templates = Jinja2Templates(directory="pages")
-
-
-@app.get(
-        "/codes",
-        response_class=HTMLResponse,
-        tags=["web"],
-        include_in_schema=False,
-        summary="Codes Page",
-        description="Displays an HTML page with codes."
-)
-async def codes_page(request: Request):
-    if not codes:
-        return HTMLResponse(content="<h2>No codes available.</h2>", status_code=404)
-
-    return templates.TemplateResponse(
-            "codes.html", {"request": request, "codes": codes}
-    )
-
+app.include_router(logs_router, tags=["logs"])
+app.include_router(metrics_router, tags=["monitoring"])
+app.include_router(monitoring_router, tags=["monitoring"])
+app.include_router(profiling_router, tags=["monitoring"])
+app.include_router(automation_router, tags=["automation"])
+app.include_router(services_router, tags=["services"])
+app.include_router(storage_router, tags=["storage"])
+
+# Innermost first: metrics time the routed request (cache hits are counted by the cache itself),
+# and RequestContextMiddleware wraps everything so replays carry a fresh request id
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ResponseCacheMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+# WEB UI and ref code catalog
+app.include_router(codes_router)
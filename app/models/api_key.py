@@ -0,0 +1,15 @@
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class ApiKeyRole(str, Enum):
+    admin = "admin"
+    user = "user"
+
+
+class ApiKeyCreate(BaseModel):
+    role: ApiKeyRole
+    name: str = Field("", max_length=255)
+    expires_in_days: Optional[int] = Field(None, ge=1)
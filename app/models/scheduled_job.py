@@ -0,0 +1,23 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class TriggerType(str, Enum):
+    interval = "interval"
+    cron = "cron"
+
+
+class TaskType(str, Enum):
+    command = "command"
+    http = "http"
+
+
+class JobCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=255)
+    trigger_type: TriggerType
+    # Seconds for an interval trigger, a five-field expression for a cron trigger
+    trigger: str = Field(..., min_length=1, max_length=255)
+    task_type: TaskType
+    task: dict
+    enabled: bool = True
@@ -0,0 +1,86 @@
+"""
+Five-field cron expressions: minute hour day-of-month month day-of-week.
+
+Fields take *, numbers, ranges (1-5), steps (*/15, 10-50/10) and comma separated lists
+of those; months and weekdays also take names (jan, mon). Day of week is 0-7 with both
+0 and 7 meaning Sunday. As in cron, when both day fields are restricted (don't start
+with *) a day matches if either does. Times are local.
+"""
+from datetime import datetime, timedelta
+
+FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 7))
+NAMES = {
+    "month": {name: number for number, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1)},
+    "weekday": {name: number for number, name in enumerate(("sun", "mon", "tue", "wed", "thu", "fri", "sat"))},
+}
+# Longest search for a matching time; an expression like "0 0 31 2 *" never matches
+MAX_YEARS = 5
+
+
+def _value(field, token):
+    token = token.lower()
+    return NAMES.get(field, {}).get(token, None) if not token.isdigit() else int(token)
+
+
+def parse_field(field, text, low, high):
+    values = set()
+    for part in text.split(","):
+        expression, _, step = part.partition("/")
+        step = int(step) if step else 1
+        if expression == "*":
+            start, end = low, high
+        elif "-" in expression:
+            start, end = (_value(field, token) for token in expression.split("-", 1))
+        else:
+            start = _value(field, expression)
+            end = high if step > 1 else start
+        if start is None or end is None or step < 1 or not low <= start <= end <= high:
+            raise ValueError(f"Invalid {field} field '{text}'")
+        values.update(range(start, end + 1, step))
+    if field == "weekday" and 7 in values:
+        values.discard(7)
+        values.add(0)
+    return values
+
+
+class CronExpression:
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression '{expression}' must have 5 fields")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            parse_field(name, text, low, high) for (name, low, high), text in zip(FIELDS, parts))
+        # As in cron, a field starting with * (*, */2) counts as unrestricted, even when its
+        # values end up a subset
+        self.day_restricted = not parts[2].startswith("*")
+        self.weekday_restricted = not parts[4].startswith("*")
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        # datetime.weekday() counts from Monday
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return day or weekday
+        return day and weekday
+
+    def next_after(self, timestamp: float) -> float:
+        """First matching minute strictly after timestamp, as a UNIX timestamp"""
+        moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + MAX_YEARS
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+                continue
+            if moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+                continue
+            return moment.timestamp()
+        raise ValueError(f"Cron expression '{self.expression}' never matches")
@@ -0,0 +1,314 @@
+"""
+In-process job scheduler.
+
+Every worker runs a Scheduler, but only the one holding the DB lease (scheduler_lease
+row, renewed every LEASE_RENEW seconds, expiring after LEASE_TTL) fires jobs. If the
+leader dies its lease runs out and another worker takes over within LEASE_TTL.
+
+The leader keeps each enabled job's next fire time in a heap of
+(time, sequence, job id, generation) entries, so scheduling is O(log n) and the timer
+loop sleeps until the earliest entry instead of scanning jobs. Changing or removing a
+job bumps its generation, leaving its old heap entry to be dropped when it surfaces.
+Jobs changed through another worker are picked up when the leader sees the jobs
+version (a change counter bumped with every job insert, update and delete) move.
+
+Runs go through a pool of SCHEDULER_MAX_WORKERS concurrent tasks. A job whose previous
+run is still going when it is due again is not started; an "overrun" run is recorded
+instead. Fire times missed while busy or without a leader are skipped, not caught up.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+from app.core.logger import logger
+from app.server.automation.cron import CronExpression
+from app.server.automation.tasks import run_task, validate_task
+from app.utils.db.config import get_config_value_async
+from app.utils.db.jobs import (DEFAULT_RUN_HISTORY, acquire_lease, jobs_version, load_jobs, record_run,
+                               release_lease)
+
+TRIGGER_TYPES = ("interval", "cron")
+LEASE_TTL = 15.0
+LEASE_RENEW = 5.0
+DEFAULT_MAX_WORKERS = 4
+MIN_INTERVAL = 1.0
+
+
+class IntervalTrigger:
+    def __init__(self, seconds: str):
+        try:
+            self.seconds = float(seconds)
+        except ValueError:
+            raise ValueError(f"Interval '{seconds}' is not a number of seconds")
+        if not self.seconds >= MIN_INTERVAL:
+            raise ValueError(f"Interval must be at least {MIN_INTERVAL:g} second")
+
+    def next_after(self, timestamp: float) -> float:
+        return timestamp + self.seconds
+
+
+def build_trigger(trigger_type: str, trigger: str):
+    """
+    Raises:
+        ValueError: If the trigger is invalid
+    """
+    if trigger_type == "interval":
+        return IntervalTrigger(trigger)
+    if trigger_type == "cron":
+        return CronExpression(trigger)
+    raise ValueError(f"Trigger type must be one of {', '.join(TRIGGER_TYPES)}")
+
+
+def validate_job(values: dict) -> None:
+    """
+    Raises:
+        ValueError: If the job's trigger or task is invalid
+    """
+    # A cron expression can parse and still never match, e.g. "0 0 31 2 *"
+    build_trigger(values["trigger_type"], values["trigger"]).next_after(time.time())
+    validate_task(values["task_type"], values["task"])
+
+
+class ScheduledEntry:
+    __slots__ = ("job", "trigger", "generation", "next_at")
+
+    def __init__(self, job: dict, trigger, generation: int, next_at: float):
+        self.job = job
+        self.trigger = trigger
+        self.generation = generation
+        self.next_at = next_at
+
+
+def _definition(job: dict) -> tuple:
+    return job["trigger_type"], job["trigger"], job["task_type"], job["task"], job["enabled"]
+
+
+class Scheduler:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.max_workers = DEFAULT_MAX_WORKERS
+        self.run_history = DEFAULT_RUN_HISTORY
+        self._entries: dict[int, ScheduledEntry] = {}
+        self._heap = []
+        self._sequence = itertools.count()
+        self._generations = itertools.count(1)
+        self._running: set = set()
+        self._run_tasks: set = set()
+        self._loops = []
+        self._version = None
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        if self._loops:
+            return
+        self.max_workers = int(await get_config_value_async("SCHEDULER_MAX_WORKERS", default=DEFAULT_MAX_WORKERS))
+        self.run_history = int(await get_config_value_async("SCHEDULER_RUN_HISTORY", default=DEFAULT_RUN_HISTORY))
+        self._wake = asyncio.Event()
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._loops = [asyncio.create_task(self._lease_loop(), name="scheduler-lease"),
+                       asyncio.create_task(self._timer_loop(), name="scheduler-timer")]
+
+    async def stop(self):
+        if not self._loops:
+            return
+        tasks = self._loops + list(self._run_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loops = []
+        if self.is_leader:
+            try:
+                await release_lease(self.owner)
+            except Exception as e:
+                logger.warning(f"Scheduler lease release failed: {e}")
+        self._lose_leadership()
+
+    # Leadership
+
+    async def _lease_loop(self):
+        while True:
+            try:
+                acquired = await acquire_lease(self.owner, LEASE_TTL)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Can't tell whether the lease still holds, so stop firing until it is renewed
+                logger.warning(f"Scheduler lease renewal failed: {e}")
+                acquired = False
+            if acquired:
+                if not self.is_leader:
+                    self.is_leader = True
+                    logger.info(f"Scheduler leader is now {self.owner}")
+                try:
+                    if await jobs_version() != self._version:
+                        await self.reload()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Leadership is kept; the version is unchanged, so the next renewal retries
+                    logger.warning(f"Scheduler reload failed: {e}")
+            elif self.is_leader:
+                logger.warning(f"Scheduler lease lost by {self.owner}")
+                self._lose_leadership()
+            await asyncio.sleep(LEASE_RENEW)
+
+    def _lose_leadership(self):
+        self.is_leader = False
+        self._entries.clear()
+        self._heap.clear()
+        self._version = None
+
+    async def reload(self):
+        """Bring the heap in line with the job table; unchanged jobs keep their next fire time"""
+        version = await jobs_version()
+        jobs = await load_jobs()
+        if not self.is_leader:
+            return
+        ids = {job["id"] for job in jobs}
+        for job_id in [job_id for job_id in self._entries if job_id not in ids]:
+            self.remove(job_id)
+        for job in jobs:
+            self.apply(job)
+        self._version = version
+        logger.info(f"Scheduler loaded {len(self._entries)} enabled jobs of {len(jobs)}")
+
+    # Timer queue
+
+    def apply(self, job: dict) -> None:
+        """(Re)schedule a created or updated job; no-op unless this worker is the leader"""
+        if not self.is_leader:
+            return
+        entry = self._entries.get(job["id"])
+        if entry is not None and _definition(entry.job) == _definition(job):
+            entry.job = job
+            return
+        self.remove(job["id"])
+        if not job["enabled"]:
+            return
+        try:
+            trigger = build_trigger(job["trigger_type"], job["trigger"])
+            next_at = trigger.next_after(time.time())
+        except ValueError as e:
+            logger.warning(f"Job {job['id']} ({job['name']}) not scheduled: {e}")
+            return
+        entry = ScheduledEntry(job, trigger, next(self._generations), next_at)
+        self._entries[job["id"]] = entry
+        self._push(entry)
+
+    def remove(self, job_id: int) -> None:
+        """Unschedule a job; its heap entry goes stale and is skipped"""
+        self._entries.pop(job_id, None)
+
+    def _push(self, entry: ScheduledEntry) -> None:
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            # Mostly stale entries of changed or removed jobs; rebuild from the live ones
+            self._heap = [(live.next_at, next(self._sequence), job_id, live.generation)
+                          for job_id, live in self._entries.items() if live is not entry]
+            heapq.heapify(self._heap)
+        heap_entry = (entry.next_at, next(self._sequence), entry.job["id"], entry.generation)
+        if not self._heap or heap_entry < self._heap[0]:
+            heapq.heappush(self._heap, heap_entry)
+            self._wake.set()  # new earliest entry, shorten the sleep
+        else:
+            heapq.heappush(self._heap, heap_entry)
+
+    async def _timer_loop(self):
+        while True:
+            self._wake.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                due_at, _, job_id, generation = heapq.heappop(self._heap)
+                entry = self._entries.get(job_id)
+                if entry is None or entry.generation != generation:
+                    continue
+                self._fire(entry.job, due_at, manual=False)
+                try:
+                    following = entry.trigger.next_after(due_at)
+                    if following <= now:
+                        following = entry.trigger.next_after(now)
+                except ValueError as e:
+                    logger.warning(f"Job {job_id} ({entry.job['name']}) unscheduled: {e}")
+                    self.remove(job_id)
+                    continue
+                entry.next_at = following
+                self._push(entry)
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    # Runs
+
+    def _fire(self, job: dict, scheduled_at: float, manual: bool) -> bool:
+        """:return: False if the job's previous run is still going (recorded as an overrun)"""
+        if job["id"] in self._running:
+            self._spawn(self._record(job, {"scheduled_at": scheduled_at, "status": "overrun", "manual": manual,
+                                           "detail": "Previous run still in progress"}))
+            return False
+        self._running.add(job["id"])
+        self._spawn(self._execute(job, scheduled_at, manual))
+        return True
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._run_tasks.add(task)
+        task.add_done_callback(self._run_tasks.discard)
+
+    async def _execute(self, job: dict, scheduled_at: float, manual: bool):
+        try:
+            async with self._workers:
+                started_at = time.time()
+                try:
+                    status, detail = await run_task(job["task_type"], job["task"])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    status, detail = "failed", f"Task error: {e}"
+                finished_at = time.time()
+        finally:
+            self._running.discard(job["id"])
+        if status != "ok":
+            logger.warning(f"Job {job['id']} ({job['name']}) {status}")
+        await self._record(job, {"scheduled_at": scheduled_at, "started_at": started_at,
+                                 "finished_at": finished_at, "status": status, "manual": manual, "detail": detail})
+
+    async def _record(self, job: dict, run: dict):
+        try:
+            await record_run({"job_id": job["id"], **run}, keep=self.run_history)
+        except Exception as e:
+            logger.error(f"Could not record run of job {job['id']}: {e}")
+
+    def run_now(self, job: dict) -> bool:
+        """
+        Start a manual run in this worker, leader or not.
+        :return: False if a run of the job is already going in this worker
+        """
+        if job["id"] in self._running:
+            return False
+        return self._fire(job, time.time(), manual=True)
+
+    def next_run(self, job_id: int) -> Optional[float]:
+        """Next fire time of a job, known only to the leader"""
+        entry = self._entries.get(job_id)
+        return entry.next_at if entry is not None else None
+
+    def status(self) -> dict:
+        return {
+            "owner": self.owner,
+            "leader": self.is_leader,
+            "scheduled_jobs": len(self._entries) if self.is_leader else None,
+            "next_run": min((entry.next_at for entry in self._entries.values()), default=None),
+            "running": len(self._running),
+            "max_workers": self.max_workers,
+        }
+
+
+job_scheduler = Scheduler()
@@ -0,0 +1,112 @@
+"""
+What a scheduled job runs: a subprocess ("command") or an HTTP request ("http").
+
+Tasks are JSON objects, checked by validate_task() when a job is saved:
+    {"command": ["/usr/bin/backup", "--quick"], "timeout": 600}
+    {"url": "http://localhost:9000/hook", "method": "POST", "body": "...", "headers": {...}, "timeout": 30}
+"""
+import asyncio
+import urllib.error
+import urllib.request
+
+from anyio import to_thread
+
+from app.core.metrics import SUBPROCESSES
+
+TASK_TYPES = ("command", "http")
+DEFAULT_TIMEOUT = 300
+HTTP_METHODS = ("GET", "POST", "PUT", "PATCH", "DELETE", "HEAD")
+# Characters of output / response body kept in a run's detail
+DETAIL_LIMIT = 2000
+# Bytes read from a command's output at a time
+READ_CHUNK = 64 * 1024
+
+
+def validate_task(task_type: str, task: dict) -> None:
+    """
+    Raises:
+        ValueError: If the task can't be run
+    """
+    if task_type not in TASK_TYPES:
+        raise ValueError(f"Task type must be one of {', '.join(TASK_TYPES)}")
+    timeout = task.get("timeout", DEFAULT_TIMEOUT)
+    if not isinstance(timeout, (int, float)) or isinstance(timeout, bool) or timeout <= 0:
+        raise ValueError("Task timeout must be a positive number of seconds")
+    if task_type == "command":
+        command = task.get("command")
+        if not command or not isinstance(command, list) or not all(isinstance(arg, str) for arg in command):
+            raise ValueError("Command task needs 'command', a non-empty list of strings")
+    else:
+        url = task.get("url")
+        if not isinstance(url, str) or not url.startswith(("http://", "https://")):
+            raise ValueError("HTTP task needs an http:// or https:// 'url'")
+        if task.get("method", "GET").upper() not in HTTP_METHODS:
+            raise ValueError(f"HTTP method must be one of {', '.join(HTTP_METHODS)}")
+        if not isinstance(task.get("headers", {}), dict) or not isinstance(task.get("body", ""), str):
+            raise ValueError("HTTP 'headers' must be an object and 'body' a string")
+
+
+async def read_tail(stream: asyncio.StreamReader, limit: int = DETAIL_LIMIT) -> str:
+    """
+    Read a stream to EOF keeping only its last `limit` characters, so a chatty command
+    can't grow memory with its output.
+    """
+    tail = bytearray()
+    keep = limit * 4  # bytes of at most `limit` UTF-8 characters
+    while chunk := await stream.read(READ_CHUNK):
+        tail += chunk
+        if len(tail) > keep:
+            del tail[:-keep]
+    return tail.decode(errors="replace")[-limit:]
+
+
+async def run_command(task: dict) -> tuple:
+    """:return: (status, detail); the process is killed on timeout or cancellation"""
+    timeout = task.get("timeout", DEFAULT_TIMEOUT)
+    with SUBPROCESSES.time(("scheduler",)):
+        try:
+            process = await asyncio.create_subprocess_exec(*task["command"], stdin=asyncio.subprocess.DEVNULL,
+                                                           stdout=asyncio.subprocess.PIPE,
+                                                           stderr=asyncio.subprocess.STDOUT)
+        except OSError as e:
+            return "failed", f"Could not start command: {e}"
+        try:
+            detail, _ = await asyncio.wait_for(asyncio.gather(read_tail(process.stdout), process.wait()), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            process.kill()
+            await process.wait()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return "timeout", f"Killed after {timeout}s"
+    if process.returncode != 0:
+        return "failed", f"Exit status {process.returncode}\n{detail}"
+    return "ok", detail
+
+
+def _http_request(task: dict) -> tuple:
+    body = task.get("body")
+    request = urllib.request.Request(task["url"], data=body.encode() if body else None,
+                                     headers=task.get("headers", {}), method=task.get("method", "GET").upper())
+    try:
+        with urllib.request.urlopen(request, timeout=task.get("timeout", DEFAULT_TIMEOUT)) as response:
+            return "ok", f"HTTP {response.status}\n{response.read(DETAIL_LIMIT).decode(errors='replace')}"
+    except urllib.error.HTTPError as e:
+        return "failed", f"HTTP {e.code}\n{e.read(DETAIL_LIMIT).decode(errors='replace')}"
+    except TimeoutError:
+        return "timeout", f"No response within {task.get('timeout', DEFAULT_TIMEOUT)}s"
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, "reason", e)
+        if isinstance(reason, TimeoutError):
+            return "timeout", f"No response within {task.get('timeout', DEFAULT_TIMEOUT)}s"
+        return "failed", f"Request failed: {reason}"
+
+
+async def run_http(task: dict) -> tuple:
+    """:return: (status, detail); urllib blocks, so the request runs in a worker thread"""
+    return await to_thread.run_sync(_http_request, task)
+
+
+async def run_task(task_type: str, task: dict) -> tuple:
+    if task_type == "command":
+        return await run_command(task)
+    return await run_http(task)
@@ -0,0 +1,126 @@
+"""
+Rendered /codes page and /codes.json body, rebuilt only when the ref code catalog changes.
+
+Both bodies are kept with gzip (and brotli, when installed) variants, a strong ETag per
+variant and a Last-Modified taken from the newest catalog file, so conditional requests
+are answered with 304 without rendering or compressing anything.
+"""
+import gzip
+import hashlib
+import threading
+from bisect import bisect_left
+from email.utils import formatdate, parsedate_to_datetime
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.templating import Jinja2Templates
+
+from app.utils.codes.load_codes import catalog_signature, get_codes
+from app.utils.encoding import dumps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+templates = Jinja2Templates(directory="pages")
+
+
+def choose_encoding(accept_encoding: str, available):
+    """Preferred content coding of the request that we have a variant for"""
+    accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+    for encoding in ("br", "gzip"):
+        if encoding in accepted and encoding in available:
+            return encoding
+    return "identity"
+
+
+class CachedBody:
+    """Response body with precompressed variants and validators"""
+
+    def __init__(self, content: bytes, media_type: str, mtime: float):
+        self.media_type = media_type
+        self.variants = {"identity": content, "gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(content)
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        # Strong validators must differ between representations
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.variants}
+        self.mtime = int(mtime)
+        self.last_modified = formatdate(self.mtime, usegmt=True)
+
+    def not_modified(self, request: Request, etag: str) -> bool:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return if_none_match.strip() == "*" or etag in {tag.strip() for tag in if_none_match.split(",")}
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return parsedate_to_datetime(if_modified_since).timestamp() >= self.mtime
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def response(self, request: Request) -> Response:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        headers = {
+            "ETag": self.etags[encoding],
+            "Last-Modified": self.last_modified,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if self.not_modified(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+class CatalogSnapshot:
+    def __init__(self, codes: dict, page: CachedBody, json: CachedBody):
+        self.codes = codes
+        self.page = page
+        self.json = json
+        self.sorted_codes = sorted(codes)
+
+    def lookup(self, prefix: str) -> dict:
+        """Codes starting with prefix (e.g. AUTH, DB0, API01_LIMIT), in code order"""
+        start = bisect_left(self.sorted_codes, prefix)
+        matches = {}
+        for code in self.sorted_codes[start:]:
+            if not code.startswith(prefix):
+                break
+            matches[code] = self.codes[code]
+        return matches
+
+
+class CodesCatalog:
+    """Snapshot of the rendered catalog, rebuilt when catalog_signature() changes"""
+
+    def __init__(self, template_name: str = "codes.html"):
+        self.template_name = template_name
+        self._snapshot = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _build(self, signature) -> CatalogSnapshot:
+        codes = get_codes()
+        mtime = max((file_mtime for _, file_mtime, _ in signature), default=0) / 1e9
+        html = templates.get_template(self.template_name).render(codes=codes).encode("utf-8")
+        ordered = {code: codes[code] for code in sorted(codes)}
+        return CatalogSnapshot(codes, CachedBody(html, "text/html; charset=utf-8", mtime),
+                               CachedBody(dumps(ordered), "application/json", mtime))
+
+    def snapshot(self) -> CatalogSnapshot:
+        signature = catalog_signature()
+        if self._snapshot is not None and signature == self._signature:
+            return self._snapshot
+
+        with self._lock:
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = self._build(signature)
+                self._signature = signature
+            return self._snapshot
+
+
+codes_catalog = CodesCatalog()
@@ -0,0 +1,162 @@
+"""
+Live feed of homeops.log lines for /logs/stream.
+
+One LogWatcher per process polls the file and fans new lines out to every subscriber,
+so the file is read once however many clients follow it. Each subscriber has a bounded
+queue: a client that can't keep up loses lines (and is told how many) instead of
+growing memory. The watcher runs while there is at least one subscriber.
+
+Rotation: TimedRotatingFileHandler renames the file and opens a new one. When the path
+points at a different inode, the watcher reads what is left of the old file through its
+open handle, then switches to the new file from the start. A file that shrinks in place
+(truncation) is read again from the start.
+"""
+import asyncio
+import os
+
+from app.core.logger import file_handler, logger
+
+POLL_INTERVAL = 0.25
+# Most bytes read per poll, so a burst of logging doesn't stall the event loop
+MAX_READ = 1024 * 1024
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Seconds without lines before an SSE comment is sent, so proxies keep the connection open
+KEEPALIVE_INTERVAL = 15.0
+# Queued lines sent in one chunk
+EVENT_BATCH = 100
+
+
+class Subscription:
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, lines):
+        for line in lines:
+            try:
+                self.queue.put_nowait(line)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def take_dropped(self):
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+
+class LogWatcher:
+    def __init__(self, path: str = None, poll_interval: float = POLL_INTERVAL):
+        self.path = path or file_handler.baseFilename
+        self.poll_interval = poll_interval
+        self.subscribers = set()
+        self._task = None
+        self._file = None
+        self._inode = None
+        self._partial = b""
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription()
+        self.subscribers.add(subscription)
+        if self._task is None:
+            self._open(from_end=True)
+            self._task = asyncio.get_running_loop().create_task(self._watch())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscribers.discard(subscription)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._close()
+
+    def _open(self, from_end: bool) -> None:
+        self._close()
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        if from_end:
+            self._file.seek(0, os.SEEK_END)
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._partial = b""
+
+    def _read_new(self) -> list:
+        """Complete lines appended since the last read"""
+        data = self._file.read(MAX_READ)
+        if not data:
+            return []
+        data = self._partial + data
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        return [line.decode("utf-8", errors="replace") for line in lines]
+
+    def poll(self) -> list:
+        if self._file is None:
+            self._open(from_end=False)
+            return self._read_new() if self._file is not None else []
+        lines = self._read_new()
+        if lines:
+            return lines
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self._inode:
+            # Rotated and the old file is drained: continue with the new one
+            partial = self._partial
+            self._open(from_end=False)
+            lines = [partial.decode("utf-8", errors="replace")] if partial else []
+            return lines + (self._read_new() if self._file is not None else [])
+        if stat.st_size < self._file.tell():
+            self._file.seek(0)
+            self._partial = b""
+        return []
+
+    async def _watch(self):
+        while True:
+            try:
+                lines = self.poll()
+            except OSError as e:
+                logger.warning(f"Log stream read failed: {e}")
+                lines = []
+            if lines:
+                for subscription in self.subscribers:
+                    subscription.push(lines)
+                # More may be waiting after a capped read
+                await asyncio.sleep(0)
+            else:
+                await asyncio.sleep(self.poll_interval)
+
+
+log_watcher = LogWatcher()
+
+
+async def log_events(watcher: LogWatcher = None):
+    """
+    Server-Sent Events of new log lines, one `data:` event per line. Lines lost to a full
+    queue are reported as a `dropped` event with their count.
+    """
+    watcher = watcher or log_watcher
+    subscription = watcher.subscribe()
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                line = await asyncio.wait_for(subscription.queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            lines = [line]
+            while len(lines) < EVENT_BATCH and not subscription.queue.empty():
+                lines.append(subscription.queue.get_nowait())
+            events = "".join(f"data: {line}\n\n" for line in lines)
+            dropped = subscription.take_dropped()
+            if dropped:
+                events = f"event: dropped\ndata: {dropped}\n\n" + events
+            yield events
+    finally:
+        watcher.unsubscribe(subscription)
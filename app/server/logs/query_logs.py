@@ -0,0 +1,59 @@
+from fastapi import status
+
+from app.core.logger import logger, structured_handler
+from app.core.structured_log import read_block
+from app.exceptions.global_exception import GlobalHTTPException
+
+
+def _matches(record, code, level, start, end):
+    if code and record.get("code") != code:
+        return False
+    if level and record.get("level") != level:
+        return False
+    if start is not None and record["ts"] < start:
+        return False
+    if end is not None and record["ts"] > end:
+        return False
+    return True
+
+
+def query_logs(code=None, level=None, start=None, end=None, limit=100):
+    """
+    Most recent structured log records matching the filters, newest first.
+    Only the blocks the per-file index lists for the code / time range are read; the index
+    is shared by the workers, so records of every worker are found.
+    """
+    if structured_handler is None:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="Structured Log Disabled",
+            detail="The structured log sink is not enabled.",
+            code="LOG01_DISABLED"
+        )
+
+    logger.debug(f"Querying logs code={code} level={level} start={start} end={end}")
+    results = []
+    for path in structured_handler.log_files():
+        index = structured_handler.index_for(path)
+        if start is not None and index.max_ts is not None and index.max_ts < start:
+            # Nothing in this file is recent enough, and older backups only get older
+            break
+        for block in reversed(index.candidate_blocks(code, start, end)):
+            try:
+                records = read_block(path, block)
+            except OSError:
+                logger.warning(f"Log file {path} not readable")
+                break
+            for record in reversed(records):
+                if _matches(record, code, level, start, end):
+                    results.append(record)
+                    if len(results) >= limit:
+                        return results
+    return results
+
+
+def get_code_counts():
+    """Per ref code record counts of every structured log file"""
+    if structured_handler is None:
+        return {}
+    return {path: structured_handler.index_for(path).counts for path in structured_handler.log_files()}
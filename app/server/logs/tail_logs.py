@@ -0,0 +1,54 @@
+import os
+
+from app.core.logger import file_handler
+
+# Bytes read per backward step; most log lines are well under 200 bytes
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def log_files(handler=file_handler):
+    """Current file first, then rotated backups newest first"""
+    directory, base = os.path.split(handler.baseFilename)
+    backups = sorted((name for name in os.listdir(directory or ".")
+                      if name.startswith(base + ".") and handler.extMatch.match(name[len(base) + 1:])),
+                     reverse=True)
+    return [handler.baseFilename] + [os.path.join(directory, name) for name in backups]
+
+
+def tail_file(path, count, block_size=TAIL_BLOCK_SIZE):
+    """
+    Last `count` lines of a file, read in blocks backwards from the end, so the cost
+    depends on the lines returned rather than the file size
+    """
+    if count <= 0:
+        return []
+    with open(path, "rb") as file:
+        position = file.seek(0, os.SEEK_END)
+        chunks = []
+        newlines = 0
+        # One newline more than lines wanted, so the first (partial) line can be dropped
+        while position > 0 and newlines <= count:
+            size = min(block_size, position)
+            position -= size
+            file.seek(position)
+            chunk = file.read(size)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    lines = b"".join(reversed(chunks)).splitlines()
+    if position > 0:
+        lines = lines[1:]
+    return [line.decode("utf-8", errors="replace") for line in lines[-count:]]
+
+
+def tail_logs(count):
+    """Last `count` lines of homeops.log, continuing into the newest backups if it is shorter"""
+    lines = []
+    for path in log_files():
+        try:
+            lines = tail_file(path, count - len(lines)) + lines
+        except FileNotFoundError:
+            # Rotated away between listing and opening
+            continue
+        if len(lines) >= count:
+            break
+    return lines
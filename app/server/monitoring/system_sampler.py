@@ -0,0 +1,335 @@
+"""
+Background sampler of host CPU, memory and load, with history kept in ring buffers.
+
+One process per host samples: every worker's sampler thread tries a non-blocking flock
+on SAMPLER_LOCK_FILE, and only the holder reads /proc. It writes into HISTORY_FILE, a
+memory-mapped file of fixed-size float64 columns (a timestamp column plus one per
+series) that every worker maps, so /monitoring is answered from memory in any worker.
+If the sampling worker exits its lock is released and another worker takes over within
+one interval.
+
+The write counter in the header is bumped after a sample's slots are written. Readers
+only look at slots below it and skip the oldest slot of a full buffer, the one the next
+sample overwrites.
+"""
+import fcntl
+import mmap
+import os
+import struct
+import threading
+import time
+from bisect import bisect_left
+
+from app.core.logger import logger
+from app.utils.db.config import get_config_value
+
+HISTORY_FILE = "homeops.metrics"
+SAMPLER_LOCK_FILE = "homeops.metrics.lock"
+DEFAULT_INTERVAL = 5.0
+# Shorter intervals would keep a core busy reading /proc (0 would spin)
+MIN_INTERVAL = 0.1
+# 24 hours at the default interval
+DEFAULT_HISTORY = 17280
+
+SERIES = ("cpu_percent", "iowait_percent", "load1", "load5", "load15",
+          "mem_used_percent", "mem_available_bytes", "swap_used_percent")
+
+MAGIC = b"HOMEOPS\x01"
+# magic, series count, capacity, interval, samples written, sampler pid
+HEADER = struct.Struct("<8sIIdQQ")
+HEADER_SIZE = 64
+WRITTEN_OFFSET = 24
+
+
+def read_cpu_times(path="/proc/stat"):
+    """:return: (busy, iowait, total) jiffies of the aggregate cpu line"""
+    with open(path, "rb") as file:
+        fields = [int(value) for value in file.readline().split()[1:]]
+    # user nice system idle iowait irq softirq steal (guest time is already in user/nice)
+    total = sum(fields[:8])
+    idle, iowait = fields[3], fields[4]
+    return total - idle - iowait, iowait, total
+
+
+def read_meminfo(path="/proc/meminfo"):
+    """:return: dict of the meminfo fields we use, in bytes"""
+    wanted = {b"MemTotal:", b"MemAvailable:", b"SwapTotal:", b"SwapFree:"}
+    values = {}
+    with open(path, "rb") as file:
+        for line in file:
+            name, value = line.split(None, 2)[:2]
+            if name in wanted:
+                values[name[:-1].decode()] = int(value) * 1024
+                if len(values) == len(wanted):
+                    break
+    return values
+
+
+def read_loadavg(path="/proc/loadavg"):
+    with open(path, "rb") as file:
+        return tuple(float(value) for value in file.read().split()[:3])
+
+
+class ProcReader:
+    """Turns consecutive /proc readings into one value per SERIES"""
+
+    def __init__(self):
+        self._cpu = read_cpu_times()
+
+    def sample(self) -> tuple:
+        busy, iowait, total = cpu = read_cpu_times()
+        previous_busy, previous_iowait, previous_total = self._cpu
+        self._cpu = cpu
+        elapsed = total - previous_total
+        cpu_percent = 100.0 * (busy - previous_busy) / elapsed if elapsed else 0.0
+        iowait_percent = 100.0 * (iowait - previous_iowait) / elapsed if elapsed else 0.0
+
+        memory = read_meminfo()
+        mem_total = memory.get("MemTotal", 0)
+        mem_available = memory.get("MemAvailable", 0)
+        swap_total = memory.get("SwapTotal", 0)
+        mem_used_percent = 100.0 * (mem_total - mem_available) / mem_total if mem_total else 0.0
+        swap_used_percent = 100.0 * (swap_total - memory.get("SwapFree", 0)) / swap_total if swap_total else 0.0
+
+        return (cpu_percent, iowait_percent, *read_loadavg(), mem_used_percent, float(mem_available),
+                swap_used_percent)
+
+
+class SampleHistory:
+    """Memory-mapped ring buffers: column 0 holds timestamps, column i + 1 holds SERIES[i]"""
+
+    def __init__(self, mapping: mmap.mmap, inode: int):
+        self.mapping = mapping
+        self.inode = inode
+        _, series_count, self.capacity, self.interval, _, _ = HEADER.unpack_from(mapping)
+        self.columns = series_count + 1
+        self.values = memoryview(mapping)[HEADER_SIZE:HEADER_SIZE + 8 * self.columns * self.capacity].cast("d")
+
+    @classmethod
+    def create(cls, path: str, capacity: int, interval: float) -> "SampleHistory":
+        """New, empty history file, swapped in atomically so readers never see it half written"""
+        size = HEADER_SIZE + 8 * (len(SERIES) + 1) * capacity
+        temporary = f"{path}.{os.getpid()}"
+        with open(temporary, "wb") as file:
+            file.truncate(size)
+            file.write(HEADER.pack(MAGIC, len(SERIES), capacity, interval, 0, os.getpid()))
+        os.replace(temporary, path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: str):
+        """:return: the mapped history file, None if it doesn't exist or isn't one"""
+        try:
+            with open(path, "r+b") as file:
+                inode = os.fstat(file.fileno()).st_ino
+                mapping = mmap.mmap(file.fileno(), 0)
+        except (OSError, ValueError):
+            return None
+        if len(mapping) < HEADER_SIZE or mapping[:len(MAGIC)] != MAGIC:
+            mapping.close()
+            return None
+        history = cls(mapping, inode)
+        if len(mapping) < HEADER_SIZE + 8 * history.columns * history.capacity:
+            history.close()
+            return None
+        return history
+
+    def close(self):
+        self.values.release()
+        self.mapping.close()
+
+    @property
+    def written(self) -> int:
+        return struct.unpack_from("<Q", self.mapping, WRITTEN_OFFSET)[0]
+
+    @property
+    def sampler_pid(self) -> int:
+        return HEADER.unpack_from(self.mapping)[5]
+
+    def append(self, timestamp: float, values: tuple) -> None:
+        written = self.written
+        slot = written % self.capacity
+        self.values[slot] = timestamp
+        for column, value in enumerate(values, start=1):
+            self.values[column * self.capacity + slot] = value
+        struct.pack_into("<Q", self.mapping, WRITTEN_OFFSET, written + 1)
+
+    def column(self, index: int, count: int, written: int) -> list:
+        """
+        Last `count` values of a column, oldest first, as of `written` samples. Read written
+        once and pass it for every column, so the columns stay aligned.
+        """
+        count = min(count, written, self.capacity - 1)
+        if count <= 0:
+            return []
+        start = index * self.capacity
+        first = (written - count) % self.capacity
+        if first + count <= self.capacity:
+            return self.values[start + first:start + first + count].tolist()
+        return (self.values[start + first:start + self.capacity].tolist()
+                + self.values[start:start + (first + count) % self.capacity].tolist())
+
+
+def slice_bounds(timestamps: list, start: float, end: float, points: int) -> list:
+    """Index of the first sample at or after each of the points + 1 slice edges of [start, end)"""
+    width = (end - start) / points
+    return [bisect_left(timestamps, start + i * width) for i in range(points + 1)]
+
+
+def downsample(values: list, bounds: list) -> list:
+    """min/max/avg of values per slice; None for slices without samples"""
+    slices = []
+    for first, last in zip(bounds, bounds[1:]):
+        window = values[first:last]
+        if window:
+            slices.append({"min": min(window), "max": max(window), "avg": sum(window) / len(window)})
+        else:
+            slices.append({"min": None, "max": None, "avg": None})
+    return slices
+
+
+def configured_interval() -> float:
+    """MONITORING_INTERVAL in seconds, at least MIN_INTERVAL"""
+    value = get_config_value("MONITORING_INTERVAL", default=DEFAULT_INTERVAL)
+    try:
+        interval = float(value)
+    except ValueError:
+        logger.warning(f"MONITORING_INTERVAL '{value}' is not a number of seconds, using {DEFAULT_INTERVAL:g}")
+        return DEFAULT_INTERVAL
+    if not interval >= MIN_INTERVAL:
+        logger.warning(f"MONITORING_INTERVAL {value} is below the minimum, using {MIN_INTERVAL:g}")
+        return MIN_INTERVAL
+    return interval
+
+
+class SystemSampler:
+    """
+    Per-worker thread that samples while it holds the host-wide sampler lock and
+    otherwise retries the lock every interval. Readers go through history().
+    """
+
+    def __init__(self, path: str = HISTORY_FILE, lock_path: str = SAMPLER_LOCK_FILE):
+        self.path = path
+        self.lock_path = lock_path
+        self.interval = DEFAULT_INTERVAL
+        self.capacity = DEFAULT_HISTORY
+        self.is_sampling = False
+        self._history = None
+        self._lock_file = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._history_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.interval = configured_interval()
+        self.capacity = int(get_config_value("MONITORING_HISTORY", default=DEFAULT_HISTORY))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="system-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the flock
+            self._lock_file = None
+        self.is_sampling = False
+
+    def _try_lock(self) -> bool:
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _open_for_writing(self) -> "SampleHistory":
+        history = SampleHistory.open(self.path)
+        if (history is None or history.capacity != self.capacity or history.interval != self.interval
+                or history.columns != len(SERIES) + 1):
+            if history is not None:
+                history.close()
+            history = SampleHistory.create(self.path, self.capacity, self.interval)
+        struct.pack_into("<Q", history.mapping, HEADER.size - 8, os.getpid())
+        return history
+
+    def _run(self):
+        reader = None
+        writer = None
+        while not self._stop.is_set():
+            try:
+                if writer is None and self._try_lock():
+                    writer = self._open_for_writing()
+                    reader = ProcReader()
+                    self.is_sampling = True
+                    logger.info(f"System sampler running in pid {os.getpid()} every {self.interval}s")
+                elif writer is not None:
+                    writer.append(time.time(), reader.sample())
+            except (OSError, ValueError) as e:
+                logger.warning(f"System sample failed: {e}")
+            self._stop.wait(self.interval)
+        if writer is not None:
+            writer.close()
+
+    def history(self):
+        """:return: the current history mapping, None while no sampler has created it"""
+        history = self._history
+        try:
+            inode = os.stat(self.path).st_ino
+        except OSError:
+            return None
+        if history is not None and history.inode == inode:
+            return history
+        with self._history_lock:
+            if self._history is None or self._history.inode != inode:
+                # The replaced mapping may still be in use by a concurrent reader, so it is left to the GC
+                self._history = SampleHistory.open(self.path)
+            return self._history
+
+    def current(self):
+        """:return: the newest sample as a dict, None if there is none yet"""
+        history = self.history()
+        written = history.written if history is not None else 0
+        if not written:
+            return None
+        sample = {"timestamp": history.column(0, 1, written)[0]}
+        for index, name in enumerate(SERIES, start=1):
+            sample[name] = history.column(index, 1, written)[0]
+        return sample
+
+    def series(self, names: list, window: float, points: int) -> dict:
+        """Downsampled history of the named series over the last `window` seconds"""
+        history = self.history()
+        end = time.time()
+        start = end - window
+        result = {"start": start, "end": end, "step": window / points, "series": {}}
+        if history is None:
+            return result
+        written = history.written
+        count = min(history.capacity, int(window / history.interval) + 2)
+        # Timestamps are in sampling order, so each slice is a contiguous run of samples
+        bounds = slice_bounds(history.column(0, count, written), start, end, points)
+        for name in names:
+            values = history.column(SERIES.index(name) + 1, count, written)
+            result["series"][name] = downsample(values, bounds)
+        return result
+
+    def status(self) -> dict:
+        history = self.history()
+        return {
+            "interval": history.interval if history else self.interval,
+            "capacity": history.capacity if history else self.capacity,
+            "samples": min(history.written, history.capacity - 1) if history else 0,
+            "sampler_pid": history.sampler_pid if history else None,
+            "sampling_here": self.is_sampling,
+        }
+
+
+system_sampler = SystemSampler()
@@ -0,0 +1,111 @@
+"""
+Cached, coalesced view of systemd unit states.
+
+Results of each systemctl call are kept for SERVICES_CACHE_TTL seconds. Concurrent
+requests for a result that isn't cached share one in-flight call instead of each
+spawning systemctl; the call runs in a worker thread.
+"""
+import asyncio
+import time
+from fnmatch import fnmatchcase
+from typing import Optional
+
+from anyio import to_thread
+
+from app.server.services.systemctl import (DEFAULT_SYSTEMCTL, Runner, SystemctlRunner, is_unit_name, list_units,
+                                           show_units)
+from app.utils.db.config import get_config_value
+
+DEFAULT_TTL = 2.0
+UNITS_KEY = "units"
+
+
+class ServiceStatus:
+    """
+    :param runner: Runs systemctl (default SystemctlRunner at SYSTEMCTL_PATH); pass a
+                   callable or fake script for tests
+    """
+
+    def __init__(self, runner: Runner = None, ttl: float = None):
+        self._runner = runner
+        self._ttl = ttl
+        self._results = {}  # key -> (fetched at, value)
+        self._inflight: dict[object, asyncio.Future] = {}
+
+    @property
+    def runner(self) -> Runner:
+        if self._runner is None:
+            self._runner = SystemctlRunner(get_config_value("SYSTEMCTL_PATH", default=DEFAULT_SYSTEMCTL))
+        return self._runner
+
+    @property
+    def ttl(self) -> float:
+        if self._ttl is None:
+            return float(get_config_value("SERVICES_CACHE_TTL", default=DEFAULT_TTL))
+        return self._ttl
+
+    async def _cached(self, key, fetch, refresh: bool = False):
+        now = time.monotonic()
+        cached = self._results.get(key)
+        if not refresh and cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key, fetch))
+            self._inflight[key] = future
+        # Shielded so one caller going away doesn't cancel the call the others wait on
+        return await asyncio.shield(future)
+
+    async def _fetch(self, key, fetch):
+        try:
+            value = await to_thread.run_sync(fetch)
+            now = time.monotonic()
+            # Drop what has expired so per-unit entries don't pile up
+            ttl = self.ttl
+            self._results = {cached_key: cached for cached_key, cached in self._results.items()
+                             if now - cached[0] < ttl}
+            self._results[key] = (now, value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    async def units(self, refresh: bool = False) -> list:
+        """State of every loaded unit"""
+        return await self._cached(UNITS_KEY, lambda: list_units(self.runner), refresh)
+
+    async def query(self, unit_type: Optional[str] = "service", state: Optional[str] = None,
+                    pattern: Optional[str] = None, details: bool = False, refresh: bool = False) -> list:
+        """
+        Units filtered by type (the unit name suffix, None for all), state (matching the
+        load, active or sub state) and a glob pattern on the name; with details, merged with
+        their `systemctl show` properties, fetched in one batched call.
+        """
+        units = await self.units(refresh)
+        suffix = f".{unit_type}" if unit_type else None
+        selected = [unit for unit in units
+                    if (suffix is None or unit["unit"].endswith(suffix))
+                    and (state is None or state in (unit["load"], unit["active"], unit["sub"]))
+                    and (pattern is None or fnmatchcase(unit["unit"], pattern))]
+        if details and selected:
+            names = tuple(unit["unit"] for unit in selected)
+            shown = await self._cached(("show", names), lambda: show_units(self.runner, list(names)), refresh)
+            selected = [{**unit, **shown.get(unit["unit"], {})} for unit in selected]
+        return selected
+
+    async def unit(self, name: str, refresh: bool = False) -> Optional[dict]:
+        """Details of one unit (a name without a type is a service), None if systemd doesn't know it"""
+        if not is_unit_name(name):
+            return None
+        if "." not in name:
+            name = f"{name}.service"
+        shown = await self._cached(("show", (name,)), lambda: show_units(self.runner, [name]), refresh)
+        unit = shown.get(name)
+        if unit is None or unit.get("load") == "not-found":
+            return None
+        return unit
+
+    def invalidate(self) -> None:
+        self._results = {}
+
+
+service_status = ServiceStatus()
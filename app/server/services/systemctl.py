@@ -0,0 +1,133 @@
+"""
+systemctl calls, batched: one `list-units` for the state of every unit and one `show`
+per group of units for their details, instead of one `systemctl status` per unit.
+
+The command is run through a runner, a callable taking the systemctl arguments and
+returning stdout. SystemctlRunner runs the binary at SYSTEMCTL_PATH; any other callable
+(or a fake systemctl script as the path) can stand in for it. Runner failures raise
+GlobalHTTPException SVC01_UNAVAILABLE.
+"""
+import json
+import re
+import subprocess
+from typing import Callable
+
+from fastapi import status
+
+from app.core.logger import logger
+from app.core.metrics import SUBPROCESSES
+from app.exceptions.global_exception import GlobalHTTPException
+
+DEFAULT_SYSTEMCTL = "systemctl"
+DEFAULT_TIMEOUT = 10
+# Units per `systemctl show` call, keeping the command line well under ARG_MAX
+SHOW_BATCH = 256
+UNIT_NAME = re.compile(r"^[A-Za-z0-9:_.@\\-]+$")
+# `systemctl show` property -> field name
+SHOW_PROPERTIES = {
+    "Id": "unit",
+    "Description": "description",
+    "LoadState": "load",
+    "ActiveState": "active",
+    "SubState": "sub",
+    "UnitFileState": "unit_file_state",
+    "FragmentPath": "fragment_path",
+    "MainPID": "main_pid",
+    "ActiveEnterTimestamp": "active_enter_timestamp",
+    "NRestarts": "restarts",
+    "MemoryCurrent": "memory_bytes",
+}
+INT_FIELDS = {"main_pid", "restarts", "memory_bytes"}
+
+Runner = Callable[[list], str]
+
+
+class SystemctlRunner:
+    def __init__(self, path: str = DEFAULT_SYSTEMCTL, timeout: float = DEFAULT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+
+    def __call__(self, args: list) -> str:
+        try:
+            with SUBPROCESSES.time(("systemctl",)):
+                result = subprocess.run([self.path, *args], capture_output=True, text=True, timeout=self.timeout)
+        except FileNotFoundError:
+            detail = f"{self.path} not found"
+        except PermissionError:
+            detail = f"Permission denied running {self.path}"
+        except subprocess.TimeoutExpired:
+            detail = f"{self.path} {args[0]} timed out after {self.timeout}s"
+        else:
+            if result.returncode == 0:
+                return result.stdout
+            detail = f"{self.path} {args[0]} failed: {result.stderr.strip() or f'exit status {result.returncode}'}"
+        logger.error(detail)
+        raise GlobalHTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            title="systemctl Unavailable",
+            detail=detail,
+            code="SVC01_UNAVAILABLE"
+        )
+
+
+def is_unit_name(name: str) -> bool:
+    return bool(UNIT_NAME.match(name)) and not name.startswith("-")
+
+
+def parse_list_units(output: str) -> list:
+    """
+    Units from `list-units --output=json`, or from the plain table older systemd
+    versions print instead of JSON
+    """
+    stripped = output.lstrip()
+    if stripped.startswith("["):
+        return [{"unit": unit["unit"], "load": unit["load"], "active": unit["active"], "sub": unit["sub"],
+                 "description": unit.get("description", "")} for unit in json.loads(stripped)]
+    units = []
+    for line in output.splitlines():
+        fields = line.lstrip("●* ").split(None, 4)
+        if len(fields) >= 4:
+            units.append({"unit": fields[0], "load": fields[1], "active": fields[2], "sub": fields[3],
+                          "description": fields[4] if len(fields) == 5 else ""})
+    return units
+
+
+def _show_value(field: str, value: str):
+    if field in INT_FIELDS:
+        # "[not set]", or an unsigned -1, for values systemd doesn't track
+        return int(value) if value.isdigit() and int(value) < 2 ** 63 else None
+    return value
+
+
+def parse_show(output: str) -> list:
+    """Units from `systemctl show -p ...`, whose blocks are separated by blank lines"""
+    units = []
+    unit = {}
+    for line in output.splitlines() + [""]:
+        if not line.strip():
+            if unit:
+                units.append(unit)
+                unit = {}
+            continue
+        name, _, value = line.partition("=")
+        field = SHOW_PROPERTIES.get(name)
+        if field is not None:
+            unit[field] = _show_value(field, value)
+    return units
+
+
+def list_units(runner: Runner) -> list:
+    """State of every loaded unit, of all types, in one call"""
+    return parse_list_units(runner(["list-units", "--all", "--no-pager", "--plain", "--no-legend",
+                                    "--output=json"]))
+
+
+def show_units(runner: Runner, names: list) -> dict:
+    """:return: unit name -> details, in one call per SHOW_BATCH units"""
+    properties = ",".join(SHOW_PROPERTIES)
+    details = {}
+    for start in range(0, len(names), SHOW_BATCH):
+        batch = names[start:start + SHOW_BATCH]
+        for unit in parse_show(runner(["show", "--no-pager", "-p", properties, "--", *batch])):
+            details[unit.get("unit")] = unit
+    return details
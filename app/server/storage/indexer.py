@@ -0,0 +1,254 @@
+"""
+Disk usage indexer: walks the STORAGE_ROOTS with a pool of os.scandir workers and keeps
+per-directory sizes in the storage_dir table, so usage queries never touch the disk.
+
+A directory's mtime only changes when entries are added, removed or renamed in it, so on
+a re-scan a directory whose mtime matches the index is not listed again. Its own file
+counts and sizes and its subdirectories are taken from the index, and only those
+subdirectories are stat()ed, one syscall each instead of one per file. Files that grow
+in place don't touch their directory's mtime; a full scan (full=true) re-lists every
+directory. Totals are summed bottom-up after the walk and only rows that changed are
+written.
+
+Like du -x, a scan stays on the root's filesystem and doesn't follow symlinks; sizes
+are allocated blocks. Hard-linked files are counted once per link.
+
+One scan runs per host at a time (SCAN_LOCK_FILE). POST /storage/scan starts one in a
+background thread; a scheduler job with an HTTP task to that endpoint re-scans
+periodically.
+"""
+import fcntl
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.logger import logger
+from app.utils.db.config import get_config_value
+from app.utils.db.storage_index import load_index, record_scan, scan_started, write_index
+
+SCAN_LOCK_FILE = "homeops.storage.lock"
+DEFAULT_WORKERS = 8
+DEFAULT_LARGE_FILE_BYTES = 64 * 1024 * 1024
+
+# (nested root, outer root) pairs of STORAGE_ROOTS already reported
+_nested_warned = set()
+
+
+class ScannedDir:
+    __slots__ = ("path", "parent", "depth", "mtime_ns", "own_bytes", "own_files", "subdirs", "large_files", "listed")
+
+    def __init__(self, path, parent, depth, mtime_ns):
+        self.path = path
+        self.parent = parent
+        self.depth = depth
+        self.mtime_ns = mtime_ns
+        self.own_bytes = 0
+        self.own_files = 0
+        self.subdirs = []
+        self.large_files = []
+        self.listed = False
+
+
+def _list_directory(scanned: ScannedDir, large_file_bytes: int) -> None:
+    with os.scandir(scanned.path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    scanned.subdirs.append(entry.path)
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue  # removed while listing
+            size = stat.st_blocks * 512
+            scanned.own_bytes += size
+            scanned.own_files += 1
+            if size >= large_file_bytes:
+                scanned.large_files.append((entry.path, size, stat.st_mtime))
+    scanned.listed = True
+
+
+def visit(path: str, parent: Optional[str], depth: int, device: int, previous: Optional[dict],
+          previous_children: list, large_file_bytes: int) -> Optional[ScannedDir]:
+    """
+    Stat a directory and list it unless its mtime matches the indexed one.
+    :return: None if it is gone, unreadable or on another filesystem
+    """
+    try:
+        stat = os.stat(path, follow_symlinks=False)
+    except OSError:
+        return None
+    if stat.st_dev != device:
+        return None
+    scanned = ScannedDir(path, parent, depth, stat.st_mtime_ns)
+    if previous is not None and previous["mtime_ns"] == stat.st_mtime_ns:
+        scanned.own_bytes = previous["own_bytes"]
+        scanned.own_files = previous["own_files"]
+        scanned.subdirs = previous_children
+        return scanned
+    try:
+        _list_directory(scanned, large_file_bytes)
+    except OSError as e:
+        logger.debug(f"Cannot list {path}: {e}")
+        scanned.own_bytes = scanned.own_files = 0
+        scanned.subdirs = []
+        scanned.large_files = []
+        scanned.listed = True
+        scanned.mtime_ns = -1  # never matches, so the next scan tries again
+    # The directory's own blocks count towards it, as in du
+    scanned.own_bytes += stat.st_blocks * 512
+    return scanned
+
+
+def walk(root: str, index: dict, workers: int = DEFAULT_WORKERS, large_file_bytes: int = DEFAULT_LARGE_FILE_BYTES,
+         full: bool = False) -> dict:
+    """
+    Visit every directory of root, `workers` at a time.
+    :param index: path -> stored row of the previous scan; ignored when full
+    :return: path -> ScannedDir
+    """
+    children = {}
+    if not full:
+        for path, row in index.items():
+            if row["parent"] is not None:
+                children.setdefault(row["parent"], []).append(path)
+    else:
+        index = {}
+    device = os.stat(root).st_dev
+    done = queue.SimpleQueue()
+    scanned = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-scan") as pool:
+        def submit(path, parent, depth):
+            future = pool.submit(visit, path, parent, depth, device, index.get(path), children.get(path, []),
+                                 large_file_bytes)
+            future.add_done_callback(done.put)
+
+        submit(root, None, 0)
+        outstanding = 1
+        while outstanding:
+            directory = done.get().result()
+            outstanding -= 1
+            if directory is None:
+                continue
+            scanned[directory.path] = directory
+            for subdir in directory.subdirs:
+                submit(subdir, directory.path, directory.depth + 1)
+                outstanding += 1
+    return scanned
+
+
+def summarize(root: str, scanned: dict) -> list:
+    """Index rows with subtree totals, summed deepest first"""
+    totals = {path: [directory.own_bytes, directory.own_files, 0] for path, directory in scanned.items()}
+    for directory in sorted(scanned.values(), key=lambda directory: directory.depth, reverse=True):
+        if directory.parent is not None and directory.parent in totals:
+            total_bytes, total_files, total_dirs = totals[directory.path]
+            parent = totals[directory.parent]
+            parent[0] += total_bytes
+            parent[1] += total_files
+            parent[2] += total_dirs + 1
+    return [{"root": root, "path": path, "parent": directory.parent, "depth": directory.depth,
+             "mtime_ns": directory.mtime_ns, "own_bytes": directory.own_bytes, "own_files": directory.own_files,
+             "total_bytes": totals[path][0], "total_files": totals[path][1], "total_dirs": totals[path][2]}
+            for path, directory in scanned.items()]
+
+
+def scan_root(root: str, workers: int = DEFAULT_WORKERS, large_file_bytes: int = DEFAULT_LARGE_FILE_BYTES,
+              full: bool = False, db: Session = None) -> dict:
+    """
+    Scan one root and bring its index up to date.
+    :return: Counts of directories listed, unchanged (not listed) and rows written
+    Raises:
+        OSError: If the root can't be stat()ed
+    """
+    index = load_index(root, db)
+    scanned = walk(root, index, workers, large_file_bytes, full)
+    rows = summarize(root, scanned)
+    changed = [row for row in rows if index.get(row["path"]) != row]
+    removed = [path for path in index if path not in scanned]
+    listed = {path: directory.large_files for path, directory in scanned.items() if directory.listed}
+    write_index(root, changed, removed, listed, db)
+    return {"dirs_listed": len(listed), "dirs_unchanged": len(scanned) - len(listed),
+            "rows_written": len(changed) + len(removed)}
+
+
+def is_below(path: str, root: str) -> bool:
+    """Whether path is strictly inside root"""
+    return path != root and path.startswith(root.rstrip("/") + "/")
+
+
+def configured_roots() -> list:
+    """
+    STORAGE_ROOTS, a JSON list of directories, resolved to real paths. A root inside another
+    one is left out: each directory is indexed under a single root, and the outer root's
+    scan covers it already.
+    """
+    roots = list(dict.fromkeys(os.path.realpath(root)
+                               for root in json.loads(get_config_value("STORAGE_ROOTS", default="[]"))))
+    kept = []
+    for root in roots:
+        outer = next((other for other in roots if is_below(root, other)), None)
+        if outer is None:
+            kept.append(root)
+        elif (root, outer) not in _nested_warned:
+            _nested_warned.add((root, outer))
+            logger.warning(f"Storage root {root} is inside {outer} and is indexed as part of it")
+    return kept
+
+
+class StorageIndexer:
+    def __init__(self, lock_path: str = SCAN_LOCK_FILE):
+        self.lock_path = lock_path
+        self.current_root = None
+        self._thread = None
+
+    @property
+    def scanning(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_scan(self, roots: list, full: bool = False) -> bool:
+        """
+        Scan roots one after the other in a background thread.
+        :return: False if a scan is already running on this host
+        """
+        if self.scanning:
+            return False
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._thread = threading.Thread(target=self._run, args=(roots, full, lock_file), name="storage-indexer",
+                                        daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, roots: list, full: bool, lock_file):
+        workers = max(1, int(get_config_value("STORAGE_SCAN_WORKERS", default=DEFAULT_WORKERS)))
+        large_file_bytes = int(get_config_value("STORAGE_LARGE_FILE_BYTES", default=DEFAULT_LARGE_FILE_BYTES))
+        try:
+            for root in roots:
+                self.current_root = root
+                started_at = scan_started(root, full)
+                try:
+                    counts = scan_root(root, workers, large_file_bytes, full)
+                except Exception as e:
+                    logger.error(f"Storage scan of {root} failed: {e}")
+                    record_scan(root, {"finished_at": time.time(), "status": "failed", "detail": str(e)})
+                    continue
+                finished_at = time.time()
+                record_scan(root, {"finished_at": finished_at, "status": "ok", **counts})
+                logger.info(f"Storage scan of {root} done in {finished_at - started_at:.1f}s "
+                            f"({counts['dirs_listed']} listed, {counts['dirs_unchanged']} unchanged)")
+        finally:
+            self.current_root = None
+            lock_file.close()  # releases the flock
+
+
+storage_indexer = StorageIndexer()
@@ -0,0 +1,76 @@
+"""
+Mounted filesystems and their usage, from /proc/self/mounts and os.statvfs.
+"""
+import os
+
+from app.core.logger import logger
+
+MOUNTS_FILE = "/proc/self/mounts"
+# Kernel and virtual filesystems, left out unless asked for
+PSEUDO_FILESYSTEMS = {
+    "autofs", "binfmt_misc", "bpf", "cgroup", "cgroup2", "configfs", "debugfs", "devpts", "devtmpfs", "efivarfs",
+    "fusectl", "hugetlbfs", "mqueue", "nsfs", "proc", "pstore", "ramfs", "rpc_pipefs", "securityfs", "selinuxfs",
+    "sysfs", "tracefs",
+}
+
+
+def _unescape(field: str) -> str:
+    """Mount fields escape space, tab, newline and backslash as octal (\\040)"""
+    if "\\" not in field:
+        return field
+    return field.encode().decode("unicode_escape").encode("latin-1").decode(errors="replace")
+
+
+def read_mounts(mounts_file=MOUNTS_FILE) -> list:
+    """:return: (device, mount point, filesystem type, options) per mount, in mount order"""
+    mounts = []
+    with open(mounts_file, "r") as file:
+        for line in file:
+            fields = line.split()
+            if len(fields) >= 4:
+                mounts.append((_unescape(fields[0]), _unescape(fields[1]), fields[2], fields[3]))
+    return mounts
+
+
+def filesystem_usage(mount_point: str) -> dict:
+    """statvfs of a mount point; used excludes the blocks reserved for root, like df"""
+    usage = os.statvfs(mount_point)
+    total = usage.f_blocks * usage.f_frsize
+    free = usage.f_bfree * usage.f_frsize
+    available = usage.f_bavail * usage.f_frsize
+    used = total - free
+    return {
+        "total_bytes": total,
+        "used_bytes": used,
+        "free_bytes": free,
+        "available_bytes": available,
+        # Of the space usable by unprivileged users, as df's Use%
+        "used_percent": round(100.0 * used / (used + available), 1) if used + available else 0.0,
+        "inodes": usage.f_files,
+        "inodes_free": usage.f_ffree,
+        "read_only": bool(usage.f_flag & os.ST_RDONLY),
+    }
+
+
+def mounted_filesystems(include_pseudo: bool = False, mounts_file=MOUNTS_FILE) -> list:
+    """
+    Usage of every mounted filesystem. A filesystem mounted more than once (bind mounts)
+    is listed at its first mount point.
+    """
+    filesystems = []
+    seen = set()
+    for device, mount_point, fs_type, options in read_mounts(mounts_file):
+        if not include_pseudo and fs_type in PSEUDO_FILESYSTEMS:
+            continue
+        try:
+            st_dev = os.stat(mount_point).st_dev
+            if st_dev in seen:
+                continue
+            usage = filesystem_usage(mount_point)
+        except OSError as e:
+            logger.debug(f"Skipping mount {mount_point}: {e}")
+            continue
+        seen.add(st_dev)
+        filesystems.append({"device": device, "mount_point": mount_point, "type": fs_type,
+                            "options": options.split(","), **usage})
+    return filesystems
@@ -2,60 +2,14 @@ from app.core.logger import logger
 from app.exceptions.global_exception import GlobalHTTPException
 from fastapi import status
 
-from app.server.users.get_password_info import get_password_info
+from app.server.users.user_directory import UserSnapshot, parse_passwd_line, user_directory
 
 
-def parse_passwd_line(line):
+def get_user_snapshot() -> UserSnapshot:
+    """Current user directory snapshot, with passwd errors mapped to API errors"""
     try:
-        # Split the line by colon ":"
-        fields = line.strip().split(":")
-
-        if len(fields) < 7:
-            logger.warning("Malformed line detected")
-            return None
-
-        user_dict = {
-            "username": fields[0],
-            "user_id": int(fields[2]),
-            "group_id": int(fields[3]),
-            "full_name": fields[4],
-            "home_directory": fields[5],
-            "shell": fields[6]
-        }
-
-        return user_dict
-    except ValueError as e:
-        logger.error(f"Parsing error: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        return None
-
-
-
-def get_all_users(scope="all"):
-    all_users = []
-    logger.debug(f"Fetching {scope} users")
-
-    try:
-        with open("/etc/passwd", "r") as passwd_file:
-            for line in passwd_file:
-                if line.strip():
-                    user_info = parse_passwd_line(line)
-                    if user_info is None:
-                        continue
-
-                    try:
-                        password_info = get_password_info(user_info["username"])
-                        user_info.update(password_info)
-                    except GlobalHTTPException:
-                        logger.warning(f"Skipping {user_info['username']} due to password info error")
-
-                    if scope == "active":
-                        if user_info["home_directory"] and user_info["shell"] in ["/bin/bash"]:
-                            all_users.append(user_info)
-                    else:
-                        all_users.append(user_info)
+        # Rebuilt only when passwd/group/shadow change
+        return user_directory.snapshot()
 
     except FileNotFoundError:
         logger.error("passwd file not found")
@@ -82,4 +36,9 @@ def get_all_users(scope="all"):
             code="UNEXPECTED_ERROR"
         )
 
-    return all_users
+
+def get_all_users(scope="all"):
+    logger.debug(f"Fetching {scope} users")
+
+    snapshot = get_user_snapshot()
+    return snapshot.full_active_users() if scope == "active" else snapshot.full_users()
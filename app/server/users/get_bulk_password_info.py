@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from app.core.logger import logger
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.users.get_password_info import get_password_info
+from app.utils.db.config import get_config_value
+
+SHADOW_FILE = "/etc/shadow"
+EPOCH = date(1970, 1, 1)
+# chage treats a maximum age this large as "never expires"
+NEVER_EXPIRES_DAYS = 10000
+
+
+def _to_int(field):
+    """Shadow numeric field, -1 when empty (same as chage)"""
+    try:
+        return int(field) if field else -1
+    except ValueError:
+        return -1
+
+
+def _format_day(days):
+    return (EPOCH + timedelta(days=days)).strftime("%b %d, %Y")
+
+
+def parse_shadow_line(line):
+    """
+    Convert a shadow(5) line into the same fields `chage -l` reports.
+    :return: (username, details) or None if the line is malformed
+    """
+    fields = line.strip().split(":")
+    if len(fields) < 8:
+        logger.warning("Malformed shadow line detected")
+        return None
+
+    last_change = _to_int(fields[2])
+    min_days = _to_int(fields[3])
+    max_days = _to_int(fields[4])
+    warn_days = _to_int(fields[5])
+    inactive_days = _to_int(fields[6])
+    expire = _to_int(fields[7])
+    never_expires = last_change <= 0 or max_days < 0 or max_days >= NEVER_EXPIRES_DAYS
+
+    if last_change < 0:
+        last_password_change = "never"
+    elif last_change == 0:
+        last_password_change = "password must be changed"
+    else:
+        last_password_change = _format_day(last_change)
+
+    if last_change == 0:
+        password_expires = password_inactive = "password must be changed"
+    elif never_expires:
+        password_expires = password_inactive = "never"
+    else:
+        password_expires = _format_day(last_change + max_days)
+        password_inactive = "never" if inactive_days < 0 else _format_day(last_change + max_days + inactive_days)
+
+    return fields[0], {
+        "last_password_change": last_password_change,
+        "password_expires": password_expires,
+        "password_inactive": password_inactive,
+        "account_expires": "never" if expire < 0 else _format_day(expire),
+        "min_days_between_change": str(min_days),
+        "max_days_between_change": str(max_days),
+        "warning_days_before_expiry": str(warn_days),
+    }
+
+
+def read_shadow(shadow_file=SHADOW_FILE):
+    """Parse the whole shadow file in one pass. Raises OSError if it can't be read."""
+    details = {}
+    with open(shadow_file, "r") as file:
+        for line in file:
+            if line.strip():
+                parsed = parse_shadow_line(line)
+                if parsed is not None:
+                    details[parsed[0]] = parsed[1]
+    return details
+
+
+def _get_chage_info(usernames, max_workers):
+    """Fallback - one chage per user, at most max_workers at a time"""
+    def fetch(username):
+        try:
+            return username, get_password_info(username)
+        except GlobalHTTPException:
+            logger.warning(f"Skipping {username} due to password info error")
+            return username, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return {username: info for username, info in pool.map(fetch, usernames) if info is not None}
+
+
+def password_info_lookup(shadow_file=SHADOW_FILE):
+    """
+    Lookup function for password aging of many batches of users, usernames -> details.
+    With the shadow backend the file is read once, here, and every batch is served from
+    it; otherwise, or when it isn't readable, each batch runs chage for its users.
+    """
+    backend = get_config_value("PASSWORD_INFO_BACKEND", default="shadow")
+    max_workers = max(1, int(get_config_value("CHAGE_MAX_WORKERS", default=8)))
+
+    if backend == "shadow":
+        try:
+            shadow = read_shadow(shadow_file)
+            return lambda usernames: {username: shadow[username] for username in usernames if username in shadow}
+        except OSError as e:
+            logger.warning(f"Shadow file not readable, falling back to chage: {e}")
+
+    return lambda usernames: _get_chage_info(list(usernames), max_workers)
+
+
+def get_bulk_password_info(usernames, shadow_file=SHADOW_FILE):
+    """
+    Password aging details for many users at once.
+    \n
+    PASSWORD_INFO_BACKEND=shadow (Default) reads the shadow file once and falls back to a bounded
+    pool of chage calls (CHAGE_MAX_WORKERS) when it isn't readable. PASSWORD_INFO_BACKEND=chage
+    always uses chage.
+    :param usernames: iterable of usernames
+    :return: Dict of username -> password details (users without details are omitted)
+    """
+    return password_info_lookup(shadow_file)(usernames)
@@ -3,36 +3,44 @@ import subprocess
 from starlette import status
 
 from app.core.logger import logger
+from app.core.metrics import SUBPROCESSES
 from app.exceptions.global_exception import GlobalHTTPException
 
 
+# Mapping to one word keys for easier parsing
+CHAGE_KEY_MAPPING = {
+    "Last password change": "last_password_change",
+    "Password expires": "password_expires",
+    "Password inactive": "password_inactive",
+    "Account expires": "account_expires",
+    "Minimum number of days between password change": "min_days_between_change",
+    "Maximum number of days between password change": "max_days_between_change",
+    "Number of days of warning before password expires": "warning_days_before_expiry"
+}
+
+
+def parse_chage_output(output):
+    details = {}
+    for line in output.splitlines():
+        if line.strip():
+            try:
+                key, value = line.split(":", 1)
+                # Use mapped key if exists, otherwise keep original key
+                mapped_key = CHAGE_KEY_MAPPING.get(key.strip(), key.strip().lower().replace(" ", "_"))
+                details[mapped_key] = value.strip()
+            except ValueError:
+                logger.warning("Malformed chage line")
+    return details
+
+
 def get_password_info(username):
     try:
         # Run the chage command to get password info
-        result = subprocess.run(['chage', '-l', username], capture_output=True, text=True)
+        with SUBPROCESSES.time(("chage",)):
+            result = subprocess.run(['chage', '-l', username], capture_output=True, text=True)
 
         if result.returncode == 0:
-            details = {}
-            for line in result.stdout.splitlines():
-                if line.strip():
-                    try:
-                        key, value = line.split(":", 1)
-                        # Mapping to one word keys for easier parsing
-                        key_mapping = {
-                            "Last password change": "last_password_change",
-                            "Password expires": "password_expires",
-                            "Password inactive": "password_inactive",
-                            "Account expires": "account_expires",
-                            "Minimum number of days between password change": "min_days_between_change",
-                            "Maximum number of days between password change": "max_days_between_change",
-                            "Number of days of warning before password expires": "warning_days_before_expiry"
-                        }
-                        # Use mapped key if exists, otherwise keep original key
-                        mapped_key = key_mapping.get(key.strip(), key.strip().lower().replace(" ", "_"))
-                        details[mapped_key] = value.strip()
-                    except ValueError:
-                        logger.warning("Malformed chage line")
-            return details
+            return parse_chage_output(result.stdout)
         else:
             logger.error(f"Chage command error: {result.stderr.strip()}")
             raise GlobalHTTPException(
@@ -1,7 +1,19 @@
+from fastapi import status
+
 from app.core.logger import logger
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.users.get_all_users import get_user_snapshot
 
 
 def get_user_details(username):
     logger.debug(f"Fetching {username} data")
 
-    return {"username":username}
\ No newline at end of file
+    user_info = get_user_snapshot().full_user(username)
+    if user_info is None:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="User Not Found",
+            detail=f"No user named '{username}' exists.",
+            code="USER_NOT_FOUND"
+        )
+    return user_info
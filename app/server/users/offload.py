@@ -0,0 +1,24 @@
+import functools
+
+from anyio import CapacityLimiter, to_thread
+
+from app.utils.db.config import get_config_value
+
+_limiter = None
+
+
+def get_users_limiter() -> CapacityLimiter:
+    """Shared cap (USERS_MAX_CONCURRENCY) on worker threads used by the users layer"""
+    global _limiter
+    if _limiter is None:
+        _limiter = CapacityLimiter(max(1, int(get_config_value("USERS_MAX_CONCURRENCY", default=4))))
+    return _limiter
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking users-layer call (file reads, chage subprocesses) in a worker thread
+    so the event loop keeps serving other requests. Excess calls queue on the limiter
+    instead of exhausting the default threadpool.
+    """
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=get_users_limiter())
@@ -0,0 +1,160 @@
+import json
+
+from fastapi import status
+
+from app.core.logger import logger
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.users.get_all_users import get_user_snapshot
+from app.server.users.get_bulk_password_info import password_info_lookup
+from app.server.users.get_password_info import CHAGE_KEY_MAPPING
+from app.server.users.user_directory import is_active_user, parse_passwd_line, read_groups, user_directory, user_groups
+
+BASE_FIELDS = ("username", "user_id", "group_id", "full_name", "home_directory", "shell", "groups")
+PASSWORD_FIELDS = tuple(CHAGE_KEY_MAPPING.values())
+ALL_FIELDS = BASE_FIELDS + PASSWORD_FIELDS
+# Users looked up together for password aging while streaming
+STREAM_BATCH_SIZE = 256
+
+
+def parse_fields(fields):
+    """
+    Validate a comma separated projection.
+    :return: tuple of field names, or None for every field
+    """
+    if not fields:
+        return None
+    selected = tuple(dict.fromkeys(field.strip() for field in fields.split(",") if field.strip()))
+    unknown = [field for field in selected if field not in ALL_FIELDS]
+    if unknown:
+        raise GlobalHTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            title="Invalid Fields",
+            detail=f"Unknown fields {', '.join(unknown)}. Available fields: {', '.join(ALL_FIELDS)}",
+            code="USERS01_FIELDS"
+        )
+    return selected
+
+
+def needs_password_info(fields):
+    return fields is None or any(field in PASSWORD_FIELDS for field in fields)
+
+
+def user_matches(user_info, scope="all", uid_min=None, uid_max=None, shell=None, home_prefix=None):
+    if scope == "active" and not is_active_user(user_info):
+        return False
+    if uid_min is not None and user_info["user_id"] < uid_min:
+        return False
+    if uid_max is not None and user_info["user_id"] > uid_max:
+        return False
+    if shell is not None and user_info["shell"] != shell:
+        return False
+    if home_prefix is not None and not user_info["home_directory"].startswith(home_prefix):
+        return False
+    return True
+
+
+def project(user_info, fields):
+    if fields is None:
+        return user_info
+    return {field: user_info.get(field) for field in fields}
+
+
+def query_users(scope="all", fields=None, uid_min=None, uid_max=None, shell=None, home_prefix=None,
+                offset=0, limit=None, cursor=None):
+    """
+    Filtered, projected page of users from the cached directory snapshot.
+    Password aging is only looked up if a password field is projected.
+    :param cursor: username of the last user of the previous page (takes precedence over offset)
+    :return: (page of users, next cursor or None, total matching users)
+    """
+    snapshot = get_user_snapshot()
+    with_password = needs_password_info(fields)
+    users = snapshot.full_users() if with_password else snapshot.users
+
+    start = 0
+    if cursor is not None:
+        position = snapshot.positions.get(cursor)
+        if position is None:
+            raise GlobalHTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                title="Invalid Cursor",
+                detail=f"Cursor '{cursor}' does not match any user. Restart from the first page.",
+                code="USERS02_CURSOR"
+            )
+        start = position + 1
+
+    matching = [position for position in range(start, len(users))
+                if user_matches(users[position], scope, uid_min, uid_max, shell, home_prefix)]
+    if cursor is None:
+        matching = matching[offset:]
+    page_positions = matching if limit is None else matching[:limit]
+    page = [project(users[position], fields) for position in page_positions]
+
+    next_cursor = None
+    if limit is not None and len(matching) > limit:
+        next_cursor = users[page_positions[-1]]["username"]
+    logger.debug(f"Users query returned {len(page)} of {len(matching)}")
+    return page, next_cursor, len(matching)
+
+
+def stream_users(scope="all", fields=None, uid_min=None, uid_max=None, shell=None, home_prefix=None):
+    """
+    NDJSON lines generated straight from the passwd file, so output starts immediately and
+    memory stays bounded by STREAM_BATCH_SIZE regardless of the directory size.
+    The file is opened before returning so errors surface before the response starts.
+    """
+    try:
+        passwd = open(user_directory.passwd_file, "r")
+    except FileNotFoundError:
+        logger.error("passwd file not found")
+        raise GlobalHTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            title="passwd file missing",
+            detail="The /etc/passwd file is missing",
+            code="PASSWD_FILE_NOT_FOUND"
+        )
+    except PermissionError:
+        logger.error("Permission error reading passwd file")
+        raise GlobalHTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            title="Permission Denied",
+            detail="Permission issue reading /etc/passwd",
+            code="PASSWD_FILE_PERMISSION_DENIED"
+        )
+
+    with_groups = fields is None or "groups" in fields
+    with_password = needs_password_info(fields)
+    try:
+        group_names, memberships = read_groups(user_directory.group_file) if with_groups else ({}, {})
+    except BaseException:
+        passwd.close()
+        raise
+
+    def render(batch, password_info):
+        details = password_info([user["username"] for user in batch]) if password_info and batch else {}
+        for user_info in batch:
+            user_info.update(details.get(user_info["username"], {}))
+            yield json.dumps(project(user_info, fields)) + "\n"
+
+    def generate():
+        try:
+            # Shadow is read once for the whole stream, not once per batch
+            password_info = password_info_lookup(user_directory.shadow_file) if with_password else None
+            batch = []
+            for line in passwd:
+                if not line.strip():
+                    continue
+                user_info = parse_passwd_line(line)
+                if user_info is None or not user_matches(user_info, scope, uid_min, uid_max, shell, home_prefix):
+                    continue
+                if with_groups:
+                    user_info["groups"] = user_groups(user_info, group_names, memberships)
+                batch.append(user_info)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    yield from render(batch, password_info)
+                    batch = []
+            yield from render(batch, password_info)
+        finally:
+            passwd.close()
+
+    return generate()
@@ -0,0 +1,199 @@
+import os
+import threading
+
+from app.core.logger import logger
+from app.server.users.get_bulk_password_info import SHADOW_FILE, get_bulk_password_info
+
+PASSWD_FILE = "/etc/passwd"
+GROUP_FILE = "/etc/group"
+ACTIVE_SHELLS = ["/bin/bash"]
+
+
+def parse_passwd_line(line):
+    try:
+        # Split the line by colon ":"
+        fields = line.strip().split(":")
+
+        if len(fields) < 7:
+            logger.warning("Malformed line detected")
+            return None
+
+        user_dict = {
+            "username": fields[0],
+            "user_id": int(fields[2]),
+            "group_id": int(fields[3]),
+            "full_name": fields[4],
+            "home_directory": fields[5],
+            "shell": fields[6]
+        }
+
+        return user_dict
+    except ValueError as e:
+        logger.error(f"Parsing error: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return None
+
+
+def parse_group_line(line):
+    """:return: (group name, gid, member list) or None if the line is malformed"""
+    fields = line.strip().split(":")
+    if len(fields) < 4:
+        logger.warning("Malformed group line detected")
+        return None
+    try:
+        return fields[0], int(fields[2]), [member for member in fields[3].split(",") if member]
+    except ValueError as e:
+        logger.error(f"Parsing error: {e}")
+        return None
+
+
+def is_active_user(user_info):
+    return bool(user_info["home_directory"]) and user_info["shell"] in ACTIVE_SHELLS
+
+
+def read_groups(group_file=GROUP_FILE):
+    """:return: (gid -> group name, username -> supplementary group names)"""
+    group_names = {}
+    memberships = {}
+    try:
+        with open(group_file, "r") as file:
+            for line in file:
+                if line.strip():
+                    parsed = parse_group_line(line)
+                    if parsed is None:
+                        continue
+                    name, gid, members = parsed
+                    group_names[gid] = name
+                    for member in members:
+                        memberships.setdefault(member, []).append(name)
+    except OSError as e:
+        logger.warning(f"Group file not readable: {e}")
+    return group_names, memberships
+
+
+def user_groups(user_info, group_names, memberships):
+    """Primary group first, then supplementary groups"""
+    primary = group_names.get(user_info["group_id"])
+    return ([primary] if primary else []) + [
+        name for name in memberships.get(user_info["username"], []) if name != primary
+    ]
+
+
+class UserSnapshot:
+    """
+    Immutable, indexed view of passwd/group at one point in time. Password aging (shadow
+    or chage) is only looked up the first time a caller needs it, then kept with the snapshot.
+    """
+
+    def __init__(self, users, groups, shadow_file=SHADOW_FILE):
+        self.users = users
+        self.positions = {user["username"]: position for position, user in enumerate(users)}
+        self.by_uid = {}
+        for user in users:
+            self.by_uid.setdefault(user["user_id"], user)
+        self.groups = groups
+        self.shadow_file = shadow_file
+        self._password_info = None
+        self._full_users = None
+        self._full_active_users = None
+        self._lock = threading.Lock()
+
+    def password_info(self):
+        if self._password_info is None:
+            with self._lock:
+                if self._password_info is None:
+                    self._password_info = get_bulk_password_info([user["username"] for user in self.users],
+                                                                 self.shadow_file)
+        return self._password_info
+
+    def full_users(self):
+        """Users with password aging merged in"""
+        if self._full_users is None:
+            password_info = self.password_info()
+            full_users = [{**user, **password_info.get(user["username"], {})} for user in self.users]
+            self._full_active_users = [user for user in full_users if is_active_user(user)]
+            self._full_users = full_users
+        return self._full_users
+
+    def full_active_users(self):
+        self.full_users()
+        return self._full_active_users
+
+    def full_user(self, username):
+        position = self.positions.get(username)
+        return None if position is None else self.full_users()[position]
+
+
+class UserDirectory:
+    """
+    Cached snapshot of the local user database.
+
+    The source files are stat()ed on every access and the snapshot is rebuilt only when
+    the mtime, inode or size of passwd, group or shadow changes (editors and useradd
+    replace the file, which changes the inode).
+    """
+
+    def __init__(self, passwd_file=PASSWD_FILE, group_file=GROUP_FILE, shadow_file=SHADOW_FILE):
+        self.passwd_file = passwd_file
+        self.group_file = group_file
+        self.shadow_file = shadow_file
+        self._snapshot = None
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _file_signature(self, path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_ino, st.st_size
+        except OSError:
+            return None
+
+    def _current_signature(self):
+        return tuple(self._file_signature(path) for path in (self.passwd_file, self.group_file, self.shadow_file))
+
+    def _build(self):
+        users = []
+        group_names, memberships = read_groups(self.group_file)
+        # FileNotFoundError/PermissionError propagate to the caller
+        with open(self.passwd_file, "r") as passwd_file:
+            for line in passwd_file:
+                if line.strip():
+                    user_info = parse_passwd_line(line)
+                    if user_info is not None:
+                        user_info["groups"] = user_groups(user_info, group_names, memberships)
+                        users.append(user_info)
+
+        logger.debug(f"User directory rebuilt ({len(users)} users)")
+        return UserSnapshot(users, group_names, self.shadow_file)
+
+    def snapshot(self) -> UserSnapshot:
+        signature = self._current_signature()
+        if self._snapshot is not None and signature == self._signature:
+            return self._snapshot
+
+        with self._lock:
+            # Another thread may have rebuilt while we waited
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = self._build()
+                self._signature = signature
+            return self._snapshot
+
+    def get_users(self, scope="all"):
+        snapshot = self.snapshot()
+        return snapshot.full_active_users() if scope == "active" else snapshot.full_users()
+
+    def get_user(self, username):
+        return self.snapshot().full_user(username)
+
+    def get_user_by_uid(self, uid):
+        snapshot = self.snapshot()
+        user = snapshot.by_uid.get(uid)
+        return None if user is None else snapshot.full_user(user["username"])
+
+    def invalidate(self):
+        self._snapshot = None
+
+
+user_directory = UserDirectory()
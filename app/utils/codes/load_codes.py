@@ -1,6 +1,7 @@
 import os
 import json
 import logging
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
@@ -29,5 +30,28 @@ def load_and_merge_json_files():
 
     return merged_data
 
-# Load merged JSON at import time
-codes = load_and_merge_json_files()
+def catalog_signature():
+    """(file name, mtime, size) of every JSON file; changes whenever the catalog is edited"""
+    signature = []
+    for entry in os.scandir(BASE_DIR):
+        if entry.name.endswith(".json"):
+            stat = entry.stat()
+            signature.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(sorted(signature))
+
+
+@lru_cache(maxsize=1)
+def _load_codes(signature):
+    return load_and_merge_json_files()
+
+
+def get_codes():
+    """Merged ref code catalog, loaded on first use and reloaded when a JSON file changes"""
+    return _load_codes(catalog_signature())
+
+
+def __getattr__(name):
+    # Backwards compatible `codes` attribute without loading at import time
+    if name == "codes":
+        return get_codes()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,111 @@
+import hmac
+import threading
+import time
+from typing import Callable, Optional
+
+from app.database.api_key import api_key_id, hash_api_key
+
+# Seconds between revision polls of the api_key table, so revocations made by other
+# uvicorn workers apply within this long. 0 disables polling.
+DEFAULT_REFRESH = 5.0
+
+
+class ApiKeyEntry:
+    __slots__ = ("key_hash", "role", "expires_at")
+
+    def __init__(self, key_hash: str, role: str, expires_at: Optional[int]):
+        self.key_hash = key_hash
+        self.role = role
+        self.expires_at = expires_at
+
+
+class ApiKeyCache:
+    """
+    Process-local index of the usable API keys: key id -> digest, role and expiry.
+
+    Verification is a digest, a dict lookup and a constant-time compare, with no query.
+    The table is read in full once; after that only rows with a revision above the last
+    one seen are fetched, when the polled max revision moves. Keys created or revoked in
+    this process are applied directly.
+
+    The loaders are bound by app.utils.db.api_keys, like ConfigCache's.
+    """
+
+    def __init__(self, refresh: float = DEFAULT_REFRESH):
+        self.refresh = refresh
+        self._entries: dict[str, ApiKeyEntry] = {}
+        self._revision = 0
+        self._loaded = False
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._changes_loader: Optional[Callable[[int], list]] = None
+        self._revision_loader: Optional[Callable[[], int]] = None
+        self._refresh_loader: Optional[Callable[[], float]] = None
+
+    def bind(self, changes_loader: Callable[[int], list], revision_loader: Callable[[], int],
+             refresh_loader: Callable[[], float] = None) -> None:
+        """
+        Attach the functions reading the rows changed after a revision (as dicts with key_id,
+        key_hash, role, expires_at, revoked_at and revision), the current max revision and
+        the poll interval.
+        """
+        self._changes_loader = changes_loader
+        self._revision_loader = revision_loader
+        self._refresh_loader = refresh_loader
+
+    def apply(self, row: dict, entries: dict = None) -> None:
+        """Add, replace or (when revoked) drop one key"""
+        entries = self._entries if entries is None else entries
+        if row["revoked_at"] is not None:
+            entries.pop(row["key_id"], None)
+        else:
+            entries[row["key_id"]] = ApiKeyEntry(row["key_hash"], row["role"], row["expires_at"])
+
+    def _apply_changes(self) -> None:
+        with self._lock:
+            for row in self._changes_loader(self._revision):
+                self.apply(row)
+                self._revision = max(self._revision, row["revision"])
+            self._checked_at = time.monotonic()
+
+    def load(self) -> None:
+        """(Re)fill the index from the whole table; the new index replaces the old one at once"""
+        if self._refresh_loader is not None:
+            self.refresh = self._refresh_loader()
+        entries = {}
+        revision = 0
+        for row in self._changes_loader(0):
+            self.apply(row, entries)
+            revision = max(revision, row["revision"])
+        with self._lock:
+            self._entries = entries
+            self._revision = revision
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+    def _refresh_if_stale(self) -> None:
+        if not self._loaded:
+            self.load()
+            return
+        if self.refresh and time.monotonic() - self._checked_at >= self.refresh:
+            self._checked_at = time.monotonic()
+            if self._revision_loader() != self._revision:
+                self._apply_changes()
+
+    def verify(self, key: str) -> Optional[str]:
+        """:return: the role of a valid, unexpired key, None otherwise"""
+        self._refresh_if_stale()
+        key_hash = hash_api_key(key)
+        entry = self._entries.get(api_key_id(key, key_hash))
+        if entry is None or not hmac.compare_digest(entry.key_hash, key_hash):
+            return None
+        if entry.expires_at is not None and time.time() >= entry.expires_at:
+            return None
+        return entry.role
+
+    def invalidate(self) -> None:
+        """Drop everything so the next verification reloads the table"""
+        self._loaded = False
+
+
+api_key_cache = ApiKeyCache()
@@ -0,0 +1,119 @@
+import time
+from typing import Optional
+
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import SessionLocal
+from app.database.api_key import ApiKey, api_key_id, generate_api_key, hash_api_key, next_revision
+from app.database.db_setup import ensure_database
+from app.utils.db.api_key_cache import DEFAULT_REFRESH, api_key_cache
+from app.utils.db.config import get_config_value
+
+_CACHE_COLUMNS = (ApiKey.key_id, ApiKey.key_hash, ApiKey.role, ApiKey.expires_at, ApiKey.revoked_at, ApiKey.revision)
+
+
+def _load_changes(since: int) -> list:
+    ensure_database()
+    with SessionLocal() as db:
+        rows = db.query(*_CACHE_COLUMNS).filter(ApiKey.revision > since).order_by(ApiKey.revision).all()
+        return [row._asdict() for row in rows]
+
+
+def _fetch_revision() -> int:
+    with SessionLocal() as db:
+        return db.query(func.coalesce(func.max(ApiKey.revision), 0)).scalar()
+
+
+def _refresh_interval() -> float:
+    return float(get_config_value("API_KEY_REFRESH", default=DEFAULT_REFRESH))
+
+
+api_key_cache.bind(changes_loader=_load_changes, revision_loader=_fetch_revision, refresh_loader=_refresh_interval)
+
+
+def _describe(api_key: ApiKey) -> dict:
+    """Public fields of a key; the digest never leaves the database layer"""
+    return {
+        "key_id": api_key.key_id,
+        "role": api_key.role,
+        "name": api_key.name,
+        "created_at": api_key.created_at,
+        "expires_at": api_key.expires_at,
+        "revoked_at": api_key.revoked_at,
+    }
+
+
+def _cache_row(api_key: ApiKey) -> dict:
+    return {column.key: getattr(api_key, column.key) for column in _CACHE_COLUMNS}
+
+
+def verify_api_key(key: str) -> Optional[str]:
+    """:return: the role of a valid, unexpired and unrevoked key, None otherwise"""
+    return api_key_cache.verify(key)
+
+
+def create_api_key(role: str, name: str = "", expires_at: int = None, key: str = None) -> tuple:
+    """
+    Store a new API key.
+    Args:
+        role (str): "admin" or "user"
+        name (str): Label shown when listing keys
+        expires_at (int): UNIX time the key stops working (Optional, default never)
+        key (str): Plaintext key to store, e.g. to import an existing one (Optional, default generated)
+    Returns:
+        tuple: (plaintext key, public fields). The plaintext is not stored and can't be shown again.
+    Raises:
+        ValueError: On database errors, including an import of a key that already exists
+    """
+    ensure_database()
+    key = key or generate_api_key()
+    key_hash = hash_api_key(key)
+    values = {"key_id": api_key_id(key, key_hash), "key_hash": key_hash, "role": role, "name": name,
+              "created_at": int(time.time()), "expires_at": expires_at}
+    with SessionLocal() as db:
+        try:
+            db.execute(insert(ApiKey).values(**values, revision=next_revision()))
+            api_key = db.query(ApiKey).filter(ApiKey.key_id == values["key_id"]).one()
+            row, description = _cache_row(api_key), _describe(api_key)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise ValueError(f"Error creating API key: {str(e)}")
+        api_key_cache.apply(row)
+        return key, description
+
+
+def revoke_api_key(key_id: str) -> Optional[dict]:
+    """
+    Revoke a key; revoking a revoked key is a no-op.
+    Returns:
+        dict: Public fields of the key, None if there is no key with that id
+    Raises:
+        ValueError: On database errors
+    """
+    ensure_database()
+    with SessionLocal() as db:
+        try:
+            db.execute(update(ApiKey).where(ApiKey.key_id == key_id, ApiKey.revoked_at.is_(None))
+                       .values(revoked_at=int(time.time()), revision=next_revision()))
+            api_key = db.query(ApiKey).filter(ApiKey.key_id == key_id).one_or_none()
+            if api_key is None:
+                return None
+            row, description = _cache_row(api_key), _describe(api_key)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            raise ValueError(f"Error revoking API key '{key_id}': {str(e)}")
+        api_key_cache.apply(row)
+        return description
+
+
+def list_api_keys(include_revoked: bool = False) -> list:
+    """Public fields of the stored keys, oldest first"""
+    ensure_database()
+    with SessionLocal() as db:
+        query = db.query(ApiKey)
+        if not include_revoked:
+            query = query.filter(ApiKey.revoked_at.is_(None))
+        return [_describe(api_key) for api_key in query.order_by(ApiKey.id).all()]
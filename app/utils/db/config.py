@@ -1,36 +1,87 @@
+import time
+
+from anyio import to_thread
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import Config, SessionLocal
+from app.database import AsyncSessionLocal, Config, SessionLocal
+from app.database.config import NEXT_CONFIG_REVISION
 from sqlalchemy.exc import SQLAlchemyError
 
+from app.database.db_setup import ensure_database, ensure_database_async
+from app.utils.db.config_cache import config_cache
+
+
+def _load_all_configs() -> dict:
+    ensure_database()
+    with SessionLocal() as db:
+        return _query_configs(db)
+
+
+def _load_config(key: str):
+    ensure_database()
+    with SessionLocal() as db:
+        return db.query(Config.value).filter(key == Config.key).scalar()
+
+
+def _load_configs(keys: list) -> dict:
+    ensure_database()
+    with SessionLocal() as db:
+        return _query_configs(db, keys)
+
+
+def _query_configs(db: Session, keys: list = None) -> dict:
+    query = db.query(Config.key, Config.value)
+    if keys is not None:
+        query = query.filter(Config.key.in_(keys))
+    return dict(query.all())
+
+
+def _fetch_config_version() -> tuple:
+    with SessionLocal() as db:
+        return _query_config_version(db)
+
+
+def _query_config_version(db: Session) -> tuple:
+    """(row count, max revision); changes on every insert, update and delete"""
+    return tuple(db.query(func.count(Config.id), func.max(Config.revision)).one())
 
-def get_config_value(key: str, db: Session = None):
+
+config_cache.bind(loader=_load_all_configs, key_loader=_load_config, version_loader=_fetch_config_version,
+                  keys_loader=_load_configs)
+
+
+_MISSING = object()
+
+
+def get_config_value(key: str, db: Session = None, default=_MISSING):
     """
     Universal function to get configuration values based on the key.
     Args:
         key (str): The configuration key to look for.
-        db (Session): Optional database session. If not provided, a temporary session is used.
+        db (Session): Optional database session. If provided, the value is read through it
+            (bypassing the cache); otherwise it is served from the in-process config cache.
+        default: Optional value returned when the key does not exist.
     Returns:
         str: The configuration value.
     Raises:
-        ValueError: If the key is not found or there's a database error.
+        ValueError: If the key is not found (and no default is given) or there's a database error.
     """
-    own_session = False
-    if db is None:
-        db = SessionLocal()
-        own_session = True
-
     try:
-        config_value = db.query(Config.value).filter(key == Config.key).scalar()
+        if db is None:
+            config_value = config_cache.get(key)
+        else:
+            config_value = db.query(Config.value).filter(key == Config.key).scalar()
 
         if config_value is None:
+            if default is not _MISSING:
+                return default
             raise ValueError(f"Configuration for key '{key}' not found.")
 
         return config_value
     except Exception as e:
         raise ValueError(f"Error fetching config for key '{key}': {str(e)}")
-    finally:
-        if own_session:
-            db.close()
 
 
 def set_config_value(key: str, value: str, db: Session = None) -> None:
@@ -48,6 +99,7 @@ def set_config_value(key: str, value: str, db: Session = None) -> None:
     """
     own_session = False
     if db is None:
+        ensure_database()
         db = SessionLocal()
         own_session = True
 
@@ -66,6 +118,8 @@ def set_config_value(key: str, value: str, db: Session = None) -> None:
         # Only commit if we own the session
         if own_session:
             db.commit()
+            # Write-through; callers owning the session get the key invalidated on flush instead
+            config_cache.set(key, value)
 
     except SQLAlchemyError as e:
         if own_session:
@@ -73,4 +127,135 @@ def set_config_value(key: str, value: str, db: Session = None) -> None:
         raise ValueError(f"Error setting config for key '{key}': {str(e)}")
     finally:
         if own_session:
-            db.close()
\ No newline at end of file
+            db.close()
+
+
+def get_config_values(keys: list = None, db: Session = None) -> dict:
+    """
+    Bulk version of get_config_value().
+    Args:
+        keys (list): Configuration keys to read; None reads every key.
+        db (Session): Optional database session. If provided, all keys are read through it
+            in one query; otherwise they are served from the config cache (misses in one query).
+    Returns:
+        dict: key -> value for the keys that exist.
+    Raises:
+        ValueError: If there's a database error.
+    """
+    try:
+        if db is not None:
+            return _query_configs(db, keys)
+        if keys is None:
+            return _load_all_configs()
+        return config_cache.get_many(keys)
+    except Exception as e:
+        raise ValueError(f"Error fetching configs: {str(e)}")
+
+
+def set_config_values(values: dict, db: Session = None) -> int:
+    """
+    Bulk version of set_config_value(): one INSERT ... ON CONFLICT DO UPDATE statement,
+    executed for every key in a single transaction.
+
+    Args:
+        values (dict): key -> value
+        db (Session): Optional database session (will create temporary if not provided)
+
+    Returns:
+        int: Number of keys written
+
+    Raises:
+        ValueError: On database codes
+    """
+    if not values:
+        return 0
+
+    own_session = False
+    if db is None:
+        ensure_database()
+        db = SessionLocal()
+        own_session = True
+
+    now = int(time.time())
+    statement = insert(Config)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Config.key],
+        set_={"value": statement.excluded.value, "updated_at": statement.excluded.updated_at,
+              "revision": NEXT_CONFIG_REVISION},
+    )
+    try:
+        # Core statement, so the Config ORM events don't fire: keep the cache in step here
+        db.execute(statement, [{"key": key, "value": str(value), "updated_at": now} for key, value in values.items()])
+        for key in values:
+            config_cache.invalidate(key)
+
+        if own_session:
+            db.commit()
+            config_cache.update(values)
+        else:
+            db.info.setdefault("config_keys", set()).update(values)
+        return len(values)
+
+    except SQLAlchemyError as e:
+        if own_session:
+            db.rollback()
+        raise ValueError(f"Error setting configs: {str(e)}")
+    finally:
+        if own_session:
+            db.close()
+
+
+async def get_config_value_async(key: str, db: AsyncSession = None, default=_MISSING):
+    """
+    get_config_value() for async callers; never blocks the event loop.
+    Cache hits are served inline, misses and version polls run in a worker thread.
+    With db given, the value is read through that AsyncSession (bypassing the cache).
+    """
+    try:
+        if db is None:
+            config_value = config_cache.peek(key)
+            if config_value is None:
+                config_value = await to_thread.run_sync(config_cache.get, key)
+        else:
+            config_value = await db.scalar(select(Config.value).where(key == Config.key))
+
+        if config_value is None:
+            if default is not _MISSING:
+                return default
+            raise ValueError(f"Configuration for key '{key}' not found.")
+
+        return config_value
+    except Exception as e:
+        raise ValueError(f"Error fetching config for key '{key}': {str(e)}")
+
+
+async def set_config_value_async(key: str, value: str, db: AsyncSession = None) -> None:
+    """
+    set_config_value() through an AsyncSession.
+    Commits (and writes through to the cache) only when it opens the session itself.
+    """
+    own_session = False
+    if db is None:
+        await ensure_database_async()
+        db = AsyncSessionLocal()
+        own_session = True
+
+    try:
+        config_entry = await db.scalar(select(Config).where(key == Config.key))
+
+        if config_entry:
+            config_entry.value = value
+        else:
+            db.add(Config(key=key, value=value))
+
+        if own_session:
+            await db.commit()
+            config_cache.set(key, value)
+
+    except SQLAlchemyError as e:
+        if own_session:
+            await db.rollback()
+        raise ValueError(f"Error setting config for key '{key}': {str(e)}")
+    finally:
+        if own_session:
+            await db.close()
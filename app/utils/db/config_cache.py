@@ -0,0 +1,135 @@
+import threading
+import time
+from typing import Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Seconds between version polls of the config table. 0 disables polling, which is
+# fine for a single worker since every write in this process goes through the cache.
+DEFAULT_CACHE_TTL = 0
+
+
+class ConfigCache:
+    """
+    Process-local cache fronting the config table.
+
+    The cache is filled in one query on first use and kept current by write-through
+    from set_config_value/load_default_configs and by the ORM events on Config.
+    When a TTL is set, the table version (row count + latest revision) is polled at
+    most once per TTL so other uvicorn workers pick up changes. Keys absent from the
+    last full load are reported missing without a query unless they were invalidated since.
+
+    The loaders are bound by app.utils.db.config to keep this module free of
+    database imports (app.database.config registers events against it).
+    """
+
+    def __init__(self, ttl: float = DEFAULT_CACHE_TTL):
+        self.ttl = ttl
+        self._values: dict[str, str] = {}
+        # Keys dropped since the last full load; only these can exist without being cached
+        self._invalidated: set[str] = set()
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._loader: Optional[Callable[[], dict]] = None
+        self._key_loader: Optional[Callable[[str], Optional[str]]] = None
+        self._version_loader: Optional[Callable[[], tuple]] = None
+        self._keys_loader: Optional[Callable[[list], dict]] = None
+
+    def bind(self, loader: Callable[[], dict], key_loader: Callable[[str], Optional[str]],
+             version_loader: Callable[[], tuple], keys_loader: Callable[[list], dict] = None) -> None:
+        """Attach the functions used to read all rows, a single row, the table version and a set of rows."""
+        self._loader = loader
+        self._key_loader = key_loader
+        self._version_loader = version_loader
+        self._keys_loader = keys_loader
+
+    def load(self) -> None:
+        """(Re)fill the cache from the database in a single query."""
+        with self._lock:
+            self._values = {key: str(value) for key, value in self._loader().items()}
+            self._invalidated = set()
+            if "CONFIG_CACHE_TTL" in self._values:
+                self.ttl = float(self._values["CONFIG_CACHE_TTL"])
+            self._version = self._version_loader()
+            self._checked_at = time.monotonic()
+            self._loaded = True
+
+    def _refresh_if_stale(self) -> None:
+        if not self._loaded:
+            self.load()
+            return
+        if self.ttl and time.monotonic() - self._checked_at >= self.ttl:
+            self._checked_at = time.monotonic()
+            if self._version_loader() != self._version:
+                self.load()
+
+    def get(self, key: str, cast: Callable[[str], T] = str) -> Optional[T]:
+        """
+        Get a cached configuration value.
+        Args:
+            key (str): The configuration key to look for.
+            cast (Callable): Converter applied to the stored string, e.g. int.
+        Returns:
+            The converted value, or None if the key does not exist.
+        """
+        self._refresh_if_stale()
+        value = self._values.get(key)
+        if value is None:
+            if key not in self._invalidated:
+                # The full load saw every key, so this one doesn't exist
+                return None
+            # Invalidated - fall back to a single-row read
+            value = self._key_loader(key)
+            self._invalidated.discard(key)
+            if value is None:
+                return None
+            value = str(value)
+            self._values[key] = value
+        return cast(value)
+
+    def get_many(self, keys: list) -> dict:
+        """
+        Cached values of keys. Keys missing from the cache are read in a single query;
+        keys that don't exist are left out of the result.
+        """
+        self._refresh_if_stale()
+        values = self._values
+        found = {key: values[key] for key in keys if key in values}
+        missing = [key for key in keys if key not in found and key in self._invalidated]
+        if missing:
+            loaded = {key: str(value) for key, value in self._keys_loader(missing).items()}
+            self._invalidated.difference_update(missing)
+            self._values.update(loaded)
+            found.update(loaded)
+        return found
+
+    def peek(self, key: str) -> Optional[str]:
+        """Cached value without touching the database; None if missing or a reload/poll is due."""
+        if not self._loaded or (self.ttl and time.monotonic() - self._checked_at >= self.ttl):
+            return None
+        return self._values.get(key)
+
+    def set(self, key: str, value) -> None:
+        """Write-through a committed value."""
+        self._values[key] = str(value)
+        self._invalidated.discard(key)
+
+    def update(self, values: dict) -> None:
+        """Write-through several committed values."""
+        self._values.update({key: str(value) for key, value in values.items()})
+        self._invalidated.difference_update(values)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Drop one key (or everything) so the next read goes to the database."""
+        if key is None:
+            with self._lock:
+                self._values = {}
+                self._loaded = False
+        else:
+            self._values.pop(key, None)
+            self._invalidated.add(key)
+
+
+config_cache = ConfigCache()
@@ -1,9 +1,17 @@
-from app.database import SessionLocal
+from app.database import AsyncSessionLocal, SessionLocal
+from app.database.db_setup import ensure_database, ensure_database_async
 
 
 def get_db():
+    ensure_database()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        yield db
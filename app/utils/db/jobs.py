@@ -0,0 +1,209 @@
+"""
+Async persistence for the scheduler: job definitions, run history and the leader lease.
+"""
+import json
+import time
+from typing import Optional
+
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.database import AsyncSessionLocal, JobRun, JobsVersion, ScheduledJob, SchedulerLease
+from app.database.db_setup import ensure_database_async
+
+LEASE_NAME = "scheduler"
+# Runs kept per job; older ones are deleted as new ones are recorded
+DEFAULT_RUN_HISTORY = 100
+
+JOB_FIELDS = ("name", "trigger_type", "trigger", "task_type", "task", "enabled")
+
+
+def _columns(values: dict) -> dict:
+    """Column values of a job definition; the task is stored as JSON"""
+    columns = {field: values[field] for field in JOB_FIELDS}
+    columns["task"] = json.dumps(values["task"])
+    return columns
+
+
+def job_to_dict(job: ScheduledJob) -> dict:
+    return {
+        "id": job.id,
+        "name": job.name,
+        "trigger_type": job.trigger_type,
+        "trigger": job.trigger,
+        "task_type": job.task_type,
+        "task": json.loads(job.task),
+        "enabled": job.enabled,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+def run_to_dict(run: JobRun) -> dict:
+    return {
+        "id": run.id,
+        "job_id": run.job_id,
+        "scheduled_at": run.scheduled_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "status": run.status,
+        "manual": run.manual,
+        "detail": run.detail,
+    }
+
+
+async def load_jobs() -> list:
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        return [job_to_dict(job) for job in (await db.scalars(select(ScheduledJob).order_by(ScheduledJob.id))).all()]
+
+
+async def get_job(job_id: int) -> Optional[dict]:
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        job = await db.get(ScheduledJob, job_id)
+        return job_to_dict(job) if job is not None else None
+
+
+async def jobs_version() -> int:
+    """Counter bumped by every insert, update and delete of a job; 0 before the first one"""
+    async with AsyncSessionLocal() as db:
+        return (await db.scalar(select(JobsVersion.value).where(JobsVersion.id == 1))) or 0
+
+
+async def _bump_version(db) -> None:
+    """Count a change to the job table; part of the caller's transaction"""
+    statement = insert(JobsVersion).values(id=1, value=1)
+    await db.execute(statement.on_conflict_do_update(index_elements=[JobsVersion.id],
+                                                     set_={"value": JobsVersion.value + 1}))
+
+
+async def create_job(values: dict) -> dict:
+    """
+    Raises:
+        ValueError: On database errors, e.g. a duplicate name
+    """
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        job = ScheduledJob(**_columns(values))
+        db.add(job)
+        try:
+            await db.flush()
+            await _bump_version(db)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError(f"A job named '{values['name']}' already exists")
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise ValueError(f"Error creating job '{values['name']}': {str(e)}")
+        await db.refresh(job)
+        return job_to_dict(job)
+
+
+async def update_job(job_id: int, values: dict) -> Optional[dict]:
+    """
+    Returns:
+        dict: The updated job, None if there is no job with that id
+    Raises:
+        ValueError: On database errors, e.g. a duplicate name
+    """
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        job = await db.get(ScheduledJob, job_id)
+        if job is None:
+            return None
+        for field, value in _columns(values).items():
+            setattr(job, field, value)
+        try:
+            await db.flush()
+            await _bump_version(db)
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            raise ValueError(f"A job named '{values['name']}' already exists")
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise ValueError(f"Error updating job {job_id}: {str(e)}")
+        await db.refresh(job)
+        return job_to_dict(job)
+
+
+async def delete_job(job_id: int) -> bool:
+    """Delete a job and its run history. :return: False if there is no job with that id"""
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        try:
+            await db.execute(delete(JobRun).where(JobRun.job_id == job_id))
+            deleted = (await db.execute(delete(ScheduledJob).where(ScheduledJob.id == job_id))).rowcount
+            if deleted:
+                await _bump_version(db)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            raise ValueError(f"Error deleting job {job_id}: {str(e)}")
+        return bool(deleted)
+
+
+async def record_run(run: dict, keep: int = DEFAULT_RUN_HISTORY) -> None:
+    """Store a finished run and trim the job's history to the newest `keep` runs"""
+    async with AsyncSessionLocal() as db:
+        db.add(JobRun(**run))
+        await db.flush()
+        oldest_kept = (select(JobRun.id).where(JobRun.job_id == run["job_id"])
+                       .order_by(JobRun.id.desc()).offset(keep - 1).limit(1).scalar_subquery())
+        await db.execute(delete(JobRun).where(JobRun.job_id == run["job_id"], JobRun.id < oldest_kept))
+        await db.commit()
+
+
+async def list_runs(job_id: int, limit: int = 20) -> list:
+    """Newest first"""
+    await ensure_database_async()
+    async with AsyncSessionLocal() as db:
+        runs = await db.scalars(select(JobRun).where(JobRun.job_id == job_id).order_by(JobRun.id.desc()).limit(limit))
+        return [run_to_dict(run) for run in runs.all()]
+
+
+async def job_stats(job_ids: list = None) -> dict:
+    """
+    Per job aggregates over the kept run history: runs, failures (failed or timed out),
+    overruns, average / max duration and average / max lag (start delay), in seconds
+    """
+    await ensure_database_async()
+    duration = JobRun.finished_at - JobRun.started_at
+    lag = JobRun.started_at - JobRun.scheduled_at
+    query = (select(JobRun.job_id, func.count(JobRun.id),
+                    func.sum(case((JobRun.status.in_(("failed", "timeout")), 1), else_=0)),
+                    func.sum(case((JobRun.status == "overrun", 1), else_=0)),
+                    func.avg(duration), func.max(duration), func.avg(lag), func.max(lag))
+             .group_by(JobRun.job_id))
+    if job_ids is not None:
+        query = query.where(JobRun.job_id.in_(job_ids))
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(query)).all()
+    return {job_id: {"runs": runs, "failures": failures, "overruns": overruns, "avg_duration": avg_duration,
+                     "max_duration": max_duration, "avg_lag": avg_lag, "max_lag": max_lag}
+            for job_id, runs, failures, overruns, avg_duration, max_duration, avg_lag, max_lag in rows}
+
+
+async def acquire_lease(owner: str, ttl: float) -> bool:
+    """Take or renew the scheduler lease; succeeds if it is free, expired or already ours"""
+    now = time.time()
+    statement = insert(SchedulerLease).values(name=LEASE_NAME, owner=owner, expires_at=now + ttl)
+    statement = statement.on_conflict_do_update(
+        index_elements=[SchedulerLease.name],
+        set_={"owner": statement.excluded.owner, "expires_at": statement.excluded.expires_at},
+        where=(SchedulerLease.owner == owner) | (SchedulerLease.expires_at < now),
+    )
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(statement)
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def release_lease(owner: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(SchedulerLease).where(SchedulerLease.name == LEASE_NAME, SchedulerLease.owner == owner)
+                         .values(expires_at=0))
+        await db.commit()
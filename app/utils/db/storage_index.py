@@ -0,0 +1,184 @@
+"""
+Persistence and queries of the disk usage index (storage_dir / storage_file / storage_root).
+
+Functions take an optional session, like app.utils.db.config, so the benchmark can run
+them against a scratch database.
+"""
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, StorageDir, StorageFile, StorageRoot
+from app.database.db_setup import ensure_database
+
+# Bound parameters per IN (...) / executemany chunk, under SQLite's variable limit
+CHUNK = 500
+DIR_FIELDS = ("root", "path", "parent", "depth", "mtime_ns", "own_bytes", "own_files", "total_bytes", "total_files",
+              "total_dirs")
+
+
+@contextmanager
+def _session(db: Session = None):
+    if db is not None:
+        yield db
+        return
+    ensure_database()
+    with SessionLocal() as session:
+        yield session
+
+
+def _chunks(values: list):
+    for start in range(0, len(values), CHUNK):
+        yield values[start:start + CHUNK]
+
+
+def subtree_bounds(path: str) -> tuple:
+    """(low, high) such that low <= p < high for exactly the paths below path"""
+    prefix = path.rstrip("/") + "/"
+    # "0" sorts right after "/"
+    return prefix, prefix[:-1] + "0"
+
+
+def load_index(root: str, db: Session = None) -> dict:
+    """:return: path -> stored row (as a dict) of every directory of a root"""
+    columns = [getattr(StorageDir, field) for field in DIR_FIELDS]
+    with _session(db) as session:
+        return {row.path: row._asdict() for row in session.execute(select(*columns).where(StorageDir.root == root))}
+
+
+def write_index(root: str, changed: list, removed: list, listed: dict, db: Session = None) -> None:
+    """
+    Apply a scan's changes in one transaction.
+    Args:
+        changed (list): Directory rows (dicts of DIR_FIELDS) that are new or differ from the index
+        removed (list): Paths of directories that no longer exist
+        listed (dict): Directory path -> [(file path, bytes, mtime)] of large files, for every
+                       re-listed directory; the files stored for the other directories are kept
+    """
+    with _session(db) as session:
+        try:
+            for paths in _chunks(removed):
+                session.execute(delete(StorageDir).where(StorageDir.path.in_(paths)))
+            for directories in _chunks(removed + list(listed)):
+                session.execute(delete(StorageFile).where(StorageFile.directory.in_(directories)))
+            if changed:
+                statement = insert(StorageDir)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[StorageDir.path],
+                    set_={field: statement.excluded[field] for field in DIR_FIELDS if field != "path"})
+                for rows in _chunks(changed):
+                    session.execute(statement, rows)
+            files = [{"directory": directory, "path": path, "bytes": size, "mtime": mtime}
+                     for directory, entries in listed.items() for path, size, mtime in entries]
+            if files:
+                statement = insert(StorageFile)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[StorageFile.path],
+                    set_={"directory": statement.excluded.directory, "bytes": statement.excluded.bytes,
+                          "mtime": statement.excluded.mtime})
+                for rows in _chunks(files):
+                    session.execute(statement, rows)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+
+def record_scan(root: str, values: dict, db: Session = None) -> None:
+    statement = insert(StorageRoot).values(root=root, **values)
+    statement = statement.on_conflict_do_update(index_elements=[StorageRoot.root], set_=values)
+    with _session(db) as session:
+        session.execute(statement)
+        session.commit()
+
+
+def scanned_roots(db: Session = None) -> dict:
+    """:return: root -> last scan outcome and the root's totals"""
+    with _session(db) as session:
+        rows = session.execute(select(StorageRoot, StorageDir.total_bytes, StorageDir.total_files,
+                                      StorageDir.total_dirs)
+                               .outerjoin(StorageDir, StorageDir.path == StorageRoot.root)).all()
+    return {
+        scan.root: {
+            "status": scan.status,
+            "full": bool(scan.full),
+            "started_at": scan.started_at,
+            "finished_at": scan.finished_at,
+            "duration": scan.finished_at - scan.started_at if scan.finished_at and scan.started_at else None,
+            "dirs_listed": scan.dirs_listed,
+            "dirs_unchanged": scan.dirs_unchanged,
+            "rows_written": scan.rows_written,
+            "detail": scan.detail,
+            "bytes": total_bytes,
+            "files": total_files,
+            "dirs": total_dirs,
+        }
+        for scan, total_bytes, total_files, total_dirs in rows
+    }
+
+
+def _node(row: StorageDir) -> dict:
+    return {"path": row.path, "bytes": row.total_bytes, "files": row.total_files, "dirs": row.total_dirs,
+            "own_bytes": row.own_bytes, "own_files": row.own_files}
+
+
+def usage_tree(path: str, depth: int = 1, limit: int = 50, db: Session = None) -> Optional[dict]:
+    """
+    Indexed usage of a directory and its subdirectories down to `depth` levels, largest
+    first and at most `limit` per directory (the rest are summed up in omitted_*).
+    Reads one level at a time, only below the directories kept.
+    :return: Nested nodes, None if the directory isn't indexed
+    """
+    with _session(db) as session:
+        row = session.scalars(select(StorageDir).where(StorageDir.path == path)).one_or_none()
+        if row is None:
+            return None
+        tree = _node(row)
+        level = {row.path: tree}
+        for _ in range(depth):
+            children = {}
+            for parents in _chunks(list(level)):
+                for child in session.scalars(select(StorageDir).where(StorageDir.parent.in_(parents))):
+                    children.setdefault(child.parent, []).append(child)
+            next_level = {}
+            for parent, node in level.items():
+                rows = sorted(children.get(parent, []), key=lambda child: child.total_bytes, reverse=True)
+                node["children"] = [_node(child) for child in rows[:limit]]
+                if len(rows) > limit:
+                    node["omitted_dirs"] = len(rows) - limit
+                    node["omitted_bytes"] = sum(child.total_bytes for child in rows[limit:])
+                next_level.update((child["path"], child) for child in node["children"])
+            level = next_level
+            if not level:
+                break
+    return tree
+
+
+def largest_files(path: str, limit: int = 20, db: Session = None) -> list:
+    """Largest indexed files below path; only files of at least STORAGE_LARGE_FILE_BYTES are indexed"""
+    low, high = subtree_bounds(path)
+    with _session(db) as session:
+        rows = session.scalars(select(StorageFile).where(StorageFile.path >= low, StorageFile.path < high)
+                               .order_by(StorageFile.bytes.desc()).limit(limit))
+        return [{"path": row.path, "bytes": row.bytes, "mtime": row.mtime} for row in rows]
+
+
+def largest_dirs(path: str, limit: int = 20, db: Session = None) -> list:
+    """Directories at or below path holding the most bytes in files directly inside them"""
+    low, high = subtree_bounds(path)
+    with _session(db) as session:
+        rows = session.scalars(select(StorageDir)
+                               .where((StorageDir.path == path) | ((StorageDir.path >= low) & (StorageDir.path < high)))
+                               .order_by(StorageDir.own_bytes.desc()).limit(limit))
+        return [_node(row) for row in rows]
+
+
+def scan_started(root: str, full: bool, db: Session = None) -> float:
+    started_at = time.time()
+    record_scan(root, {"started_at": started_at, "finished_at": None, "status": "running", "full": int(full),
+                       "dirs_listed": 0, "dirs_unchanged": 0, "rows_written": 0, "detail": ""}, db)
+    return started_at
@@ -0,0 +1,14 @@
+"""JSON to bytes, through orjson when it is installed"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(value) -> bytes:
+    """Compact JSON, UTF-8 encoded (the same output as starlette's JSONResponse)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
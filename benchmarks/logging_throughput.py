@@ -0,0 +1,75 @@
+"""
+Request throughput with DEBUG logging on, writing through the queue pipeline versus
+formatting and writing synchronously on the request path (the previous setup).
+Console output goes to /dev/null; the log file is written to the current directory.
+Run from the repo root:  python -m benchmarks.logging_throughput
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+
+def use_direct_handlers(logger, queue_handler, handlers):
+    logger.removeHandler(queue_handler)
+    for handler in handlers:
+        logger.addHandler(handler)
+
+
+def use_queue_handler(logger, queue_handler, handlers):
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(queue_handler)
+
+
+async def requests_per_second(client, path, requests, concurrency):
+    async def worker(count):
+        for _ in range(count):
+            await client.get(path)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(requests // concurrency) for _ in range(concurrency)])
+    return requests / (time.perf_counter() - start)
+
+
+def calls_per_second(logger, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        logger.debug("BENCH01_OK iteration %d", i)
+    return calls / (time.perf_counter() - start)
+
+
+async def run(args):
+    from app.core import logger as logger_module
+    from app.core.rate_limiter import RateLimiter
+    from app.endpoints.users import users_router
+    from app.main import app
+
+    logger = logger_module.logger
+    handlers = logger_module.log_listener.handlers
+    logger_module.console_handler.setStream(open(os.devnull, "w"))
+    for dependency in users_router.dependencies:
+        if isinstance(dependency.dependency, RateLimiter):
+            app.dependency_overrides[dependency.dependency] = lambda: True
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get("/users/root")  # warm the user directory
+        for mode, configure in (("direct", use_direct_handlers), ("queue", use_queue_handler)):
+            configure(logger, logger_module.queue_handler, handlers)
+            rps = await requests_per_second(client, "/users/root", args.requests, args.concurrency)
+            cps = calls_per_second(logger, args.calls)
+            logger_module.log_queue.join()
+            print(f"{mode:>6}: {rps:9.0f} req/s   {cps:9.0f} logger.debug calls/s")
+
+    print("pipeline counters:", logger_module.get_log_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=50000)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Throughput of rejected (429) requests: the pre-serialized ProblemDetails renderer versus
+building and dumping the pydantic model per error (the previous handler).
+Every request after the first in a window is over the limit, so nearly all responses are 429s.
+Run from the repo root:  python -m benchmarks.rate_limit_429
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+from fastapi import HTTPException, Request
+from starlette.responses import JSONResponse
+
+
+async def legacy_exception_handler(request: Request, exc: HTTPException) -> JSONResponse:
+    from app.models.problem_details import ProblemDetails
+
+    problem_details = ProblemDetails(type="/codes", title=exc.title, status=exc.status_code, detail=str(exc.detail),
+                                     instance=str(request.url), code=exc.code)
+    return JSONResponse(status_code=exc.status_code, content=problem_details.model_dump())
+
+
+def render_per_second(render, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        render()
+    return calls / (time.perf_counter() - start)
+
+
+async def responses_per_second(handler, request, exc, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        await handler(request, exc)
+    return calls / (time.perf_counter() - start)
+
+
+async def requests_per_second(client, path, requests, concurrency):
+    statuses = []
+
+    async def worker(count):
+        for _ in range(count):
+            statuses.append((await client.get(path)).status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(requests // concurrency) for _ in range(concurrency)])
+    return requests / (time.perf_counter() - start), statuses.count(429) / len(statuses)
+
+
+async def run(args):
+    from app.core import logger as logger_module
+    from app.core.rate_limiter import RateLimiter
+    from app.endpoints.users import users_router
+    from app.exceptions.global_exception import GlobalHTTPException
+    from app.exceptions.handlers import general_exception_handler, render_problem
+    from app.main import app
+
+    logger_module.console_handler.setStream(open(os.devnull, "w"))
+    limiter = RateLimiter(requests_limit=1, time_window=3600)
+    for dependency in users_router.dependencies:
+        if isinstance(dependency.dependency, RateLimiter):
+            app.dependency_overrides[dependency.dependency] = limiter
+
+    exc = GlobalHTTPException(status_code=429, title="Too Many Requests", detail=limiter.limit_detail, code="API01_LIMIT")
+    scope = {"type": "http", "method": "GET", "path": "/users", "query_string": b"", "headers": [],
+             "server": ("bench", 80), "scheme": "http"}
+    request = Request(scope)
+    print("handler only:")
+    for name, handler in (("pydantic", legacy_exception_handler), ("template", general_exception_handler)):
+        print(f"{name:>9}: {await responses_per_second(handler, request, exc, args.calls):10.0f} responses/s")
+    body_rate = render_per_second(lambda: render_problem("API01_LIMIT", "Too Many Requests", 429, exc.detail,
+                                                         "http://bench/users"), args.calls)
+    print(f"{'body':>9}: {body_rate:10.0f} render_problem/s")
+
+    print("end to end:")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, handler in (("pydantic", legacy_exception_handler), ("template", general_exception_handler)):
+            app.exception_handlers[HTTPException] = handler
+            rps, rejected = await requests_per_second(client, "/users/root", args.requests, args.concurrency)
+            print(f"{name:>9}: {rps:10.0f} req/s ({rejected:.0%} 429)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=100000)
+    asyncio.run(run(parser.parse_args()))
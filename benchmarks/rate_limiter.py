@@ -0,0 +1,55 @@
+"""
+Per-request overhead of RateLimiter.allow() with many tracked clients, for every
+algorithm, compared with the previous implementation's full expiry scan.
+Run from the repo root:  python -m benchmarks.rate_limiter
+"""
+import argparse
+import random
+import time
+
+from app.core.rate_limiter import ALGORITHMS, RateLimiter
+
+
+def legacy_hit(counters, key, now, limit, window):
+    """The pre-engine limiter: fixed window plus a scan of every key on every request"""
+    entry = counters.get(key)
+    if entry is None or now - entry["timestamp"] > window:
+        counters[key] = {"timestamp": now, "count": 1}
+    elif entry["count"] < limit:
+        entry["count"] += 1
+    for k in list(counters.keys()):
+        if now - counters[k]["timestamp"] > window:
+            counters.pop(k)
+
+
+def bench(clients, requests, algorithm):
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:/users" for i in range(clients)]
+    order = [random.choice(keys) for _ in range(requests)]
+    now = 1000.0
+
+    if algorithm == "legacy":
+        counters = {key: {"timestamp": now, "count": 1} for key in keys}
+        start = time.perf_counter()
+        for key in order:
+            legacy_hit(counters, key, now, 10, 60)
+    else:
+        limiter = RateLimiter(requests_limit=10, time_window=60, algorithm=algorithm, max_clients=clients)
+        for key in keys:
+            limiter.allow(key, now)
+        start = time.perf_counter()
+        for i, key in enumerate(order):
+            limiter.allow(key, now + i * 1e-6)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--legacy-requests", type=int, default=200, help="the legacy scan is O(clients) per call")
+    args = parser.parse_args()
+
+    for clients in args.clients:
+        for algorithm in [*ALGORITHMS, "legacy"]:
+            requests = args.legacy_requests if algorithm == "legacy" else args.requests
+            print(f"{clients:>7} clients  {algorithm:<15} {bench(clients, requests, algorithm):10.2f} us/request")
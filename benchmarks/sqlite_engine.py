@@ -0,0 +1,79 @@
+"""
+Concurrent config reads and writes against a scratch SQLite file, per engine profile
+("default" is SQLite's rollback journal as before, "wal" the tuned profile).
+Reader threads query Config rows directly (no cache); writer threads update and commit.
+Run from the repo root:  python -m benchmarks.sqlite_engine
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.engine_profiles import create_sqlite_engine, get_pool_stats
+from app.utils.db.config import get_config_value, set_config_value
+
+KEYS = [f"BENCH_KEY_{i}" for i in range(50)]
+
+
+def worker(Session, write, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        key = KEYS[i % len(KEYS)]
+        start = time.perf_counter()
+        try:
+            with Session() as db:
+                if write:
+                    set_config_value(key, str(i), db=db)
+                    db.commit()
+                else:
+                    get_config_value(key, db=db)
+            latencies.append(time.perf_counter() - start)
+        except ValueError:
+            errors.append(key)
+        i += 1
+
+
+def bench(profile, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(directory, 'bench.sqlite')}", profile=profile)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        with Session() as db:
+            for key in KEYS:
+                set_config_value(key, "0", db=db)
+            db.commit()
+
+        read_latencies, write_latencies, errors = [], [], []
+        deadline = time.perf_counter() + seconds
+        threads = [threading.Thread(target=worker, args=(Session, False, deadline, read_latencies, errors))
+                   for _ in range(readers)]
+        threads += [threading.Thread(target=worker, args=(Session, True, deadline, write_latencies, errors))
+                    for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = get_pool_stats(engine, profile)
+        engine.dispose()
+
+    def p99(values):
+        return statistics.quantiles(values, n=100)[98] * 1000 if len(values) > 1 else 0.0
+
+    print(f"{profile:>8}: reads {len(read_latencies) / seconds:8.0f}/s p99 {p99(read_latencies):7.2f} ms   "
+          f"writes {len(write_latencies) / seconds:6.0f}/s p99 {p99(write_latencies):7.2f} ms   "
+          f"errors {len(errors)}   pool {stats['pool']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    for name in ("default", "wal"):
+        bench(name, args.readers, args.writers, args.seconds)
@@ -0,0 +1,48 @@
+"""
+Cold start cost of importing app.main in a fresh interpreter.
+With --import-time the per-module cumulative import cost (python -X importtime) is reported,
+heaviest first.
+Run from the repo root:  python -m benchmarks.startup --import-time
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+def import_seconds():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def import_times():
+    """:return: list of (cumulative microseconds, module name) from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"],
+                            check=True, capture_output=True, text=True)
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.append((int(cumulative), name.strip()))
+    return sorted(modules, reverse=True)
+
+
+def run(args):
+    samples = [import_seconds() for _ in range(args.runs)]
+    print(f"import app.main: median {statistics.median(samples) * 1000:.0f} ms "
+          f"(min {min(samples) * 1000:.0f} ms, {args.runs} runs)")
+    if args.import_time:
+        print(f"\n{'cumulative ms':>14}  module")
+        for cumulative, name in import_times()[:args.top]:
+            print(f"{cumulative / 1000:14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-time", action="store_true", help="report per-module import cost")
+    parser.add_argument("--top", type=int, default=25, help="modules listed with --import-time")
+    run(parser.parse_args())
@@ -0,0 +1,131 @@
+"""
+Disk usage indexer on a synthetic tree: a du-style single-threaded walk that stats every
+file, against a full indexer scan, an incremental re-scan with nothing changed, and one
+after files were added to --changed-percent of the directories. Then usage queries
+answered from the index.
+
+The tree has --fanout subdirectories per directory down to --depth levels and --files
+small files per directory. Everything runs against a scratch SQLite file in a temporary
+directory; the page cache is warmed by one walk first, so the numbers are CPU and syscall
+bound, not disk bound.
+Run from the repo root:  python -m benchmarks.storage_index --fanout 8 --depth 4 --files 20
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from app.database.base import Base
+from app.database.engine_profiles import create_sqlite_engine
+from app.server.storage.indexer import scan_root
+from app.utils.db.storage_index import largest_dirs, largest_files, usage_tree
+
+
+def build_tree(root, fanout, depth, files):
+    """:return: list of the directories created"""
+    directories = [root]
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for i in range(fanout):
+                path = os.path.join(parent, f"d{i}")
+                os.mkdir(path)
+                next_level.append(path)
+        directories += next_level
+        level = next_level
+    for directory in directories:
+        for i in range(files):
+            with open(os.path.join(directory, f"f{i}"), "wb") as file:
+                file.write(b"x" * (i * 512))
+    return directories
+
+
+def du(root):
+    """Reference: what a naive du does, one lstat per entry, single-threaded"""
+    total = 0
+    for directory, _, names in os.walk(root):
+        total += os.lstat(directory).st_blocks * 512
+        for name in names:
+            total += os.lstat(os.path.join(directory, name)).st_blocks * 512
+    return total
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def query_latencies(func, repeats, *args):
+    samples = [timed(func, *args)[0] * 1000 for _ in range(repeats)]
+    return {"p50_ms": statistics.median(samples), "p99_ms": statistics.quantiles(samples, n=100)[98]}
+
+
+def main(args):
+    results = {"params": vars(args).copy(), "scans": {}, "queries": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        root = os.path.realpath(os.path.join(workdir, "tree"))
+        os.mkdir(root)
+        build_seconds, directories = timed(build_tree, root, args.fanout, args.depth, args.files)
+        print(f"tree: {len(directories)} directories, {len(directories) * args.files} files "
+              f"(built in {build_seconds:.1f}s)")
+
+        engine = create_sqlite_engine(f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        du(root)  # warm the page cache
+        seconds, expected = timed(du, root)
+        results["scans"]["du_walk"] = {"seconds": seconds}
+
+        with Session() as db:
+            seconds, counts = timed(scan_root, root, args.workers, full=True, db=db)
+            results["scans"]["full_scan"] = {"seconds": seconds, **counts}
+            seconds, counts = timed(scan_root, root, args.workers, db=db)
+            results["scans"]["incremental_unchanged"] = {"seconds": seconds, **counts}
+
+            changed = random.Random(0).sample(directories, max(1, len(directories) * args.changed_percent // 100))
+            for directory in changed:
+                with open(os.path.join(directory, "added"), "wb") as file:
+                    file.write(b"x" * 4096)
+            expected = du(root)
+            seconds, counts = timed(scan_root, root, args.workers, db=db)
+            results["scans"]["incremental_changed"] = {"seconds": seconds, **counts}
+
+            indexed = usage_tree(root, 0, db=db)["bytes"]
+            if indexed != expected:
+                raise SystemExit(f"Index total {indexed} != du total {expected}")
+
+            results["queries"]["usage_depth_1"] = query_latencies(usage_tree, args.repeats, root, 1, 50, db)
+            results["queries"]["usage_depth_3"] = query_latencies(usage_tree, args.repeats, root, 3, 10, db)
+            results["queries"]["largest_dirs_20"] = query_latencies(largest_dirs, args.repeats, root, 20, db)
+            results["queries"]["largest_files_20"] = query_latencies(largest_files, args.repeats, root, 20, db)
+        engine.dispose()
+
+    for name, scan in results["scans"].items():
+        extra = "  ".join(f"{key} {value}" for key, value in scan.items() if key != "seconds")
+        print(f"{name:>22}: {scan['seconds'] * 1000:9.1f} ms  {extra}")
+    for name, latency in results["queries"].items():
+        print(f"{name:>22}: p50 {latency['p50_ms']:7.2f} ms  p99 {latency['p99_ms']:7.2f} ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--files", type=int, default=50, help="Files per directory")
+    parser.add_argument("--workers", type=int, default=8, help="Indexer scandir workers")
+    parser.add_argument("--changed-percent", type=int, default=5,
+                        help="Directories that get a new file before the last re-scan")
+    parser.add_argument("--repeats", type=int, default=50, help="Runs per query")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    main(parser.parse_args())
@@ -0,0 +1,408 @@
+"""
+Benchmark suite for the API hot paths, driven in-process (httpx ASGITransport) and/or
+through a local uvicorn.
+
+Scenarios:
+  root            GET / (three config reads)
+  config_reset    POST /config/reset with the admin API key
+  users_<n>       GET /users against synthetic passwd/group/shadow files of n users
+  users_chage     GET /users with the shadow file unreadable and passwd touched before every
+                  request, so each request rebuilds the directory and runs a stub `chage` per user
+  rate_limit_429  GET a route guarded by RateLimiter(1 request / hour); all but the first are 429s
+  error_render    GET /config with an invalid API key (401 ProblemDetails)
+
+Everything runs in a temporary directory (database, logs, fixtures) and needs no network
+beyond 127.0.0.1. The response cache is disabled and the configured rate limit raised, so
+the handlers themselves are measured.
+
+Each scenario runs for --duration seconds after a warmup and reports throughput and
+p50/p99 latency; in-process runs also report heap allocations (tracemalloc) over
+--alloc-requests sequential requests. --output saves the results as JSON and --compare
+prints the change against a previous results file. Needs the dev requirements
+(pip install -r requirements-dev.txt).
+Run from the repo root:  python -m benchmarks.suite --mode both --output before.json
+                         python -m benchmarks.suite --mode both --compare before.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from typing import NamedTuple
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_COUNTS = (100, 1000, 10000)
+CHAGE_USERS = 100
+LIMITED_PATH = "/bench/limited"
+ADMIN_API_KEY = "bench-admin-key"
+INVALID_API_KEY = "bench-invalid-key"
+# Written to the benchmark database before the app serves anything
+BENCH_CONFIG = {"REQUEST_LIMIT": 10 ** 9, "RESPONSE_CACHE_TTLS": "{}", "PROFILE_SLOW_MS": 0}
+SERVER_START_TIMEOUT = 30.0
+# /users of 10k users takes seconds per request once several are queued
+REQUEST_TIMEOUT = 120.0
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    users: int = 0          # passwd fixture size, 0 to leave the user directory alone
+    shadow: bool = True     # False points the directory at a missing shadow file (chage fallback)
+    cold: bool = False      # touch passwd before every request so the snapshot is rebuilt
+    api_key: str = None     # "admin" or "invalid"
+
+
+SCENARIOS = [
+    Scenario("root", "GET", "/"),
+    Scenario("config_reset", "POST", "/config/reset", api_key="admin"),
+    *[Scenario(f"users_{count}", "GET", "/users", users=count) for count in USER_COUNTS],
+    Scenario("users_chage", "GET", "/users", users=CHAGE_USERS, shadow=False, cold=True),
+    Scenario("rate_limit_429", "GET", LIMITED_PATH),
+    Scenario("error_render", "GET", "/config", api_key="invalid"),
+]
+
+
+def fixture_dir(workdir, users):
+    return os.path.join(workdir, "fixtures", f"users_{users}")
+
+
+def write_fixtures(directory, users):
+    """passwd, group and shadow files of `users` users, every fourth one without a login shell"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "passwd"), "w") as passwd, \
+            open(os.path.join(directory, "shadow"), "w") as shadow:
+        for i in range(users):
+            shell = "/usr/sbin/nologin" if i % 4 == 3 else "/bin/bash"
+            passwd.write(f"user{i}:x:{1000 + i}:{1000 + i % 50}:User {i}:/home/user{i}:{shell}\n")
+            shadow.write(f"user{i}:$6$bench$hash:{19000 + i % 365}:0:99999:7:::\n")
+    with open(os.path.join(directory, "group"), "w") as group:
+        for gid in range(50):
+            members = ",".join(f"user{i}" for i in range(gid, min(users, 500), 50))
+            group.write(f"group{gid}:x:{1000 + gid}:{members}\n")
+
+
+def write_chage_stub(directory):
+    os.makedirs(directory, exist_ok=True)
+    chage = os.path.join(directory, "chage")
+    with open(chage, "w") as file:
+        file.write("#!/bin/sh\n"
+                   "echo 'Last password change\t\t\t\t\t: Jan 01, 2024'\n"
+                   "echo 'Password expires\t\t\t\t\t: never'\n")
+    os.chmod(chage, os.stat(chage).st_mode | stat.S_IEXEC)
+
+
+def prepare_workdir(workdir, scenarios):
+    for users in sorted({scenario.users for scenario in scenarios if scenario.users}):
+        write_fixtures(fixture_dir(workdir, users), users)
+    write_chage_stub(os.path.join(workdir, "bin"))
+    # The /codes template is loaded relative to the working directory at startup
+    pages = os.path.join(workdir, "pages")
+    if not os.path.exists(pages):
+        os.symlink(os.path.join(REPO_ROOT, "pages"), pages)
+
+
+def configure(workdir):
+    """
+    Switch to workdir and set up the app for benchmarking; must run before app.main is imported,
+    so the database and log files are created in workdir.
+    :return: the app
+    """
+    os.chdir(workdir)
+    os.environ["PATH"] = os.path.join(workdir, "bin") + os.pathsep + os.environ["PATH"]
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    from fastapi import Depends
+    from app.core import logger as logger_module
+    from app.core.rate_limiter import RateLimiter
+    from app.database.db_setup import ensure_database
+    from app.main import app
+    from app.utils.db.api_keys import create_api_key, verify_api_key
+    from app.utils.db.config import set_config_values
+
+    logger_module.console_handler.setStream(open(os.devnull, "w"))
+    ensure_database()
+    set_config_values(BENCH_CONFIG)
+    if verify_api_key(ADMIN_API_KEY) is None:
+        create_api_key("admin", "benchmark", key=ADMIN_API_KEY)
+
+    @app.get(LIMITED_PATH, include_in_schema=False,
+             dependencies=[Depends(RateLimiter(requests_limit=1, time_window=3600))])
+    def limited():
+        return {"status": "ok"}
+
+    return app
+
+
+def use_fixture(workdir, scenario):
+    from app.server.users.user_directory import user_directory
+
+    if not scenario.users:
+        return
+    directory = fixture_dir(workdir, scenario.users)
+    user_directory.passwd_file = os.path.join(directory, "passwd")
+    user_directory.group_file = os.path.join(directory, "group")
+    user_directory.shadow_file = os.path.join(directory, "shadow" if scenario.shadow else "missing-shadow")
+    user_directory.invalidate()
+
+
+def request_headers(scenario):
+    if scenario.api_key == "admin":
+        return {"X-API-Key": ADMIN_API_KEY}
+    if scenario.api_key == "invalid":
+        return {"X-API-Key": INVALID_API_KEY}
+    return {}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Driver:
+    """Sends a scenario's request; cold scenarios touch passwd first to force a rebuild"""
+
+    def __init__(self, client, workdir, scenario, headers):
+        self.client = client
+        self.scenario = scenario
+        self.headers = headers
+        self.passwd = os.path.join(fixture_dir(workdir, scenario.users), "passwd") if scenario.cold else None
+        self.touches = 0
+
+    async def send(self):
+        if self.passwd is not None:
+            self.touches += 1
+            mtime = 10 ** 18 + self.touches
+            os.utime(self.passwd, ns=(mtime, mtime))
+        return await self.client.request(self.scenario.method, self.scenario.path, headers=self.headers)
+
+
+async def repeat(driver, count, budget):
+    """Send up to count requests one after another, stopping early once budget seconds have passed"""
+    deadline = time.perf_counter() + budget
+    sent = 0
+    while sent < count:
+        await driver.send()
+        sent += 1
+        if time.perf_counter() >= deadline:
+            break
+    return sent
+
+
+async def measure(driver, duration, concurrency, warmup):
+    await repeat(driver, warmup, duration)
+
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            response = await driver.send()
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def measure_allocations(driver, requests, budget):
+    """
+    Heap use over up to `requests` sequential requests: the peak above the starting point,
+    and what is still allocated afterwards per request (caches filling up, or a leak)
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        requests = await repeat(driver, requests, budget)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "alloc_peak_kib": round((peak - baseline) / 1024, 1),
+        "alloc_retained_bytes_per_request": round((current - baseline) / requests, 1),
+    }
+
+
+async def run_inprocess(workdir, scenarios, args):
+    app = configure(workdir)
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=REQUEST_TIMEOUT) as client:
+            for scenario in scenarios:
+                use_fixture(workdir, scenario)
+                driver = Driver(client, workdir, scenario, request_headers(scenario))
+                result = await measure(driver, args.duration, args.concurrency, args.warmup)
+                if args.alloc_requests:
+                    result.update(await measure_allocations(driver, args.alloc_requests, args.duration))
+                results.append({"scenario": scenario.name, "mode": "inprocess", **result})
+                report(results[-1])
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir, scenario, port):
+    command = [sys.executable, "-m", "benchmarks.suite", "--serve", workdir, "--port", str(port),
+               "--scenarios", scenario.name]
+    process = subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {process.returncode} while starting {scenario.name}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"uvicorn did not start within {SERVER_START_TIMEOUT}s")
+
+
+async def run_uvicorn(workdir, scenarios, args):
+    """One server per scenario, so every scenario starts from a fresh process and limiter"""
+    results = []
+    for scenario in scenarios:
+        port = free_port()
+        process = start_server(workdir, scenario, port)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=REQUEST_TIMEOUT,
+                                         trust_env=False) as client:
+                driver = Driver(client, workdir, scenario, request_headers(scenario))
+                result = await measure(driver, args.duration, args.concurrency, args.warmup)
+        finally:
+            process.terminate()
+            process.wait()
+        results.append({"scenario": scenario.name, "mode": "uvicorn", **result})
+        report(results[-1])
+    return results
+
+
+def serve(workdir, scenario, port):
+    import uvicorn
+
+    app = configure(workdir)
+    use_fixture(workdir, scenario)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def report(result):
+    allocations = ""
+    if "alloc_peak_kib" in result:
+        allocations = (f"  alloc peak {result['alloc_peak_kib']:8.1f} KiB"
+                       f" retained {result['alloc_retained_bytes_per_request']:8.1f} B/req")
+    statuses = ",".join(f"{code}x{count}" for code, count in result["statuses"].items())
+    print(f"{result['mode']:>9} {result['scenario']:<15} {result['throughput_rps']:9.1f} req/s "
+          f"p50 {result['p50_ms']:8.2f}ms p99 {result['p99_ms']:8.2f}ms  [{statuses}]{allocations}", flush=True)
+
+
+def metadata(args):
+    try:
+        revision = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=REPO_ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        "revision": revision,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "alloc_requests": args.alloc_requests,
+    }
+
+
+def compare(results, baseline_file):
+    with open(baseline_file) as file:
+        baseline = json.load(file)
+    previous = {(result["mode"], result["scenario"]): result for result in baseline["results"]}
+    print(f"\nchange vs {baseline_file} ({baseline['meta'].get('revision')}):")
+    for result in results:
+        before = previous.get((result["mode"], result["scenario"]))
+        if before is None:
+            continue
+        throughput = (result["throughput_rps"] / before["throughput_rps"] - 1) * 100 if before["throughput_rps"] else 0
+        p99 = (result["p99_ms"] / before["p99_ms"] - 1) * 100 if before["p99_ms"] else 0
+        print(f"{result['mode']:>9} {result['scenario']:<15} throughput {throughput:+7.1f}%  p99 {p99:+7.1f}%")
+
+
+def select_scenarios(names):
+    if not names:
+        return SCENARIOS
+    wanted = set(names.split(","))
+    unknown = wanted - {scenario.name for scenario in SCENARIOS}
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return [scenario for scenario in SCENARIOS if scenario.name in wanted]
+
+
+def main(args):
+    scenarios = select_scenarios(args.scenarios)
+    if args.serve:
+        serve(args.serve, scenarios[0], args.port)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="homeops-bench-") as workdir:
+        prepare_workdir(workdir, scenarios)
+        results = []
+        # uvicorn first: the in-process run imports the app into this process and changes directory
+        if args.mode in ("uvicorn", "both"):
+            results += asyncio.run(run_uvicorn(workdir, scenarios, args))
+        if args.mode in ("inprocess", "both"):
+            results += asyncio.run(run_inprocess(workdir, scenarios, args))
+        os.chdir(REPO_ROOT)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": metadata(args), "results": results}, file, indent=2)
+        print(f"\nresults saved to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("inprocess", "uvicorn", "both"), default="inprocess")
+    parser.add_argument("--scenarios", help=f"Comma separated subset of: {', '.join(s.name for s in SCENARIOS)}")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20,
+                        help="Requests per scenario before measuring (at most --duration seconds' worth)")
+    parser.add_argument("--alloc-requests", type=int, default=50,
+                        help="Requests in the allocation pass (at most --duration seconds' worth), 0 skips it")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Results JSON of a previous run to compare against")
+    parser.add_argument("--serve", metavar="WORKDIR", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    main(parser.parse_args())
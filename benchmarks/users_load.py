@@ -0,0 +1,89 @@
+"""
+Latency of GET / while GET /users is hammered, driven in-process through ASGI.
+
+/users is pointed at a synthetic passwd file and an unreadable shadow path, so every
+snapshot rebuild falls back to a fake `chage` that sleeps CHAGE_DELAY seconds per user.
+Needs the dev requirements (pip install -r requirements-dev.txt).
+Run from the repo root:  python -m benchmarks.users_load
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import stat
+import tempfile
+import time
+
+import httpx
+
+
+def write_fixtures(directory, users, chage_delay):
+    passwd = os.path.join(directory, "passwd")
+    with open(passwd, "w") as file:
+        for i in range(users):
+            file.write(f"user{i}:x:{1000 + i}:{1000 + i}:User {i}:/home/user{i}:/bin/bash\n")
+    chage = os.path.join(directory, "chage")
+    with open(chage, "w") as file:
+        file.write(f"#!/bin/sh\nsleep {chage_delay}\n"
+                   "echo 'Last password change\t\t\t\t\t: Jan 01, 2024'\n"
+                   "echo 'Password expires\t\t\t\t\t: never'\n")
+    os.chmod(chage, os.stat(chage).st_mode | stat.S_IEXEC)
+    return passwd
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    from app.core.rate_limiter import RateLimiter
+    from app.endpoints.users import users_router
+    from app.main import app
+    from app.server.users.user_directory import user_directory
+
+    with tempfile.TemporaryDirectory() as directory:
+        user_directory.passwd_file = write_fixtures(directory, args.users, args.chage_delay)
+        user_directory.shadow_file = os.path.join(directory, "missing-shadow")
+        os.environ["PATH"] = directory + os.pathsep + os.environ["PATH"]
+        for dependency in users_router.dependencies:
+            if isinstance(dependency.dependency, RateLimiter):
+                app.dependency_overrides[dependency.dependency] = lambda: True
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            stop = asyncio.Event()
+
+            async def hammer_users():
+                while not stop.is_set():
+                    user_directory.invalidate()  # force a full rebuild every time
+                    await client.get("/users")
+
+            async def probe_root(duration):
+                samples = []
+                deadline = time.perf_counter() + duration
+                while time.perf_counter() < deadline:
+                    start = time.perf_counter()
+                    await client.get("/")
+                    samples.append((time.perf_counter() - start) * 1000)
+                    await asyncio.sleep(0.001)
+                return samples
+
+            idle = await probe_root(args.duration)
+            hammers = [asyncio.create_task(hammer_users()) for _ in range(args.concurrency)]
+            loaded = await probe_root(args.duration)
+            stop.set()
+            await asyncio.gather(*hammers)
+
+    for label, samples in (("idle", idle), (f"/users x{args.concurrency}", loaded)):
+        print(f"GET / {label:>12}: n={len(samples):5d} p50={statistics.median(samples):7.2f}ms "
+              f"p99={percentile(samples, 99):7.2f}ms max={max(samples):7.2f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--chage-delay", type=float, default=0.005)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+
+class FakeRespServer:
+    """
+    Minimal Redis-protocol stand-in on 127.0.0.1: INCR, EXPIRE, GET, AUTH and SELECT on
+    an in-memory dict. Commands named in error_commands get an -ERR reply, those in
+    stall_commands never get one.
+    """
+
+    def __init__(self):
+        self.values = {}
+        self.error_commands = set()
+        self.stall_commands = set()
+        self.connections = 0
+        self.open_connections = 0
+        self._server = None
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"redis://{host}:{port}/0"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        arguments = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            arguments.append((await reader.readexactly(length + 2))[:-2].decode())
+        return arguments
+
+    def _reply(self, name, arguments) -> bytes:
+        if name in self.error_commands:
+            return f"-ERR {name} failed\r\n".encode()
+        if name == "INCR":
+            self.values[arguments[0]] = int(self.values.get(arguments[0], 0)) + 1
+            return b":%d\r\n" % self.values[arguments[0]]
+        if name == "EXPIRE":
+            return b":1\r\n"
+        if name == "GET":
+            value = self.values.get(arguments[0])
+            if value is None:
+                return b"$-1\r\n"
+            data = str(value).encode()
+            return b"$%d\r\n%s\r\n" % (len(data), data)
+        return b"+OK\r\n"
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while (command := await self._read_command(reader)) is not None:
+                name, arguments = command[0].upper(), command[1:]
+                if name in self.stall_commands:
+                    await reader.read()  # no reply; wait for the client to hang up
+                    break
+                writer.write(self._reply(name, arguments))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def resp_server():
+    server = FakeRespServer()
+    server.url = await server.start()
+    yield server
+    await server.stop()
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Config
+from app.utils.db.config import _query_config_version, set_config_value, set_config_values
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'config.sqlite'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def test_version_changes_on_every_write_within_a_second(db):
+    versions = [_query_config_version(db)]
+    set_config_values({"A": 1, "B": 2}, db=db)
+    versions.append(_query_config_version(db))
+    set_config_values({"A": 3}, db=db)
+    versions.append(_query_config_version(db))
+    set_config_value("B", "4", db=db)
+    db.flush()
+    versions.append(_query_config_version(db))
+    set_config_value("C", "5", db=db)
+    db.flush()
+    versions.append(_query_config_version(db))
+    assert len(set(versions)) == len(versions)
+    assert versions[-1] == (3, 5)
+
+
+def test_bulk_write_takes_one_revision_per_row(db):
+    set_config_values({"A": 1, "B": 2, "C": 3}, db=db)
+    assert sorted(revision for revision, in db.query(Config.revision)) == [1, 2, 3]
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from app.server.automation.cron import CronExpression
+
+# A Thursday; cron times are local, as are these
+START = datetime(2026, 10, 1).timestamp()
+
+
+def fire_times(expression, count):
+    times, timestamp = [], START
+    for _ in range(count):
+        timestamp = CronExpression(expression).next_after(timestamp)
+        times.append(datetime.fromtimestamp(timestamp))
+    return times
+
+
+def test_restricted_day_fields_match_either():
+    # The 13th, or any Friday
+    assert fire_times("0 0 13 * fri", 3) == [datetime(2026, 10, 2), datetime(2026, 10, 9), datetime(2026, 10, 13)]
+
+
+def test_step_over_star_counts_as_unrestricted():
+    # Odd days that are also Fridays
+    assert fire_times("0 0 */2 * 5", 2) == [datetime(2026, 10, 9), datetime(2026, 10, 23)]
+
+
+def test_next_fire_time_is_strictly_after():
+    assert fire_times("30 6 * * mon-fri", 2) == [datetime(2026, 10, 1, 6, 30), datetime(2026, 10, 2, 6, 30)]
+
+
+def test_expression_that_never_matches_raises():
+    with pytest.raises(ValueError, match="never matches"):
+        CronExpression("0 0 31 2 *").next_after(START)
+
+
+@pytest.mark.parametrize("expression", ["* * *", "60 * * * *", "* * * 13 *", "* * * * foo", "5-1 * * * *"])
+def test_invalid_expressions_raise(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
@@ -0,0 +1,68 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.database import Base
+from app.database.engine_profiles import create_async_sqlite_engine
+from app.utils.db import jobs
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    path = tmp_path / "jobs.sqlite"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    async_engine = create_async_sqlite_engine(f"sqlite+aiosqlite:///{path}")
+    monkeypatch.setattr(jobs, "AsyncSessionLocal", async_sessionmaker(async_engine, expire_on_commit=False))
+
+    async def initialized():
+        pass
+
+    monkeypatch.setattr(jobs, "ensure_database_async", initialized)
+    yield
+    await async_engine.dispose()
+
+
+def job_values(name):
+    return {"name": name, "trigger_type": "interval", "trigger": "60", "task_type": "command",
+            "task": {"command": ["true"]}, "enabled": True}
+
+
+async def test_version_never_repeats(db):
+    versions = [await jobs.jobs_version()]
+    first = await jobs.create_job(job_values("first"))
+    versions.append(await jobs.jobs_version())
+    second = await jobs.create_job(job_values("second"))
+    versions.append(await jobs.jobs_version())
+    await jobs.delete_job(second["id"])
+    versions.append(await jobs.jobs_version())
+    await jobs.create_job(job_values("third"))
+    versions.append(await jobs.jobs_version())
+    await jobs.update_job(first["id"], job_values("renamed"))
+    versions.append(await jobs.jobs_version())
+    assert versions == sorted(set(versions))
+
+
+async def test_failed_write_keeps_the_version(db):
+    await jobs.create_job(job_values("first"))
+    version = await jobs.jobs_version()
+    with pytest.raises(ValueError):
+        await jobs.create_job(job_values("first"))
+    assert not await jobs.delete_job(12345)
+    assert await jobs.jobs_version() == version
+
+
+async def test_lease_is_taken_over_only_once_expired(db):
+    assert await jobs.acquire_lease("a", ttl=60)
+    assert await jobs.acquire_lease("a", ttl=60)  # renewal
+    assert not await jobs.acquire_lease("b", ttl=60)
+    assert await jobs.acquire_lease("a", ttl=-1)  # lets it run out
+    assert await jobs.acquire_lease("b", ttl=60)
+    assert not await jobs.acquire_lease("a", ttl=60)
+    await jobs.release_lease("a")  # not the owner: no effect
+    assert not await jobs.acquire_lease("a", ttl=60)
+    await jobs.release_lease("b")
+    assert await jobs.acquire_lease("a", ttl=60)
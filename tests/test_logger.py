@@ -0,0 +1,68 @@
+import io
+import logging
+import queue
+import threading
+import time
+
+from app.core.logger import BatchingQueueListener, BatchStreamHandler, BoundedQueueHandler
+
+
+def make_record(level):
+    return logging.LogRecord("test", level, __file__, 1, "message", None, None)
+
+
+def test_enqueue_never_blocks_and_keeps_room_for_warnings():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=10), warning_reserve=3)
+    start = time.monotonic()
+    for _ in range(20):
+        handler.enqueue(make_record(logging.INFO))
+    for _ in range(5):
+        handler.enqueue(make_record(logging.WARNING))
+    assert time.monotonic() - start < 0.1
+    assert (handler.queued, handler.dropped) == (10, 15)
+    levels = [handler.queue.get_nowait().levelno for _ in range(10)]
+    assert levels == [logging.INFO] * 7 + [logging.WARNING] * 3
+
+
+def test_counters_are_exact_across_threads():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1000), warning_reserve=0)
+    threads = [threading.Thread(target=lambda: [handler.enqueue(make_record(logging.INFO)) for _ in range(5000)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert handler.queued == 1000
+    assert handler.dropped == 8 * 5000 - 1000
+
+
+class BrokenStream(io.StringIO):
+    def flush(self):
+        raise ValueError("I/O operation on closed file")
+
+
+def test_listener_survives_a_failing_flush(monkeypatch):
+    monkeypatch.setattr(logging, "raiseExceptions", False)
+    broken = BatchStreamHandler(BrokenStream())
+    working = BatchStreamHandler(io.StringIO())
+    log_queue = queue.Queue(maxsize=4)
+    listener = BatchingQueueListener(log_queue, broken, working)
+    listener.start()
+    for _ in range(3):
+        log_queue.put(make_record(logging.INFO))
+        log_queue.join()
+    assert listener._thread.is_alive()
+    assert working.stream.getvalue().count("message") == 3
+    listener.stop()
+
+
+def test_stop_returns_when_the_listener_is_gone():
+    log_queue = queue.Queue(maxsize=1)
+    listener = BatchingQueueListener(log_queue)
+    listener.start()
+    listener.enqueue_sentinel()
+    listener._thread.join()
+    log_queue.put(make_record(logging.INFO))
+    start = time.monotonic()
+    listener.stop()
+    assert time.monotonic() - start < 1
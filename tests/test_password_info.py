@@ -0,0 +1,107 @@
+"""
+parse_shadow_line against `chage -l` output recorded from the fixture shadow file
+(chage -R <root> -l <user>, LC_ALL=C). The fixture users cover:
+
+    root   locked (*), never expires (max 99999)
+    alice  must change password (lastchg 0)
+    bob    max 90 days with inactive and account expiry set
+    carol  locked (!), lastchg set
+    dave   every aging field empty
+    erin   locked (!hash), max 10000 = never expires
+    frank  max 9999 still expires, account expiry set
+    grace  lastchg set, other aging fields empty
+"""
+import json
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from app.server.users import get_bulk_password_info as bulk
+from app.server.users import query_users
+from app.server.users.get_bulk_password_info import get_bulk_password_info, parse_shadow_line
+from app.server.users.get_password_info import parse_chage_output
+from app.server.users.user_directory import parse_passwd_line, user_directory
+
+FIXTURES = Path(__file__).parent / "fixtures" / "password_info"
+SHADOW_FILE = FIXTURES / "shadow"
+USERNAMES = [parse_passwd_line(line)["username"] for line in (FIXTURES / "passwd").read_text().splitlines()]
+
+
+def chage_details(username):
+    return parse_chage_output((FIXTURES / "chage" / username).read_text())
+
+
+def shadow_lines():
+    return {line.split(":", 1)[0]: line for line in SHADOW_FILE.read_text().splitlines()}
+
+
+@pytest.fixture
+def config(monkeypatch):
+    values = {}
+    monkeypatch.setattr(bulk, "get_config_value", lambda key, default=None: values.get(key, default))
+    return values
+
+
+@pytest.fixture
+def stub_chage(tmp_path, monkeypatch):
+    """chage on PATH that replays the recorded output, and fails for unknown users"""
+    script = tmp_path / "chage"
+    script.write_text(
+        "#!/bin/sh\n"
+        f'output="{FIXTURES}/chage/$2"\n'
+        'if [ "$1" = "-l" ] && [ -f "$output" ]; then cat "$output"; exit 0; fi\n'
+        "echo \"chage: user '$2' does not exist in /etc/passwd\" >&2\n"
+        "exit 1\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+
+
+@pytest.mark.parametrize("username", USERNAMES)
+def test_parse_shadow_line_matches_chage(username):
+    parsed_username, details = parse_shadow_line(shadow_lines()[username])
+    assert parsed_username == username
+    assert details == chage_details(username)
+
+
+@pytest.mark.parametrize("line", ["", "eve:x:19000", "eve:$6$salt$hash:19000:0:99999"])
+def test_parse_shadow_line_rejects_malformed(line):
+    assert parse_shadow_line(line) is None
+
+
+def test_bulk_reads_shadow(config):
+    details = get_bulk_password_info(USERNAMES + ["nobody"], shadow_file=str(SHADOW_FILE))
+    assert details == {username: chage_details(username) for username in USERNAMES}
+
+
+def test_bulk_falls_back_to_chage_when_shadow_unreadable(config, stub_chage, tmp_path):
+    details = get_bulk_password_info(["bob", "nobody"], shadow_file=str(tmp_path / "missing"))
+    assert details == {"bob": chage_details("bob")}
+
+
+def test_chage_backend(config, stub_chage):
+    config["PASSWORD_INFO_BACKEND"] = "chage"
+    config["CHAGE_MAX_WORKERS"] = 2
+    details = get_bulk_password_info(USERNAMES + ["nobody"], shadow_file=str(SHADOW_FILE))
+    assert details == {username: chage_details(username) for username in USERNAMES}
+
+
+def test_stream_reads_shadow_once(config, monkeypatch):
+    reads = []
+    read_shadow = bulk.read_shadow
+
+    def counting_read_shadow(shadow_file):
+        reads.append(shadow_file)
+        return read_shadow(shadow_file)
+
+    monkeypatch.setattr(bulk, "read_shadow", counting_read_shadow)
+    monkeypatch.setattr(query_users, "STREAM_BATCH_SIZE", 3)
+    monkeypatch.setattr(user_directory, "passwd_file", str(FIXTURES / "passwd"))
+    monkeypatch.setattr(user_directory, "shadow_file", str(SHADOW_FILE))
+    fields = ("username",) + query_users.PASSWORD_FIELDS
+    lines = list(query_users.stream_users(fields=fields))
+    assert reads == [str(SHADOW_FILE)]
+    assert [json.loads(line) for line in lines] == [{"username": username, **chage_details(username)}
+                                                    for username in USERNAMES]
@@ -0,0 +1,109 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from app.core.profiling import Profiler, ProfilingMiddleware, is_idle
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingProfiler(Profiler):
+    def __init__(self, directory, **kwargs):
+        super().__init__(str(directory), **kwargs)
+        self.saved_on = []
+
+    def refresh_slow_threshold(self):
+        pass  # no config table here
+
+    def save(self, stacks, metadata):
+        profile_id = super().save(stacks, metadata)
+        self.saved_on.append(threading.current_thread().name)
+        return profile_id
+
+
+async def slow_app(scope, receive, send):
+    time.sleep(0.05)  # busy, so the sampler has something to record
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def request(middleware, path="/slow"):
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    await middleware({"type": "http", "method": "GET", "path": path}, receive, send)
+
+
+async def wait_for_saves(profiler, count):
+    for _ in range(200):
+        if len(profiler.saved_on) >= count:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"{len(profiler.saved_on)} profiles saved, expected {count}")
+
+
+async def test_armed_requests_are_saved_by_the_writer_thread(tmp_path):
+    profiler = RecordingProfiler(tmp_path / "profiles", max_files=2)
+    middleware = ProfilingMiddleware(slow_app, profiler)
+    profiler.arm(3)
+    for _ in range(4):
+        await request(middleware)
+    await wait_for_saves(profiler, 3)
+
+    assert profiler.saved_on == ["profile-writer"] * 3
+    profiles = profiler.list_profiles()
+    assert len(profiles) == 2  # pruned to max_files
+    assert all(profile["reason"] == "armed" and profile["samples"] > 0 for profile in profiles)
+    assert profiler.profile_path(profiles[0]["id"]) is not None
+
+
+def test_idle_frames_are_matched_by_module():
+    event = threading.Event()
+    stop = threading.Event()
+
+    def get():
+        while not stop.is_set():
+            sum(range(1000))
+
+    threads = [threading.Thread(target=event.wait), threading.Thread(target=get)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    frames = sys._current_frames()
+    try:
+        waiting, busy = (frames[thread.ident] for thread in threads)
+        while busy.f_code.co_name != "get":  # sum() may have been sampled mid-call
+            busy = sys._current_frames()[threads[1].ident]
+        assert is_idle(waiting)
+        assert not is_idle(busy)
+    finally:
+        event.set()
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+async def test_streamed_response_stops_holding_the_sampler(tmp_path):
+    profiler = RecordingProfiler(tmp_path / "profiles")
+    profiler.slow_seconds = 0.01
+    held_while_streaming = []
+
+    async def streaming_app(scope, receive, send):
+        time.sleep(0.05)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"first", "more_body": True})
+        held_while_streaming.append(profiler.sampler._holders)
+        await asyncio.sleep(0.1)
+        await send({"type": "http.response.body", "body": b""})
+
+    await request(ProfilingMiddleware(streaming_app, profiler), "/stream")
+    await wait_for_saves(profiler, 1)
+    assert held_while_streaming == [0]
+    [profile] = profiler.list_profiles()
+    assert profile["streamed"] and profile["duration_ms"] < 100
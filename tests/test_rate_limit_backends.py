@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from app.core.rate_limit_backends import RedisCounterBackend, RespError
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hit_counts_current_and_previous_window(resp_server):
+    backend = RedisCounterBackend(resp_server.url, pool_size=2)
+    assert await backend.hit("client", 1, 120, 0) == (1, 0)
+    assert await backend.hit("client", 2, 120, 0) == (1, 1)
+    assert await backend.hit("client", 2, 120, 0) == (2, 1)
+    assert resp_server.connections == 1
+    await backend.close()
+
+
+async def test_error_reply_closes_connection_and_frees_slot(resp_server):
+    resp_server.error_commands.add("EXPIRE")
+    backend = RedisCounterBackend(resp_server.url, pool_size=2)
+    for _ in range(5):
+        with pytest.raises(RespError):
+            await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2)
+    resp_server.error_commands.clear()
+    assert await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2) == (6, 0)
+    await backend.close()
+
+
+async def test_read_timeout_frees_slot(resp_server):
+    resp_server.stall_commands.add("GET")
+    backend = RedisCounterBackend(resp_server.url, pool_size=1, timeout=0.1)
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2)
+    resp_server.stall_commands.clear()
+    assert await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2) == (4, 0)
+    await backend.close()
+
+
+async def test_cancelled_pipeline_frees_slot(resp_server):
+    resp_server.stall_commands.add("GET")
+    backend = RedisCounterBackend(resp_server.url, pool_size=1)
+    task = asyncio.create_task(backend.hit("client", 1, 120, 0))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    resp_server.stall_commands.clear()
+    assert await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2) == (2, 0)
+    await backend.close()
+
+
+async def test_waiters_get_a_slot_when_a_connection_is_dropped(resp_server):
+    resp_server.error_commands.add("INCR")
+    backend = RedisCounterBackend(resp_server.url, pool_size=1)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(backend.hit("client", 1, 120, 0) for _ in range(4)), return_exceptions=True), 2)
+    assert all(isinstance(result, RespError) for result in results)
+    await backend.close()
+
+
+async def test_connect_timeout_frees_slot(resp_server):
+    resp_server.stall_commands.add("AUTH")
+    url = resp_server.url.replace("redis://", "redis://:secret@")
+    backend = RedisCounterBackend(url, pool_size=1, timeout=0.1)
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2)
+    resp_server.stall_commands.clear()
+    assert await asyncio.wait_for(backend.hit("client", 1, 120, 0), 2) == (1, 0)
+    await asyncio.sleep(0.05)
+    assert resp_server.open_connections == 1
+    await backend.close()
@@ -0,0 +1,28 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+
+from app.core.rate_limit_backends import RedisCounterBackend
+from app.core.rate_limiter import RateLimiter
+from tests.conftest import FakeRespServer
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_unreachable_backend_falls_back_to_process_limits():
+    server = FakeRespServer()
+    url = await server.start()
+    await server.stop()  # connections to it are refused from now on
+
+    backend = RedisCounterBackend(url, timeout=0.5)
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(RateLimiter(requests_limit=3, time_window=60, backend=backend))])
+    def limited():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [await client.get("/limited") for _ in range(5)]
+    assert [response.status_code for response in responses] == [200, 200, 200, 429, 429]
+    await backend.close()
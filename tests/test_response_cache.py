@@ -0,0 +1,62 @@
+import httpx
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.routing import compile_path
+
+from app.core.rate_limiter import RateLimiter
+from app.core.response_cache import ResponseCache, ResponseCacheMiddleware
+
+pytestmark = pytest.mark.anyio
+
+
+class FixedTtlMiddleware(ResponseCacheMiddleware):
+    """Caches /items/{name} without reading RESPONSE_CACHE_TTLS from the config table"""
+
+    def route_ttls(self):
+        return [(compile_path("/items/{name}")[0], 60.0)]
+
+
+def make_app(limit: int) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(prefix="/items", dependencies=[Depends(RateLimiter(requests_limit=limit, time_window=60))])
+
+    @router.get("/{name}")
+    def get_item(name: str):
+        return {"name": name}
+
+    app.include_router(router)
+    app.add_middleware(FixedTtlMiddleware, cache=ResponseCache())
+    return app
+
+
+async def test_cache_hits_count_towards_rate_limit():
+    transport = httpx.ASGITransport(app=make_app(limit=3))
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [await client.get("/items/a") for _ in range(5)]
+    assert [response.status_code for response in responses] == [200, 200, 200, 429, 429]
+    assert [response.headers.get("x-cache") for response in responses[:3]] == ["MISS", "HIT", "HIT"]
+    assert responses[3].json()["code"] == "API01_LIMIT"
+
+
+@pytest.mark.parametrize("media_type, chunks", [
+    ("application/x-ndjson", [b'{"n": 1}\n']),  # one chunk, but a streaming type
+    ("text/plain", [b"a", b"b"]),  # sent with more_body
+])
+async def test_streamed_responses_are_passed_through(media_type, chunks):
+    app = FastAPI()
+    calls = []
+
+    @app.get("/items/{name}")
+    def stream_item(name: str):
+        calls.append(name)
+        return StreamingResponse(iter(chunks), media_type=media_type)
+
+    app.add_middleware(FixedTtlMiddleware, cache=ResponseCache())
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        responses = [await client.get("/items/a") for _ in range(2)]
+    assert calls == ["a", "a"]
+    for response in responses:
+        assert response.content == b"".join(chunks)
+        assert "x-cache" not in response.headers and "etag" not in response.headers
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.server.automation.scheduler import Scheduler
+
+pytestmark = pytest.mark.anyio
+
+
+def make_job(job_id, trigger="60", enabled=True):
+    return {"id": job_id, "name": f"job-{job_id}", "trigger_type": "interval", "trigger": trigger,
+            "task_type": "command", "task": {"command": ["true"]}, "enabled": enabled}
+
+
+async def test_stale_heap_entries_are_skipped():
+    scheduler = Scheduler()
+    scheduler.is_leader = True
+    scheduler._wake = asyncio.Event()
+    fired = []
+    scheduler._fire = lambda job, due_at, manual: fired.append(job)
+
+    scheduler.apply(make_job(1))
+    scheduler.apply(make_job(2))
+    scheduler.apply(make_job(3))
+    scheduler.apply(make_job(1, trigger="120"))  # changed: new generation
+    scheduler.remove(2)
+    scheduler.apply(make_job(3, enabled=False))
+    assert len(scheduler._heap) == 4
+
+    # Make every entry due, the stale ones included
+    scheduler._heap = sorted((0, sequence, job_id, generation) for _, sequence, job_id, generation in scheduler._heap)
+    timer = asyncio.create_task(scheduler._timer_loop())
+    await asyncio.sleep(0.05)
+    timer.cancel()
+    await asyncio.gather(timer, return_exceptions=True)
+
+    assert fired == [make_job(1, trigger="120")]
+    assert [job_id for _, _, job_id, _ in scheduler._heap] == [1]
+    assert scheduler._heap[0][3] == scheduler._entries[1].generation
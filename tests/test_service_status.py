@@ -0,0 +1,117 @@
+import asyncio
+import json
+import stat
+import threading
+import time
+
+import pytest
+
+from app.exceptions.global_exception import GlobalHTTPException
+from app.server.services.service_status import ServiceStatus
+from app.server.services.systemctl import SystemctlRunner, parse_list_units, parse_show
+
+pytestmark = pytest.mark.anyio
+
+UNITS = [
+    {"unit": "cron.service", "load": "loaded", "active": "active", "sub": "running", "description": "Cron daemon"},
+    {"unit": "ssh.service", "load": "loaded", "active": "failed", "sub": "failed", "description": "OpenSSH server"},
+    {"unit": "tmp.mount", "load": "loaded", "active": "active", "sub": "mounted", "description": "Temporary Directory"},
+]
+SHOW_OUTPUT = """Id=cron.service
+Description=Cron daemon
+LoadState=loaded
+MainPID=612
+NRestarts=0
+MemoryCurrent=[not set]
+
+Id=ssh.service
+LoadState=loaded
+MainPID=0
+MemoryCurrent=18446744073709551615
+"""
+
+
+def fake_systemctl(tmp_path, body):
+    """systemctl stand-in: a shell script with the given body"""
+    script = tmp_path / "systemctl"
+    script.write_text(f"#!/bin/sh\n{body}\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+class CountingRunner:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, args):
+        with self._lock:
+            self.calls.append(args[0])
+        time.sleep(self.delay)
+        return json.dumps(UNITS) if args[0] == "list-units" else SHOW_OUTPUT
+
+
+def test_parse_list_units_json():
+    assert parse_list_units(json.dumps(UNITS)) == UNITS
+
+
+def test_parse_list_units_table():
+    output = ("cron.service loaded active running Cron daemon\n"
+              "● ssh.service  loaded failed failed  OpenSSH server\n"
+              "tmp.mount    loaded active mounted Temporary Directory\n"
+              "\n")
+    assert parse_list_units(output) == UNITS
+
+
+def test_parse_show_blocks_and_unset_values():
+    assert parse_show(SHOW_OUTPUT) == [
+        {"unit": "cron.service", "description": "Cron daemon", "load": "loaded", "main_pid": 612, "restarts": 0,
+         "memory_bytes": None},
+        {"unit": "ssh.service", "load": "loaded", "main_pid": 0, "memory_bytes": None},
+    ]
+
+
+async def test_concurrent_queries_share_one_call():
+    runner = CountingRunner(delay=0.1)
+    status = ServiceStatus(runner, ttl=60)
+    results = await asyncio.gather(*(status.query(details=True) for _ in range(10)))
+    assert runner.calls == ["list-units", "show"]
+    assert all(result == results[0] for result in results)
+    assert [unit["unit"] for unit in results[0]] == ["cron.service", "ssh.service"]
+    assert results[0][0]["main_pid"] == 612
+
+
+async def test_results_expire_after_ttl():
+    runner = CountingRunner()
+    status = ServiceStatus(runner, ttl=0.05)
+    await status.units()
+    await status.units()
+    assert runner.calls == ["list-units"]
+    await asyncio.sleep(0.06)
+    await status.units()
+    assert runner.calls == ["list-units", "list-units"]
+    await status.units(refresh=True)
+    assert len(runner.calls) == 3
+
+
+async def test_fake_systemctl_script(tmp_path):
+    path = fake_systemctl(tmp_path, f"echo '{json.dumps(UNITS)}'")
+    status = ServiceStatus(SystemctlRunner(path), ttl=60)
+    assert await status.query(unit_type="mount") == [UNITS[2]]
+
+
+async def test_failing_systemctl_is_unavailable(tmp_path):
+    path = fake_systemctl(tmp_path, "echo 'Failed to connect to bus' >&2; exit 1")
+    status = ServiceStatus(SystemctlRunner(path), ttl=60)
+    with pytest.raises(GlobalHTTPException) as raised:
+        await status.units()
+    assert raised.value.status_code == 503
+    assert raised.value.code == "SVC01_UNAVAILABLE"
+    assert "Failed to connect to bus" in raised.value.detail
+
+
+def test_missing_systemctl_is_unavailable(tmp_path):
+    with pytest.raises(GlobalHTTPException) as raised:
+        SystemctlRunner(str(tmp_path / "missing"))(["list-units"])
+    assert raised.value.code == "SVC01_UNAVAILABLE"
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from app.server.storage import indexer
+from app.server.storage.indexer import configured_roots
+
+
+@pytest.fixture
+def storage_roots(monkeypatch):
+    def configure(*roots):
+        monkeypatch.setattr(indexer, "get_config_value", lambda key, default=None: json.dumps(roots))
+    return configure
+
+
+def test_nested_roots_collapse_into_the_outer_one(storage_roots, tmp_path):
+    data, media, other = tmp_path / "data", tmp_path / "data" / "media", tmp_path / "data-other"
+    for directory in (media, other):
+        directory.mkdir(parents=True)
+    storage_roots(str(media), str(data), str(other), f"{data}/", str(data / "media" / ".."))
+    assert configured_roots() == [str(data), str(other)]
+
+
+def test_filesystem_root_contains_everything(storage_roots, tmp_path):
+    storage_roots(str(tmp_path), "/")
+    assert configured_roots() == ["/"]
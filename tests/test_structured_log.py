@@ -0,0 +1,73 @@
+import json
+import logging
+import multiprocessing
+
+from app.core.structured_log import StructuredLogHandler, read_block, refresh_index
+from app.server.logs import query_logs
+
+WORKERS = 3
+RECORDS = 2000
+
+
+def _write_records(path, worker):
+    handler = StructuredLogHandler(str(path), when="midnight", backupCount=1, utc=True)
+    log = logging.getLogger(f"structured-test-{worker}")
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    log.addHandler(handler)
+    for i in range(RECORDS):
+        log.info(f"TEST{worker}_OK record {i} " + "x" * (i % 100))
+    handler.close()
+
+
+def test_index_covers_every_worker(tmp_path):
+    path = tmp_path / "test.jsonl"
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_write_records, args=(path, worker)) for worker in range(WORKERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    lines = path.read_bytes().splitlines()
+    assert len(lines) == WORKERS * RECORDS
+    assert all(json.loads(line)["msg"].split()[0].endswith("_OK") for line in lines)
+
+    index = refresh_index(str(path))
+    assert index.counts == {f"TEST{worker}_OK": RECORDS for worker in range(WORKERS)}
+    for worker in range(WORKERS):
+        code = f"TEST{worker}_OK"
+        found = [record for block in index.candidate_blocks(code) for record in read_block(str(path), block)
+                 if record["code"] == code]
+        assert len(found) == RECORDS
+
+
+def test_refresh_indexes_appended_lines_and_rebuilds_replaced_file(tmp_path):
+    path = tmp_path / "test.jsonl"
+    path.write_text(json.dumps({"ts": 1.0, "code": "A1_OK"}) + "\n" + '{"ts": 2.0, "co')
+    assert refresh_index(str(path)).counts == {"A1_OK": 1}  # the partial line waits
+    with open(path, "a") as file:
+        file.write('de": "B1_OK"}\n')
+    assert refresh_index(str(path)).counts == {"A1_OK": 1, "B1_OK": 1}
+
+    path.unlink()
+    path.write_text(json.dumps({"ts": 3.0, "code": "C1_OK"}) + "\n")
+    assert refresh_index(str(path)).counts == {"C1_OK": 1}
+
+
+def test_time_range_query_reads_the_end_of_older_files(tmp_path, monkeypatch):
+    path = tmp_path / "test.jsonl"
+    path.write_text("".join(json.dumps({"ts": 100.0 + i, "code": "NEW1_OK"}) + "\n" for i in range(10)))
+    # One block: its first timestamp is before the start, its last ones aren't
+    backup = tmp_path / "test.jsonl.2026-10-17"
+    backup.write_text("".join(json.dumps({"ts": float(i), "code": "OLD1_OK"}) + "\n" for i in range(50)))
+    handler = StructuredLogHandler(str(path), when="midnight", backupCount=1, utc=True)
+    monkeypatch.setattr(query_logs, "structured_handler", handler)
+    try:
+        records = query_logs.query_logs(start=40.0, limit=100)
+        assert [record["ts"] for record in records] == [100.0 + i for i in reversed(range(10))] + \
+               [float(i) for i in reversed(range(40, 50))]
+        assert refresh_index(str(backup)).max_ts == 49.0
+        assert query_logs.query_logs(start=200.0) == []
+    finally:
+        handler.close()
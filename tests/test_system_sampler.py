@@ -0,0 +1,17 @@
+import pytest
+
+from app.server.monitoring import system_sampler
+from app.server.monitoring.system_sampler import DEFAULT_INTERVAL, MIN_INTERVAL, configured_interval
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2.5", 2.5),
+    ("0.1", 0.1),
+    ("0", MIN_INTERVAL),
+    ("-5", MIN_INTERVAL),
+    ("nan", MIN_INTERVAL),
+    ("five", DEFAULT_INTERVAL),
+])
+def test_configured_interval_is_clamped(monkeypatch, value, expected):
+    monkeypatch.setattr(system_sampler, "get_config_value", lambda key, default=None: value)
+    assert configured_interval() == expected